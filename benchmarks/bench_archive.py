@@ -0,0 +1,61 @@
+"""Cost of archiving a few tasks as the history grows.
+
+Usage: python benchmarks/bench_archive.py [--sizes 1000 10000 100000] [--batch 5] [--rounds 20]
+
+For each history size, times ``clear_completed`` archiving ``--batch``
+completed tasks, averaged over ``--rounds`` rounds, with the JSON backend
+and the immediate flush policy. Archive time should stay flat as the
+history grows.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.models import Task  # noqa: E402
+from todo.storage import TaskStore  # noqa: E402
+
+
+def make_history(count: int) -> list:
+    return [
+        Task(id=i, title=f"Archived task {i}", status="completed", completed_at="2024-01-01T00:00:00")
+        for i in range(1, count + 1)
+    ]
+
+
+def time_archive(store: TaskStore, batch: int, rounds: int) -> float:
+    """Archive ``batch`` tasks ``rounds`` times and return the median seconds per archive."""
+    times = []
+    for _ in range(rounds):
+        for i in range(batch):
+            store.toggle_task(store.add_task(f"Done {i}").id)
+        start = time.perf_counter()
+        store.clear_completed()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--batch", type=int, default=5, help="tasks archived per clear")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"archiving {args.batch} tasks, median of {args.rounds} rounds")
+    print(f"{'history':>8}  {'archive ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TaskStore(Path(tmp))
+            store.save_history(make_history(size))
+            elapsed = time_archive(store, args.batch, args.rounds)
+            print(f"{size:>8}  {elapsed * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Throughput of batched mutations and bulk import/export.
+
+Usage: python benchmarks/bench_bulk.py [--adds 100] [--tasks 20000] [--import 100000]
+
+For each backend, times --adds add_task calls made one at a time (each
+one written on its own under the default flush policy) against the same
+calls inside one ``store.batch()``, starting from a store that already
+holds --tasks tasks. Then times importing --import tasks into an empty
+store and exporting them again, as JSON Lines and CSV through todo.bulk,
+in tasks per second.
+"""
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo import bulk  # noqa: E402
+from todo.models import Task  # noqa: E402
+from todo.storage import BACKENDS, open_store  # noqa: E402
+
+
+def make_file(count: int, fmt: str) -> str:
+    """An import file with ``count`` tasks spread over ten workspaces."""
+    priorities = [None, "low", "medium", "high"]
+    records = (
+        {
+            "title": f"Imported task number {i}",
+            "workspace": f"Workspace {i % 10}",
+            "status": "completed" if i % 3 == 0 else "pending",
+            "priority": priorities[i % 4],
+            "created_at": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T09:00:00",
+            "completed_at": "2024-12-01T10:00:00" if i % 3 == 0 else None,
+        }
+        for i in range(count)
+    )
+    f = io.StringIO()
+    bulk.write_records(f, records, fmt)
+    return f.getvalue()
+
+
+def time_adds(store, count: int, batched: bool) -> float:
+    start = time.perf_counter()
+    if batched:
+        with store.batch():
+            for i in range(count):
+                store.add_task(f"Added task {i}", 1)
+    else:
+        for i in range(count):
+            store.add_task(f"Added task {i}", 1)
+    store.flush()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--adds", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--import", dest="imports", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{args.adds} adds to a store of {args.tasks} tasks")
+    print(f"{'backend':<8}  {'one by one ms':>13}  {'batched ms':>10}  {'speedup':>7}")
+    for backend in BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_store(backend, Path(tmp))
+            store.replace_tasks([Task(id=i, title=f"Task {i}", workspace_id=1) for i in range(1, args.tasks + 1)])
+            store.flush()
+            single = time_adds(store, args.adds, batched=False)
+            batched = time_adds(store, args.adds, batched=True)
+            print(f"{backend:<8}  {single * 1000:>13.0f}  {batched * 1000:>10.0f}  {single / batched:>6.0f}x")
+
+    print(f"\n{args.imports} tasks through import and export, tasks per second")
+    print(f"{'backend':<8}  {'format':<6}  {'import':>9}  {'export':>9}")
+    for fmt in bulk.FORMATS:
+        text = make_file(args.imports, fmt)
+        for backend in BACKENDS:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = open_store(backend, Path(tmp))
+                start = time.perf_counter()
+                count = bulk.import_tasks(store, bulk.read_records(io.StringIO(text), fmt))
+                import_time = time.perf_counter() - start
+                assert count == args.imports and len(store.tasks()) == args.imports
+
+                start = time.perf_counter()
+                bulk.write_records(io.StringIO(), bulk.export_records(store), fmt)
+                export_time = time.perf_counter() - start
+                print(f"{backend:<8}  {fmt:<6}  {count / import_time:>9.0f}  {count / export_time:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Load and save throughput of each tasks file format.
+
+Usage: python benchmarks/bench_formats.py [--sizes 1000 10000 100000] [--runs 5]
+
+For each size, generates tasks with treegen.py and, for every format in
+todo.formats, times writing them as tasks.json (encode plus atomic write),
+reading them back into Task objects, and reading only the id and
+workspace_id columns, as the median of --runs runs. Also reports the file
+size.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from treegen import ACTIVE_DAYS, COMPLETED_SHARE, make_task  # noqa: E402
+from todo import formats  # noqa: E402
+from todo.fileio import FSYNC_NEVER  # noqa: E402
+from todo.journal import read_snapshot, write_snapshot  # noqa: E402
+
+
+def make_tasks(count: int) -> list:
+    rng = random.Random(1)
+    tasks = []
+    for i in range(count):
+        task = make_task(rng, rng.randint(1, 10), rng.random() < COMPLETED_SHARE, ACTIVE_DAYS)
+        task.id = i + 1
+        task.rank = (i + 1) << 16
+        tasks.append(task)
+    return tasks
+
+
+def median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8}  {'format':<8}  {'size KiB':>9}  {'save ms':>8}  {'load ms':>8}  "
+          f"{'2 cols ms':>9}  {'load tasks/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tasks.json"
+        for count in args.sizes:
+            tasks = make_tasks(count)
+            for name in formats.FORMATS:
+                save = median_ms(lambda: write_snapshot(path, 0, tasks, FSYNC_NEVER, name), args.runs)
+                load = median_ms(lambda: read_snapshot(path), args.runs)
+                columns = median_ms(lambda: formats.read_columns(path.read_bytes(), ("id", "workspace_id")), args.runs)
+                assert read_snapshot(path)[1] == tasks
+                size = path.stat().st_size / 1024
+                rate = count / load * 1000
+                print(f"{count:>8}  {name:<8}  {size:>9.0f}  {save:>8.1f}  {load:>8.1f}  {columns:>9.1f}  {rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Write latency under each fsync policy.
+
+Usage: python benchmarks/bench_fsync.py [--tasks 1000] [--edits 100]
+
+Times single-task edits with the immediate flush policy, for both full
+snapshot rewrites and journal appends, under the always, batched and never
+fsync policies. Run it on the filesystem you care about by pointing TMPDIR
+at it.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.fileio import FSYNC_POLICIES, sync_pending  # noqa: E402
+from todo.models import Task  # noqa: E402
+from todo.storage import TaskStore  # noqa: E402
+
+
+def measure(root: Path, tasks: int, edits: int, journal: bool, fsync_policy: str) -> list:
+    """Return per-edit latencies in seconds."""
+    store = TaskStore(root, journal=journal, fsync_policy=fsync_policy)
+    store.replace_tasks([Task(id=i, title=f"Task {i}") for i in range(1, tasks + 1)])
+    store.flush()
+    store.journal.wait()
+    sync_pending()
+
+    latencies = []
+    for i in range(edits):
+        start = time.perf_counter()
+        store.toggle_task(i % tasks + 1)
+        latencies.append(time.perf_counter() - start)
+    store.journal.wait()
+    sync_pending()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--edits", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8}  {'fsync':>8}  {'mean ms':>9}  {'p99 ms':>9}")
+    for journal in (False, True):
+        for policy in FSYNC_POLICIES:
+            with tempfile.TemporaryDirectory() as tmp:
+                latencies = measure(Path(tmp), args.tasks, args.edits, journal, policy)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            mode = "journal" if journal else "snapshot"
+            print(f"{mode:>8}  {policy:>8}  {statistics.mean(latencies) * 1000:>9.3f}  {p99 * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
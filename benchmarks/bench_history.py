@@ -0,0 +1,65 @@
+"""Time to the first page of history versus loading all of it.
+
+Usage: python benchmarks/bench_history.py [--sizes 1000 10000 100000] [--page 100]
+
+For each history size, times reading the newest ``--page`` entries the way
+``silo history`` does against parsing the whole history, for both the JSON
+and SQLite backends. The first page should cost the same at every size.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.models import Task  # noqa: E402
+from todo.storage import BACKENDS, open_store  # noqa: E402
+
+
+def make_history(count: int) -> list:
+    """Archived tasks completed one minute apart, oldest first."""
+    return [
+        Task(
+            id=i,
+            title=f"Archived task {i}",
+            workspace_id=i % 5 + 1,
+            status="completed",
+            created_at=f"2024-01-01T00:00:00.{i % 1000000:06d}",
+            completed_at=f"2024-{i // 40000 % 12 + 1:02d}-{i // 1440 % 28 + 1:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--page", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8}  {'entries':>8}  {'first page ms':>13}  {'full load ms':>12}  {'count ms':>8}")
+    for backend in BACKENDS:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = open_store(backend, Path(tmp))
+                store.save_history(make_history(size))
+                store.flush()
+
+                page = timed(lambda: list(islice(store.iter_history(), args.page)))
+                full = timed(store.load_history)
+                count = timed(store.history_count)
+                print(f"{backend:<8}  {size:>8}  {page * 1000:>13.1f}  {full * 1000:>12.1f}  {count * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-edit cost of journal mode versus full snapshot rewrites.
+
+Usage: python benchmarks/bench_journal.py [--sizes 1000 10000 100000] [--edits 200]
+
+For each task count, times a mix of toggle, priority, title and move edits
+with the immediate flush policy. Journal mode should stay flat as the task
+count grows; snapshot mode grows linearly with it.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.models import Task  # noqa: E402
+from todo.storage import TaskStore  # noqa: E402
+
+
+def make_store(root: Path, count: int, journal: bool) -> TaskStore:
+    """Create a store under ``root`` holding ``count`` tasks."""
+    store = TaskStore(root, journal=journal)
+    store.replace_tasks([Task(id=i, title=f"Task {i}", workspace_id=i % 5 + 1) for i in range(1, count + 1)])
+    store.flush()
+    store.journal.wait()
+    return store
+
+
+def time_edits(store: TaskStore, count: int, edits: int) -> float:
+    """Run ``edits`` mutations and return the mean seconds per edit."""
+    ops = (store.toggle_task, store.cycle_task_priority, store.move_task_down)
+    start = time.perf_counter()
+    for i in range(edits):
+        task_id = (i * 7919) % count + 1
+        if i % 4 == 3:
+            store.update_task_title(task_id, f"Edited {i}")
+        else:
+            ops[i % 4](task_id)
+    elapsed = time.perf_counter() - start
+    store.journal.wait()
+    return elapsed / edits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--edits", type=int, default=200, help="Edits per journal run")
+    parser.add_argument("--snapshot-edits", type=int, default=10, help="Edits per snapshot run")
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8}  {'journal ms/edit':>16}  {'snapshot ms/edit':>17}")
+    for count in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = time_edits(make_store(Path(tmp), count, journal=True), count, args.edits)
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = time_edits(make_store(Path(tmp), count, journal=False), count, args.snapshot_edits)
+        print(f"{count:>8}  {journal * 1000:>16.3f}  {snapshot * 1000:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
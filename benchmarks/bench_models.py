@@ -0,0 +1,121 @@
+"""Memory and serialization cost of the task representations.
+
+Usage: python benchmarks/bench_models.py [--tasks 100000]
+
+Compares the original dataclass Task (reproduced below as LegacyTask) with
+the slotted Task and the array-backed TaskColumns: memory held by N tasks,
+and the time to convert them to and from JSON.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.models import Task, TaskColumns  # noqa: E402
+
+
+@dataclass
+class LegacyTask:
+    """The Task dataclass as it was before the slotted rewrite."""
+
+    id: int
+    title: str
+    workspace_id: Optional[int] = None
+    status: str = "pending"
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    completed_at: Optional[str] = None
+    priority: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LegacyTask":
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            workspace_id=data.get("workspace_id"),
+            status=data.get("status", "pending"),
+            created_at=data.get("created_at", datetime.now().isoformat()),
+            completed_at=data.get("completed_at"),
+            priority=data.get("priority"),
+        )
+
+
+def make_items(count: int) -> list:
+    """Task dictionaries as they appear in tasks.json."""
+    priorities = [None, "low", "medium", "high"]
+    items = []
+    for i in range(1, count + 1):
+        completed = i % 3 == 0
+        items.append({
+            "id": i,
+            "title": f"Task number {i}",
+            "workspace_id": i % 10 + 1,
+            "status": "completed" if completed else "pending",
+            "created_at": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T09:{i % 60:02d}:00.{i % 1000000:06d}",
+            "completed_at": f"2024-12-01T10:00:00.{i % 1000000:06d}" if completed else None,
+            "priority": priorities[i % 4],
+        })
+    return items
+
+
+def measure(name: str, text: str, load, dump) -> None:
+    """Print memory held after loading, and load/dump times.
+
+    Memory covers everything the tasks keep alive, including strings
+    shared with the parsed JSON. Times are taken without tracing.
+    """
+    gc.collect()
+    tracemalloc.start()
+    tasks = load(json.loads(text))
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    items = json.loads(text)
+    start = time.perf_counter()
+    tasks = load(items)
+    load_time = time.perf_counter() - start
+    del items
+
+    start = time.perf_counter()
+    json.dumps(dump(tasks))
+    dump_time = time.perf_counter() - start
+
+    count = len(tasks)
+    print(f"{name:<12}  {memory / 2**20:>8.1f}  {memory / count:>10.0f}  {load_time * 1000:>9.0f}  {dump_time * 1000:>9.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    text = json.dumps(make_items(args.tasks))
+    print(f"{args.tasks} tasks; load = from_dict over parsed JSON (json.loads not timed), dump = to_dict + json.dumps")
+    print(f"{'model':<12}  {'MiB':>8}  {'bytes/task':>10}  {'load ms':>9}  {'dump ms':>9}")
+    measure(
+        "dataclass", text,
+        lambda items: [LegacyTask.from_dict(item) for item in items],
+        lambda tasks: [t.to_dict() for t in tasks],
+    )
+    measure(
+        "slotted", text,
+        lambda items: [Task.from_dict(item) for item in items],
+        lambda tasks: [t.to_dict() for t in tasks],
+    )
+    measure("columns", text, TaskColumns.from_dicts, TaskColumns.to_dicts)
+
+
+if __name__ == "__main__":
+    main()
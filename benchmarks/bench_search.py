@@ -0,0 +1,99 @@
+"""Search latency over the title index versus a substring scan.
+
+Usage: python benchmarks/bench_search.py [--tasks 100000] [--history 100000]
+       [--budget-ms 10] [--budget-matches 2000]
+
+Fills a store with --tasks tasks and --history archived tasks, then times
+task searches (as the TUI filter runs them on each keystroke) and history
+searches, for both backends. Exits with status 1 if a median task search
+is slower than --budget-ms. On SQLite the budget only applies to queries
+with at most --budget-matches results: beyond that, fetching the rows in
+display order costs more than the budget by itself.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.models import Task  # noqa: E402
+from todo.storage import BACKENDS, open_store  # noqa: E402
+
+# Keystroke sequences, as typed into the / filter
+QUERIES = ["r", "re", "rep", "repo", "report", "report q", "report qu", "zzz", "fix par"]
+
+
+def make_words(rng: random.Random, count: int) -> list:
+    syllables = ["re", "po", "rt", "fix", "par", "ser", "qu", "ar", "ter", "ly", "mi", "lk", "ca", "ll", "bu", "g"]
+    words = {"report", "quarterly", "fix", "parser", "milk", "call", "bug"}
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_tasks(rng: random.Random, words: list, count: int, start: int = 1, **fields) -> list:
+    return [
+        Task(id=i, title=" ".join(rng.choices(words, k=rng.randint(2, 6))), workspace_id=i % 10 + 1, **fields)
+        for i in range(start, start + count)
+    ]
+
+
+def median_ms(func, runs: int = 5) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--history", type=int, default=100_000)
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    parser.add_argument("--budget-matches", type=int, default=2000, help="largest SQLite result held to the budget")
+    args = parser.parse_args()
+
+    rng = random.Random(14)
+    words = make_words(rng, 5000)
+    tasks = make_tasks(rng, words, args.tasks)
+    archived = make_tasks(
+        rng, words, args.history, start=args.tasks + 1, status="completed", completed_at="2024-01-01T00:00:00"
+    )
+
+    failures = []
+    for backend in BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_store(backend, Path(tmp))
+            store.replace_tasks(tasks)
+            store.save_history(archived)
+            store.flush()
+
+            build = median_ms(lambda: store.search_task_ids("warmup"), runs=1)
+            print(f"\n{backend}: {args.tasks} tasks, {args.history} archived; first search (builds index) {build:.0f} ms")
+            print(f"{'query':<12}  {'matches':>8}  {'index ms':>9}  {'scan ms':>8}  {'history ms':>10}")
+            for query in QUERIES:
+                ids = store.search_task_ids(query)
+                indexed = median_ms(lambda: store.search_task_ids(query))
+                needle = query.lower()
+                scanned = median_ms(lambda: [t.id for t in store.tasks() if needle in t.title.lower()])
+                history = median_ms(lambda: list(islice(store.search_history(query), 50)))
+                print(f"{query:<12}  {len(ids):>8}  {indexed:>9.2f}  {scanned:>8.1f}  {history:>10.2f}")
+                held = backend == "json" or len(ids) <= args.budget_matches
+                if held and indexed > args.budget_ms:
+                    failures.append(f"{backend} '{query}': {indexed:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
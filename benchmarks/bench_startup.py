@@ -0,0 +1,116 @@
+"""Cold-start time of each CLI subcommand.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--budget-scale 1.0]
+
+Runs each subcommand in a fresh interpreter against a small throwaway
+store, timing the whole process and, with ``-X importtime``, the time spent
+importing modules. Fails (exit status 1) if a command's median wall time is
+over its budget, or if it imports Textual. Scale the budgets for slower
+machines with --budget-scale.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Subcommands to time and their wall-time budgets in milliseconds. None of
+# these may import Textual. Help output is rendered by Rich through Typer,
+# so it gets more room than the commands scripts run in loops.
+COMMANDS = [
+    (["list"], 250),
+    (["history"], 250),
+    (["clear"], 250),
+    (["--help"], 400),
+    (["migrate", "--help"], 400),
+    (["o", "--help"], 400),
+]
+
+
+def seed(home: Path) -> None:
+    """Create a small store with a few pending and archived tasks."""
+    code = (
+        "import todo.storage as s\n"
+        "for i in range(20):\n"
+        "    t = s.add_task(f'Task {i}')\n"
+        "    if i % 4 == 0:\n"
+        "        s.toggle_task(t.id)\n"
+        "s.clear_completed()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=command_env(home), check=True)
+
+
+def command_env(home: Path) -> dict:
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=str(ROOT))
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def run_once(home: Path, args: list) -> tuple:
+    """Run one subcommand. Returns (wall seconds, import seconds, imported module names)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "todo.main", *args],
+        cwd=ROOT,
+        env=command_env(home),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    imports_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # top-level imports only, so nothing is counted twice
+            imports_us += int(cumulative)
+    return wall, imports_us / 1e6, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget by this")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'command':<16}  {'wall ms':>8}  {'import ms':>9}  textual")
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        seed(home)
+        for command, budget_ms in COMMANDS:
+            budget_ms *= args.budget_scale
+            walls, imports = [], []
+            textual = False
+            for _ in range(args.runs):
+                wall, import_time, modules = run_once(home, command)
+                walls.append(wall)
+                imports.append(import_time)
+                textual = textual or "textual" in modules
+
+            name = " ".join(command)
+            wall_ms = statistics.median(walls) * 1000
+            import_ms = statistics.median(imports) * 1000
+            print(f"{name:<16}  {wall_ms:>8.1f}  {import_ms:>9.1f}  {'yes' if textual else 'no'}")
+            if wall_ms > budget_ms:
+                failures.append(f"{name}: {wall_ms:.0f} ms is over the {budget_ms:.0f} ms budget")
+            if textual:
+                failures.append(f"{name}: imported textual")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Time-to-first-paint and memory of the task view at large task counts.
+
+Usage: python benchmarks/bench_task_view.py [--sizes 1000 10000 100000]
+
+Each size runs in a fresh subprocess with its own ~/.todo. The timer starts
+before the store is loaded and stops once the "All Tasks" view has been
+rendered headlessly. Peak RSS is read from getrusage.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_tasks(home: Path, count: int) -> None:
+    """Write ``count`` tasks to home/.todo/tasks.json."""
+    todo_dir = home / ".todo"
+    todo_dir.mkdir()
+    tasks = [
+        {"id": i, "title": f"Task {i}", "workspace_id": i % 5 + 1, "status": "pending",
+         "created_at": "2024-01-01T09:00:00", "completed_at": None, "priority": None}
+        for i in range(1, count + 1)
+    ]
+    (todo_dir / "tasks.json").write_text(json.dumps(tasks))
+
+
+def child(count: int) -> None:
+    """Open the task view on $HOME/.todo and report timings."""
+    sys.path.insert(0, str(ROOT))
+    from todo.app import TodoApp
+    from todo.widgets import TaskTable
+
+    async def run() -> float:
+        start = time.perf_counter()
+        app = TodoApp()
+        async with app.run_test() as pilot:
+            app.enter_workspace(None, "All Tasks")
+            await pilot.pause()
+            elapsed = time.perf_counter() - start
+            assert app.query_one(TaskTable).row_count == count
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"tasks": count, "first_paint_s": elapsed, "peak_rss_mb": rss_kb / 1024}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child)
+        return
+
+    print(f"{'tasks':>8}  {'first paint ms':>15}  {'peak RSS MB':>12}")
+    for count in args.sizes:
+        with tempfile.TemporaryDirectory() as home:
+            write_tasks(Path(home), count)
+            env = dict(os.environ, HOME=home)
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", str(count)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{count:>8}  {result['first_paint_s'] * 1000:>15.1f}  {result['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
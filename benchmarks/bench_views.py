@@ -0,0 +1,67 @@
+"""Cost of keeping a sorted task view current versus sorting it again.
+
+Usage: python benchmarks/bench_views.py [--sizes 1000 10000 100000] [--runs 200]
+
+For each size, generates tasks with treegen.py and, for every sort in
+todo.views, times building a SortIndex, placing a task again after
+toggling or re-prioritizing it (what the viewer does on x and p), and
+sorting the whole view from scratch, as the median of --runs runs.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_formats import make_tasks  # noqa: E402
+from todo.views import SORT_KEYS, SORTS, SortIndex  # noqa: E402
+
+
+def median_us(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'tasks':>8}  {'sort':<8}  {'build ms':>9}  {'place us':>9}  {'re-sort us':>11}")
+    for count in args.sizes:
+        tasks = make_tasks(count)
+        for sort in SORTS:
+            build = median_us(lambda: SortIndex(None, sort, True, tasks), max(1, args.runs // 50)) / 1000
+            index = SortIndex(None, sort, True, tasks)
+            key = SORT_KEYS[sort]
+
+            def place():
+                task = rng.choice(tasks)
+                if rng.random() < 0.5:
+                    task.toggle()
+                else:
+                    task.cycle_priority()
+                index.place(task)
+
+            def resort():
+                sorted((t for t in tasks if not t.is_completed()), key=lambda t: (*key(t), t.id))
+
+            moved = median_us(place, args.runs)
+            full = median_us(resort, max(1, args.runs // 50))
+            assert index.ids() == [t.id for t in sorted(
+                (t for t in tasks if not t.is_completed()), key=lambda t: (*key(t), t.id))]
+            print(f"{count:>8}  {sort:<8}  {build:>9.1f}  {moved:>9.1f}  {full:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
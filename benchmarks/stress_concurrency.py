@@ -0,0 +1,101 @@
+"""Concurrent writers stress test.
+
+Usage: python benchmarks/stress_concurrency.py [--processes 8] [--tasks 200]
+       [--backend json|sqlite] [--journal] [--flush-policy immediate]
+
+Starts N processes that share one store. Each adds its own tasks and
+toggles every one of them right after adding it. Afterwards every task must
+be present exactly once and completed; any difference is a lost update and
+the script exits with status 1. Throughput is reported in operations per
+second across all processes.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.backend import FLUSH_IMMEDIATE, FLUSH_POLICIES  # noqa: E402
+from todo.storage import BACKENDS, TaskStore, open_store  # noqa: E402
+
+
+def open_shared_store(root: Path, backend: str, journal: bool, flush_policy: str):
+    """Open the store under test the same way in every process."""
+    if backend == "json":
+        return TaskStore(root, flush_policy=flush_policy, journal=journal)
+    return open_store(backend, root, flush_policy=flush_policy)
+
+
+def worker(root: Path, backend: str, journal: bool, flush_policy: str, worker_id: int, tasks: int, start, results) -> None:
+    """Add and toggle ``tasks`` tasks, then report the number of replayed conflicts."""
+    store = open_shared_store(root, backend, journal, flush_policy)
+    start.wait()
+    for i in range(tasks):
+        task = store.add_task(f"w{worker_id}-{i}")
+        store.toggle_task(task.id)
+    store.flush()
+    results.put(getattr(store, "conflicts", 0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=200, help="tasks added per process")
+    parser.add_argument("--backend", choices=BACKENDS, default="json")
+    parser.add_argument("--journal", action="store_true", help="use JSON journal mode")
+    parser.add_argument("--flush-policy", choices=FLUSH_POLICIES, default=FLUSH_IMMEDIATE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        open_shared_store(root, args.backend, args.journal, args.flush_policy).flush()
+
+        start = multiprocessing.Barrier(args.processes + 1)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(root, args.backend, args.journal, args.flush_policy, n, args.tasks, start, results),
+            )
+            for n in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        start.wait()
+        began = time.perf_counter()
+        conflicts = sum(results.get() for _ in processes)
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        tasks = open_shared_store(root, args.backend, args.journal, args.flush_policy).tasks()
+
+    expected = {f"w{n}-{i}" for n in range(args.processes) for i in range(args.tasks)}
+    titles = Counter(t.title for t in tasks)
+    missing = expected - set(titles)
+    duplicated = [title for title, count in titles.items() if count > 1]
+    untoggled = [t.title for t in tasks if not t.is_completed()]
+    ids = Counter(t.id for t in tasks)
+    shared_ids = [task_id for task_id, count in ids.items() if count > 1]
+
+    operations = 2 * args.processes * args.tasks
+    print(f"{args.processes} processes x {args.tasks} tasks, backend={args.backend}"
+          f"{' (journal)' if args.journal else ''}, flush={args.flush_policy}")
+    print(f"{operations} operations in {elapsed:.2f}s: {operations / elapsed:,.0f} ops/s")
+    print(f"conflicts replayed: {conflicts}")
+    print(f"missing: {len(missing)}  duplicated: {len(duplicated)}  "
+          f"not toggled: {len(untoggled)}  shared ids: {len(shared_ids)}")
+
+    if missing or duplicated or untoggled or shared_ids:
+        print("FAIL: updates were lost")
+        sys.exit(1)
+    print("OK: no lost updates")
+
+
+if __name__ == "__main__":
+    main()
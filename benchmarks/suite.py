@@ -0,0 +1,323 @@
+"""Regression suite over storage, models, CLI commands and the task table.
+
+Usage: python benchmarks/suite.py [--tasks 10000] [--history 20000] [--backend json] [--output results.json]
+       python benchmarks/suite.py --baseline baseline.json [--threshold 0.25]
+
+Generates a seeded tree with treegen.py, then times each case --repeats
+times and reports the median:
+
+- every storage operation, on a warm store; cases that change data start
+  each repeat from a fresh copy of the tree, and writes are included
+- Task.from_dict and Task.to_dict over every task
+- ``silo list``, ``silo history`` and ``silo clear`` as separate processes
+- TaskTable.populate with every task, rendered headlessly
+
+--output writes the results as JSON. With --baseline, each case is
+compared against the same case in an earlier results file, and the run
+fails (exit status 1) if any median is more than --threshold slower.
+Differences under --noise-ms are ignored, since they are mostly timer
+jitter. Compare only results from the same machine and tree size.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from treegen import generate  # noqa: E402
+from todo.backend import FLUSH_IMMEDIATE  # noqa: E402
+from todo.models import Task  # noqa: E402
+from todo.storage import BACKENDS, open_store  # noqa: E402
+
+
+class Case(NamedTuple):
+    """A timed operation.
+
+    ``setup`` returns what ``run`` is called with; only ``run`` is timed.
+    ``number`` calls are made per repeat and the time is divided between
+    them. ``fresh`` cases change data, so each repeat gets its own copy of
+    the tree, removed afterwards. ``self_timed`` cases return their own
+    time in seconds, for work that must be measured from inside.
+    """
+
+    name: str
+    run: Callable
+    setup: Optional[Callable] = None
+    number: int = 1
+    fresh: bool = False
+    self_timed: bool = False
+
+
+class Suite:
+    """A generated tree plus a warm store opened on it."""
+
+    def __init__(self, home: Path, backend: str) -> None:
+        self.home = home
+        self.backend = backend
+        self.pristine = home / "pristine"
+        self.copies = 0
+        self.store = self.open(self.copy())
+        self.tasks = self.store.tasks()
+        self.workspaces = self.store.workspaces()
+        self.workspace_id = self.workspaces[0].id if self.workspaces else None
+        # Stable picks from the middle of the list, so no case hits a best case
+        self.task_ids = [task.id for task in self.tasks[len(self.tasks) // 3::max(1, len(self.tasks) // 100)]][:100]
+        in_workspace = self.store.task_ids(self.workspace_id)
+        self.move_id = in_workspace[len(in_workspace) // 2]  # Moved within its workspace
+
+    def copy(self) -> Path:
+        """A fresh copy of the generated tree, as a HOME containing .todo."""
+        self.copies += 1
+        home = self.home / f"copy-{self.copies}"
+        shutil.copytree(self.pristine, home / ".todo")
+        return home
+
+    def open(self, home: Path):
+        return open_store(self.backend, home / ".todo", flush_policy=FLUSH_IMMEDIATE)
+
+    def fresh_store(self):
+        """A warm store on its own copy of the tree."""
+        store = self.open(self.copy())
+        store.tasks()
+        store.workspaces()
+        return store
+
+    def silo(self, home: Path, *args: str) -> None:
+        env = dict(os.environ, HOME=str(home), PYTHONPATH=str(ROOT), SILO_BACKEND=self.backend)
+        subprocess.run([sys.executable, "-m", "todo.main", *args], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+
+def cycle(values):
+    """Endless iterator over ``values``, so repeated calls touch different records."""
+    while True:
+        yield from values
+
+
+# ─── Cases ────────────────────────────────────────────────────────────────────
+
+def storage_cases(s: Suite) -> list:
+    ids = cycle(s.task_ids)
+    ws = s.workspace_id
+    store = s.store
+    return [
+        # Reads on the warm store
+        Case("storage.tasks", lambda _: store.tasks(), number=10),
+        Case("storage.tasks(workspace)", lambda _: store.tasks(ws), number=10),
+        Case("storage.task_ids", lambda _: store.task_ids(ws), number=10),
+        Case("storage.get_task", lambda _: store.get_task(next(ids)), number=1000),
+        Case("storage.get_tasks(100)", lambda _: store.get_tasks(s.task_ids), number=100),
+        Case("storage.workspaces", lambda _: store.workspaces(), number=1000),
+        Case("storage.get_workspace", lambda _: store.get_workspace(ws), number=1000),
+        Case("storage.workspace_task_count", lambda _: store.workspace_task_count(ws), number=10),
+        Case("storage.workspace_stats", lambda _: store.workspace_stats(), number=10),
+        Case("storage.search_task_ids", lambda _: store.search_task_ids("review dr"), number=100),
+        Case("storage.search_history", lambda _: [*store.search_history("budget")][:50], number=10),
+        Case("storage.iter_history(50)", lambda _: [*zip(range(50), store.iter_history())], number=10),
+        Case("storage.history_count", lambda _: store.history_count(), number=100),
+        Case("storage.load_history", lambda _: store.load_history()),
+        Case("storage.has_external_changes", lambda _: store.has_external_changes(), number=1000),
+        # Loading a tree from disk
+        Case("storage.load", lambda home: s.open(home).tasks(), setup=s.copy, fresh=True),
+        # Writes, each saved under the immediate flush policy
+        Case("storage.add_task", lambda st: st.add_task("Benchmark task", ws), setup=s.fresh_store, fresh=True),
+        Case("storage.insert_task", lambda st: st.insert_task(s.tasks[0]), setup=s.fresh_store, fresh=True),
+        Case("storage.toggle_task", lambda st: st.toggle_task(s.task_ids[0]), setup=s.fresh_store, fresh=True),
+        Case("storage.update_task_title", lambda st: st.update_task_title(s.task_ids[0], "Renamed task"),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.cycle_task_priority", lambda st: st.cycle_task_priority(s.task_ids[0]),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.move_task_before", lambda st: st.move_task_before(s.task_ids[0], s.task_ids[-1]),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.move_task_after", lambda st: st.move_task_after(s.task_ids[0], s.task_ids[-1]),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.move_task_up", lambda st: st.move_task_up(s.move_id, ws), setup=s.fresh_store, fresh=True),
+        Case("storage.move_task_down", lambda st: st.move_task_down(s.move_id, ws), setup=s.fresh_store, fresh=True),
+        Case("storage.move_task_to", lambda st: st.move_task_to(s.move_id, 0, ws), setup=s.fresh_store, fresh=True),
+        Case("storage.delete_task", lambda st: st.delete_task(s.task_ids[0]), setup=s.fresh_store, fresh=True),
+        Case("storage.delete_tasks(100)", lambda st: st.delete_tasks(s.task_ids), setup=s.fresh_store, fresh=True),
+        Case("storage.restore_tasks(100)", lambda st: st.restore_tasks(st.tasks()[:100]),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.batch(100 adds)", lambda st: batch_adds(st, ws, 100), setup=s.fresh_store, fresh=True),
+        Case("storage.undo", lambda st: st.undo(), setup=lambda: with_change(s.fresh_store()), fresh=True),
+        Case("storage.redo", lambda st: st.redo(), setup=lambda: undone(s.fresh_store()), fresh=True),
+        Case("storage.replace_tasks", lambda st: st.replace_tasks(st.tasks()), setup=s.fresh_store, fresh=True),
+        Case("storage.clear_completed", lambda st: st.clear_completed(), setup=s.fresh_store, fresh=True),
+        Case("storage.add_workspace", lambda st: st.add_workspace("Benchmark"), setup=s.fresh_store, fresh=True),
+        Case("storage.update_workspace_name", lambda st: st.update_workspace_name(ws, "Renamed"),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.delete_workspace", lambda st: st.delete_workspace(ws), setup=s.fresh_store, fresh=True),
+        Case("storage.replace_workspaces", lambda st: st.replace_workspaces(st.workspaces()),
+             setup=s.fresh_store, fresh=True),
+        Case("storage.save_history", lambda st: st.save_history(st.load_history()), setup=s.fresh_store, fresh=True),
+        Case("storage.clear_history", lambda st: st.clear_history(), setup=s.fresh_store, fresh=True),
+    ]
+
+
+def batch_adds(store, workspace_id, count: int) -> None:
+    with store.batch():
+        for i in range(count):
+            store.add_task(f"Batched task {i}", workspace_id)
+
+
+def with_change(store):
+    store.delete_tasks([task.id for task in store.tasks()[:100]])
+    return store
+
+
+def undone(store):
+    with_change(store).undo()
+    return store
+
+
+def model_cases(s: Suite) -> list:
+    dicts = [task.to_dict() for task in s.tasks]
+    return [
+        Case("Task.from_dict", lambda _: [Task.from_dict(d) for d in dicts]),
+        Case("Task.to_dict", lambda _: [task.to_dict() for task in s.tasks]),
+    ]
+
+
+def cli_cases(s: Suite) -> list:
+    home = s.copy()
+    return [
+        Case("silo list", lambda _: s.silo(home, "list")),
+        Case("silo history", lambda _: s.silo(home, "history")),
+        Case("silo clear", lambda h: s.silo(h, "clear"), setup=s.copy, fresh=True),
+    ]
+
+
+def table_cases(s: Suite) -> list:
+    def populate(_) -> float:
+        from textual.app import App
+        from todo.widgets import TaskTable
+
+        class TableApp(App):
+            def compose(self):
+                yield TaskTable()
+
+        async def run() -> float:
+            app = TableApp()
+            async with app.run_test() as pilot:
+                table = app.query_one(TaskTable)
+                start = time.perf_counter()
+                table.populate(s.tasks)
+                await pilot.pause()  # Lets the table render the first screen
+                return time.perf_counter() - start
+
+        return asyncio.run(run())
+
+    return [Case("TaskTable.populate", populate, self_timed=True)]
+
+
+# ─── Running and Comparing ─────────────────────────────────────────────────────
+
+def time_case(case: Case, s: Suite, repeats: int) -> dict:
+    """Median and minimum time per call of a case, in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        arg = case.setup() if case.setup is not None else None
+        start = time.perf_counter()
+        for _ in range(case.number):
+            result = case.run(arg)
+        elapsed = time.perf_counter() - start
+        if case.self_timed:
+            elapsed = result
+        times.append(elapsed / case.number * 1000)
+        if case.fresh:
+            shutil.rmtree(s.home / f"copy-{s.copies}", ignore_errors=True)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "repeats": repeats}
+
+
+def compare(results: dict, baseline: dict, threshold: float, noise_ms: float) -> list:
+    """Print each case against the baseline. Returns the names of cases that regressed."""
+    regressions = []
+    for key in ("workspaces", "tasks", "history", "backend"):
+        if results["meta"].get(key) != baseline["meta"].get(key):
+            print(f"warning: baseline has {key}={baseline['meta'].get(key)}, this run {results['meta'].get(key)}")
+
+    print(f"\n{'case':<34}  {'baseline ms':>12}  {'now ms':>10}  {'change':>8}")
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<34}  {'-':>12}  {result['median_ms']:>10.3f}  {'new':>8}")
+            continue
+        old, new = before["median_ms"], result["median_ms"]
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and new - old > noise_ms
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<34}  {old:>12.3f}  {new:>10.3f}  {change:>+7.0%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workspaces", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--history", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=BACKENDS, default="json")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-k", "--filter", help="only run cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--noise-ms", type=float, default=0.05, help="ignore differences smaller than this")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "workspaces": args.workspaces,
+            "tasks": args.tasks,
+            "history": args.history,
+            "seed": args.seed,
+            "backend": args.backend,
+            "repeats": args.repeats,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        generate(home / "pristine", args.workspaces, args.tasks, args.history, args.seed, args.backend)
+        suite = Suite(home, args.backend)
+        cases = storage_cases(suite) + model_cases(suite) + cli_cases(suite) + table_cases(suite)
+
+        print(f"{'case':<34}  {'median ms':>10}  {'min ms':>10}")
+        for case in cases:
+            if args.filter and args.filter not in case.name:
+                continue
+            result = time_case(case, suite, args.repeats)
+            results["results"][case.name] = result
+            print(f"{case.name:<34}  {result['median_ms']:>10.3f}  {result['min_ms']:>10.3f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold, args.noise_ms)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) more than {args.threshold:.0%} slower than the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
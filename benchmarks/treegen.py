@@ -0,0 +1,122 @@
+"""Seeded generator for realistic ~/.todo trees.
+
+Usage: python benchmarks/treegen.py DIR [--workspaces 10] [--tasks 10000] [--history 20000] [--seed 1] [--backend json]
+
+Writes a store to DIR (use DIR=~/.todo to try the viewer on it) with
+--workspaces workspaces, --tasks active tasks and --history archived
+tasks. The same seed always gives the same tree. Like real lists, a few
+workspaces hold most of the tasks, most tasks have no priority and high
+priority is rarest, about a quarter of the active tasks are completed
+but not yet cleared, and archived tasks are spread over the past two
+years, so history has a segment per month.
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from todo.backend import FLUSH_MANUAL  # noqa: E402
+from todo.models import Task  # noqa: E402
+from todo.storage import BACKENDS, open_store  # noqa: E402
+
+WORDS = (
+    "review update fix write call email plan draft send check book buy clean prepare "
+    "report budget meeting slides invoice release notes docs tests deploy server backup "
+    "groceries dentist car insurance taxes garden birthday gift flight hotel agenda "
+    "quarterly weekly design proposal contract onboarding feedback roadmap migration"
+).split()
+WORKSPACE_NAMES = ("Work", "Home", "Errands", "Side Project", "Reading", "Fitness", "Finance", "Travel")
+
+# (value, weight) pairs
+PRIORITY_WEIGHTS = ((None, 55), ("low", 20), ("medium", 17), ("high", 8))
+COMPLETED_SHARE = 0.25
+# Days back that active and archived tasks were created
+ACTIVE_DAYS = 120
+HISTORY_DAYS = 730
+
+START = datetime(2024, 1, 1, 9, 0, 0)  # Fixed, so trees don't depend on when they were generated
+
+
+def title(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(2, 7))
+    return " ".join(words).capitalize()
+
+
+def workspace_weights(count: int) -> list:
+    """Zipf-like weights: the first workspace is busiest."""
+    return [1 / (k + 1) for k in range(count)]
+
+
+def make_task(rng: random.Random, workspace_id, completed: bool, days: int) -> Task:
+    created = START + timedelta(days=HISTORY_DAYS - rng.uniform(0, days), seconds=rng.randint(0, 86399))
+    completed_at = None
+    if completed:
+        completed_at = (created + timedelta(hours=rng.expovariate(1 / 72))).isoformat()
+    priority = rng.choices(*zip(*PRIORITY_WEIGHTS))[0]
+    return Task(
+        0, title(rng), workspace_id,
+        status="completed" if completed else "pending",
+        created_at=created.isoformat(), completed_at=completed_at, priority=priority,
+    )
+
+
+def generate(
+    root: Path,
+    workspaces: int = 10,
+    tasks: int = 10_000,
+    history: int = 20_000,
+    seed: int = 1,
+    backend: str = "json",
+) -> None:
+    """Write a store with the given numbers of workspaces, active tasks and archived tasks to ``root``."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    store = open_store(backend, root, flush_policy=FLUSH_MANUAL)
+
+    with store.batch():
+        ids = []
+        for i in range(workspaces):
+            name = WORKSPACE_NAMES[i] if i < len(WORKSPACE_NAMES) else f"{rng.choice(WORDS).capitalize()} {i}"
+            ids.append(store.add_workspace(name).id)
+        weights = workspace_weights(len(ids))
+
+        def pick_workspace():
+            # A few tasks from before workspaces existed
+            return rng.choices(ids, weights)[0] if ids and rng.random() > 0.02 else None
+
+        # Archived tasks take the lowest IDs, as they would have been created first
+        archived = [store.insert_task(make_task(rng, pick_workspace(), True, HISTORY_DAYS)) for _ in range(history)]
+        store.delete_tasks([task.id for task in archived])
+        for _ in range(tasks):
+            store.insert_task(make_task(rng, pick_workspace(), rng.random() < COMPLETED_SHARE, ACTIVE_DAYS))
+
+    archived.sort(key=lambda task: task.completed_ts)
+    store.save_history(archived)
+    store.flush()
+    # A generated tree has nothing to undo
+    (root / "undo.jsonl").unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--workspaces", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--history", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=BACKENDS, default="json")
+    args = parser.parse_args()
+
+    directory = args.directory.expanduser()
+    if any(directory.glob("*")):
+        parser.error(f"{directory} is not empty")
+    generate(directory, args.workspaces, args.tasks, args.history, args.seed, args.backend)
+    print(f"Wrote {args.workspaces} workspaces, {args.tasks} tasks and {args.history} archived tasks to {directory}")
+
+
+if __name__ == "__main__":
+    main()
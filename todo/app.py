@@ -1,13 +1,27 @@
 """Textual TUI application for Todo CLI."""
 
+import os
+import threading
+import time
+from pathlib import Path
+
 from textual.app import App, ComposeResult
 from textual.widgets import Input, Footer
 from textual.containers import Container, Vertical
 from textual.binding import Binding
-from textual import events
+from textual.worker import get_current_worker
+from textual import events, work
 
 from .widgets import TaskTable, WorkspaceTable, HelpBar, ViewHeader
-from . import storage
+from .backend import FLUSH_MANUAL
+from .models import Task, WorkspaceStats
+from .views import SORT_MANUAL, SORTS, SortIndex, ViewIndexes
+from .watcher import StorageWatcher
+from . import perf, storage
+
+
+# Seconds the writer thread waits after a change for more, so a burst of edits is written once
+WRITE_DELAY = 0.3
 
 
 class TodoApp(App):
@@ -54,13 +68,19 @@ class TodoApp(App):
         self.view_mode: str = "workspaces"  # "workspaces" or "tasks"
         self.current_workspace_id: int | None = None  # None means "All Tasks" view
         self.current_workspace_name: str = "All Tasks"
+        self.search_query: str = ""  # Filter for the task view, set with /
+        self.sort_mode: str = SORT_MANUAL  # Task view order, one of views.SORTS, cycled with s
+        self.hide_completed: bool = False  # Hide completed tasks, toggled with h
+        self.view_indexes = ViewIndexes(storage.iter_tasks)  # Sorted task views, updated on every change
+        self.count: int = 0  # Count typed before a task view command (5dd, 10J), 0 if none
+        self.write_requested = threading.Event()  # Set when storage has changes for the writer thread
     
     def compose(self) -> ComposeResult:
         """Compose the app layout."""
         with Vertical(id="main-container"):
             yield ViewHeader("Workspaces")
             yield WorkspaceTable()
-            yield TaskTable(classes="hidden")
+            yield TaskTable(fetch_tasks=storage.get_tasks, classes="hidden")
             yield Input(placeholder="Enter title...", id="task-input", classes="hidden")
             yield HelpBar(mode="workspaces")
     
@@ -68,9 +88,86 @@ class TodoApp(App):
         """Initialize the app when mounted."""
         self.refresh_workspaces()
         self.query_one(WorkspaceTable).focus()
+        
+        # Changes update the in-memory store at once; the writer thread saves them
+        storage.set_flush_policy(FLUSH_MANUAL)
+        self.write_storage()
+        
+        # SILO_WATCH=poll skips inotify, SILO_WATCH=off disables live reload
+        watch_mode = os.environ.get("SILO_WATCH", "auto")
+        if watch_mode != "off":
+            self.watch_storage(storage.watched_paths(), use_inotify=watch_mode != "poll")
+    
+    # ─── Live Reload ───────────────────────────────────────────────────────────
+    
+    @work(thread=True, exclusive=True, group="storage-watcher")
+    def watch_storage(self, paths: list[Path], use_inotify: bool = True) -> None:
+        """Wait in a background thread for storage writes and refresh the view."""
+        if not paths:
+            return
+        watcher = StorageWatcher(paths, use_inotify=use_inotify)
+        worker = get_current_worker()
+        try:
+            while not worker.is_cancelled:
+                if watcher.wait(timeout=0.5) and not worker.is_cancelled:
+                    self.call_from_thread(self.apply_external_changes)
+        finally:
+            watcher.close()
+    
+    def apply_external_changes(self) -> None:
+        """Refresh the current view if another process changed storage.
+        
+        Our own writes also wake the watcher; those are ignored. Only the
+        changed files are re-read, and rows are updated in place.
+        """
+        if not storage.has_external_changes():
+            return
+        self.view_indexes.clear()
+        if self.view_mode == "workspaces":
+            self.refresh_workspaces()
+        else:
+            self.query_one(TaskTable).sync_task_ids(self.visible_task_ids())
+    
+    # ─── Background Writes ─────────────────────────────────────────────────────
+    
+    def changed(self) -> None:
+        """Note that storage has unwritten changes, for the writer thread to save."""
+        self.query_one(HelpBar).set_status("unsaved")
+        self.write_requested.set()
+    
+    @work(thread=True, exclusive=True, group="storage-writer")
+    def write_storage(self) -> None:
+        """Write changes in a background thread, so a slow disk never holds up input.
+        
+        After a change the thread waits WRITE_DELAY seconds for more, so a
+        burst of edits (several quick p presses) is written once. Whatever
+        is still unwritten when the app exits is written by run_app.
+        """
+        worker = get_current_worker()
+        help_bar = self.query_one(HelpBar)
+        while not worker.is_cancelled:
+            if not self.write_requested.wait(timeout=0.5):
+                continue
+            time.sleep(WRITE_DELAY)
+            self.write_requested.clear()
+            self.call_from_thread(help_bar.set_status, "saving")
+            try:
+                storage.flush()
+            except Exception as e:
+                # The changes stay pending and are retried after the next change, or on exit
+                self.call_from_thread(self.write_failed, e)
+            else:
+                if not self.write_requested.is_set():
+                    self.call_from_thread(help_bar.set_status, "saved")
+    
+    def write_failed(self, error: Exception) -> None:
+        """Show that a background write failed."""
+        self.query_one(HelpBar).set_status("failed")
+        self.notify(f"Couldn't save changes: {error}", severity="error")
     
     # ─── Refresh Methods ───────────────────────────────────────────────────────
     
+    @perf.timed("refresh_workspaces")
     def refresh_workspaces(self, row_offset: int = 0) -> None:
         """Reload and display workspaces."""
         table = self.query_one(WorkspaceTable)
@@ -79,34 +176,206 @@ class TodoApp(App):
         target_row = current_row + row_offset
         
         workspaces = storage.load_workspaces()
-        all_tasks = storage.load_tasks()
         
-        # Calculate task counts per workspace
-        task_counts = {}
-        for ws in workspaces:
-            task_counts[ws.id] = storage.get_workspace_task_count(ws.id)
+        # Task counts for every workspace come from a single storage pass
+        stats = storage.get_workspace_stats()
+        total = WorkspaceStats()
+        for ws_stats in stats.values():
+            total.merge(ws_stats)
         
-        table.populate(workspaces, task_counts, len(all_tasks))
+        table.populate(workspaces, stats, total)
         
         if table.row_count > 0:
             target_row = max(0, min(target_row, table.row_count - 1))
             table.move_cursor(row=target_row)
     
-    def refresh_tasks(self, row_offset: int = 0) -> None:
-        """Reload and display tasks for current workspace."""
+    def is_sorted_view(self) -> bool:
+        """Whether the task view needs a sort index: any order but manual, or completed tasks hidden."""
+        return self.sort_mode != SORT_MANUAL or self.hide_completed
+    
+    def visible_task_ids(self) -> list[int]:
+        """IDs of the tasks to show: the current workspace in the current order, narrowed by the filters."""
+        if not self.is_sorted_view():
+            if self.search_query:
+                return storage.search_task_ids(self.search_query, self.current_workspace_id)
+            return storage.load_task_ids(self.current_workspace_id)
+        
+        ids = self.view_indexes.get(self.current_workspace_id, self.sort_mode, self.hide_completed).ids()
+        if self.search_query:
+            matches = set(storage.search_task_ids(self.search_query, self.current_workspace_id))
+            ids = [task_id for task_id in ids if task_id in matches]
+        return ids
+    
+    def show_changed_tasks(self, tasks: list[Task]) -> None:
+        """Update the rows of changed or added tasks, moving each to its place in a sorted view."""
+        table = self.query_one(TaskTable)
+        view: SortIndex | None = None
+        if self.is_sorted_view():
+            view = self.view_indexes.kept(self.current_workspace_id, self.sort_mode, self.hide_completed)
+        moves = self.view_indexes.place(tasks, view)
+        
+        if not self.is_sorted_view():
+            table.update_tasks(tasks)
+        elif view is None or self.search_query:
+            table.sync_task_ids(self.visible_task_ids())
+        else:
+            for task, (old, new) in zip(tasks, moves):
+                table.move_task_row(task, old, new)
+    
+    @perf.timed("refresh_tasks")
+    def refresh_tasks(self, row_offset: int = 0, changed_task_id: int | None = None) -> None:
+        """Reload and display tasks for current workspace.
+        
+        If changed_task_id is given, only that task's row is updated (or removed
+        if the task no longer exists) instead of re-syncing the whole list.
+        """
         table = self.query_one(TaskTable)
         
         current_row = table.cursor_row if table.row_count > 0 else 0
         target_row = current_row + row_offset
         
-        # Load tasks filtered by workspace (None = all tasks)
-        tasks = storage.load_tasks_by_workspace(self.current_workspace_id)
-        table.populate(tasks)
+        if changed_task_id is not None:
+            task = storage.get_task(changed_task_id)
+            if task is None:
+                table.remove_task(changed_task_id)
+            else:
+                table.update_task(task)
+        else:
+            # Load task IDs filtered by workspace (None = all tasks); rows are fetched as they scroll into view
+            table.set_task_ids(self.visible_task_ids())
         
         if table.row_count > 0:
             target_row = max(0, min(target_row, table.row_count - 1))
             table.move_cursor(row=target_row)
     
+    # ─── Bulk Task Actions ─────────────────────────────────────────────────────
+    #
+    # Each applies to the visual selection, or to count rows from the cursor,
+    # in one storage batch (one write) followed by one table update.
+    
+    def target_task_ids(self, count: int) -> list[int]:
+        """IDs of the tasks the next action applies to."""
+        table = self.query_one(TaskTable)
+        if table.row_count == 0:
+            return []
+        return table.get_task_ids(*table.selected_rows(count))
+    
+    def toggle_tasks(self, task_ids: list[int]) -> None:
+        """Complete the pending tasks among task_ids, or reopen them all if none is pending."""
+        tasks = storage.get_tasks(task_ids)
+        pending = [task_id for task_id in task_ids if task_id in tasks and not tasks[task_id].is_completed()]
+        with storage.batch():
+            for task_id in pending or task_ids:
+                storage.toggle_task(task_id)
+        self.changed()
+        self.show_changed_tasks([*storage.get_tasks(task_ids).values()])
+    
+    def cycle_priorities(self, task_ids: list[int]) -> None:
+        """Cycle the priority of every task in task_ids."""
+        with storage.batch():
+            for task_id in task_ids:
+                storage.cycle_task_priority(task_id)
+        self.changed()
+        self.show_changed_tasks([*storage.get_tasks(task_ids).values()])
+    
+    def delete_tasks(self, task_ids: list[int]) -> None:
+        """Delete every task in task_ids."""
+        storage.delete_tasks(task_ids)
+        self.changed()
+        self.view_indexes.remove(task_ids)
+        self.query_one(TaskTable).remove_tasks(task_ids)
+    
+    def move_rows(self, row: int) -> None:
+        """Move the targeted block of rows so that it starts at ``row`` of the current view.
+        
+        Each task is placed next to a visible neighbour by giving it a new
+        rank, so the move shows up whatever workspace or search filter the
+        view has, and only the moved tasks are rewritten. The cursor and
+        visual selection follow the block. Only the manual order can be
+        rearranged.
+        """
+        if self.sort_mode != SORT_MANUAL:
+            self.notify("Tasks can only be moved in manual order (press s)")
+            return
+        table = self.query_one(TaskTable)
+        first, last = table.selected_rows()
+        task_ids = table.get_task_ids(first, last)
+        others = table.get_task_ids(0, first - 1) + table.get_task_ids(last + 1, table.row_count - 1)
+        row = max(0, min(row, len(others)))
+        if row == first or not others:
+            return
+        
+        with storage.batch():
+            if row == 0:
+                storage.move_task_before(task_ids[0], others[0])
+            else:
+                storage.move_task_after(task_ids[0], others[row - 1])
+            for previous, task_id in zip(task_ids, task_ids[1:]):
+                storage.move_task_after(task_id, previous)
+        self.changed()
+        # A move can renumber every rank, so sort indexes are rebuilt when next needed
+        self.view_indexes.clear()
+        table.move_rows(first, last, row)
+    
+    def set_visual(self, on: bool) -> None:
+        """Start or end visual selection at the cursor."""
+        table = self.query_one(TaskTable)
+        table.set_visual_anchor(table.cursor_row if on and table.row_count > 0 else None)
+        self.query_one(HelpBar).set_mode("visual" if table.visual_anchor is not None else "tasks")
+    
+    def set_search(self, query: str) -> None:
+        """Filter the task view to titles matching query; an empty query shows every task."""
+        self.search_query = query.strip()
+        self.update_title()
+        self.refresh_tasks()
+        self.query_one(TaskTable).move_cursor(0)
+    
+    def set_view_options(self, sort_mode: str, hide_completed: bool) -> None:
+        """Change the task view's order and completed-task filter, keeping the cursor on its task if still shown."""
+        self.sort_mode = sort_mode
+        self.hide_completed = hide_completed
+        self.set_visual(False)
+        self.update_title()
+        table = self.query_one(TaskTable)
+        selected = table.get_selected_task_id()
+        task_ids = self.visible_task_ids()
+        table.set_task_ids(task_ids)
+        table.move_cursor(task_ids.index(selected) if selected in task_ids else 0)
+    
+    def update_title(self) -> None:
+        """Show the workspace name with the search filter and view options in the header."""
+        title = self.current_workspace_name
+        if self.search_query:
+            title = f"{title}  /{self.search_query}"
+        if self.sort_mode != SORT_MANUAL:
+            title = f"{title}  ↓{self.sort_mode}"
+        if self.hide_completed:
+            title = f"{title}  (completed hidden)"
+        self.query_one(ViewHeader).set_title(title)
+    
+    def undo(self, redo: bool = False, count: int = 1) -> None:
+        """Undo (or redo) the last count changes, made here or by any silo process, and refresh the view."""
+        changes = []
+        for _ in range(count):
+            change = storage.redo() if redo else storage.undo()
+            if change is None:
+                break
+            changes.append(change)
+        if not changes:
+            self.notify("Nothing to redo" if redo else "Nothing to undo")
+            return
+        self.changed()
+        self.view_indexes.clear()
+        verb = "Redid" if redo else "Undid"
+        self.notify(f"{verb} {changes[0].describe()}" if len(changes) == 1 else f"{verb} {len(changes)} changes")
+        if self.view_mode == "workspaces":
+            self.refresh_workspaces()
+        elif self.current_workspace_id is not None and storage.get_workspace(self.current_workspace_id) is None:
+            self.exit_to_workspaces()
+        else:
+            self.set_visual(False)
+            self.query_one(TaskTable).sync_task_ids(self.visible_task_ids())
+    
     # ─── View Switching ────────────────────────────────────────────────────────
     
     def enter_workspace(self, workspace_id: int | None, workspace_name: str) -> None:
@@ -116,7 +385,7 @@ class TodoApp(App):
         self.view_mode = "tasks"
         
         # Update UI
-        self.query_one(ViewHeader).set_title(workspace_name)
+        self.update_title()
         self.query_one(WorkspaceTable).add_class("hidden")
         self.query_one(TaskTable).remove_class("hidden")
         self.query_one(HelpBar).set_mode("tasks")
@@ -129,6 +398,9 @@ class TodoApp(App):
         self.view_mode = "workspaces"
         self.current_workspace_id = None
         self.current_workspace_name = "All Tasks"
+        self.search_query = ""
+        self.count = 0
+        self.query_one(TaskTable).set_visual_anchor(None)
         
         # Update UI
         self.query_one(ViewHeader).set_title("Workspaces")
@@ -150,6 +422,10 @@ class TodoApp(App):
         if not task_input.has_class("hidden") and task_input.has_focus:
             return
         
+        # Escape is left to the cancel_or_quit binding, which also drops a pending count
+        if key == "escape":
+            return
+        
         if self.view_mode == "workspaces":
             self._handle_workspace_key(key)
         else:
@@ -175,8 +451,7 @@ class TodoApp(App):
                 if ws_id == WorkspaceTable.ALL_TASKS_ID:
                     self.enter_workspace(None, "All Tasks")
                 else:
-                    workspaces = storage.load_workspaces()
-                    ws = next((w for w in workspaces if w.id == ws_id), None)
+                    ws = storage.get_workspace(ws_id)
                     if ws:
                         self.enter_workspace(ws.id, ws.name)
             self.last_key = None
@@ -191,9 +466,8 @@ class TodoApp(App):
             ws_id = table.get_selected_workspace_id()
             if ws_id is not None and ws_id != WorkspaceTable.ALL_TASKS_ID:
                 self.editing_id = ws_id
-                workspaces = storage.load_workspaces()
-                current_name = next((w.name for w in workspaces if w.id == ws_id), "")
-                self.show_input("edit_workspace", current_name)
+                ws = storage.get_workspace(ws_id)
+                self.show_input("edit_workspace", ws.name if ws else "")
             self.last_key = None
         
         # Delete workspace with dd
@@ -202,11 +476,18 @@ class TodoApp(App):
                 ws_id = table.get_selected_workspace_id()
                 if ws_id is not None and ws_id != WorkspaceTable.ALL_TASKS_ID:
                     storage.delete_workspace(ws_id)
+                    self.changed()
+                    self.view_indexes.clear()
                     self.refresh_workspaces()
                 self.last_key = None
             else:
                 self.last_key = "d"
         
+        # Undo (u) and redo (Ctrl+R)
+        elif key == "u" or key == "ctrl+r":
+            self.undo(redo=key == "ctrl+r")
+            self.last_key = None
+        
         # G to go to bottom
         elif key == "G":
             if table.row_count > 0:
@@ -225,48 +506,78 @@ class TodoApp(App):
             self.last_key = None
     
     def _handle_task_key(self, key: str) -> None:
-        """Handle keys in task view."""
+        """Handle keys in task view.
+        
+        Digits typed first set a count: 5j moves five rows, 5x toggles five
+        tasks, 3J moves a task three rows, 5M moves it to row five, 5dd
+        deletes five tasks, 3u undoes three changes and 5G jumps to row five. In visual mode (V)
+        actions apply to the selection instead.
+        """
         table = self.query_one(TaskTable)
+        visual = table.visual_anchor is not None
+        
+        # Count prefix
+        if len(key) == 1 and key.isdigit() and (key != "0" or self.count):
+            self.count = min(self.count * 10 + int(key), 99999)
+            return
+        count = self.count or 1
         
         # Navigation
         if key == "j" or key == "down":
-            table.action_cursor_down()
+            table.move_cursor(table.cursor_row + count)
             self.last_key = None
         
         elif key == "k" or key == "up":
-            table.action_cursor_up()
+            table.move_cursor(table.cursor_row - count)
             self.last_key = None
         
-        # Move task down (Shift+J)
-        elif key == "J":
-            task_id = table.get_selected_task_id()
-            if task_id is not None:
-                if storage.move_task_down(task_id):
-                    self.refresh_tasks(row_offset=1)
+        # Visual selection
+        elif key == "V":
+            self.set_visual(not visual)
             self.last_key = None
         
-        # Move task up (Shift+K)
-        elif key == "K":
-            task_id = table.get_selected_task_id()
-            if task_id is not None:
-                if storage.move_task_up(task_id):
-                    self.refresh_tasks(row_offset=-1)
+        # Move task(s) down (Shift+J) or up (Shift+K)
+        elif key == "J" or key == "K":
+            if table.row_count > 0:
+                first, _ = table.selected_rows()
+                self.move_rows(first + count if key == "J" else first - count)
+            self.last_key = None
+        
+        # Move task(s) to the top (T), the bottom (B), or row N (NM)
+        elif key in ("T", "B", "M"):
+            if table.row_count > 0:
+                if key == "T":
+                    self.move_rows(0)
+                elif key == "B":
+                    self.move_rows(table.row_count)
+                elif self.count:
+                    self.move_rows(self.count - 1)
             self.last_key = None
         
         # Toggle completion
         elif key == "x" or key == "space":
-            task_id = table.get_selected_task_id()
-            if task_id is not None:
-                storage.toggle_task(task_id)
-                self.refresh_tasks()
+            task_ids = self.target_task_ids(count)
+            if task_ids:
+                self.toggle_tasks(task_ids)
+            if visual:
+                self.set_visual(False)
             self.last_key = None
         
         # Cycle priority
         elif key == "p":
-            task_id = table.get_selected_task_id()
-            if task_id is not None:
-                storage.cycle_task_priority(task_id)
-                self.refresh_tasks()
+            task_ids = self.target_task_ids(count)
+            if task_ids:
+                self.cycle_priorities(task_ids)
+            if visual:
+                self.set_visual(False)
+            self.last_key = None
+        
+        # Delete the selection with d
+        elif key == "d" and visual:
+            task_ids = self.target_task_ids(1)
+            table.move_cursor(table.selected_rows()[0])
+            self.set_visual(False)
+            self.delete_tasks(task_ids)
             self.last_key = None
         
         # Add new task
@@ -279,31 +590,49 @@ class TodoApp(App):
             task_id = table.get_selected_task_id()
             if task_id is not None:
                 self.editing_id = task_id
-                tasks = storage.load_tasks()
-                current_title = next((t.title for t in tasks if t.id == task_id), "")
-                self.show_input("edit_task", current_title)
+                task = storage.get_task(task_id)
+                self.show_input("edit_task", task.title if task else "")
             self.last_key = None
         
-        # Delete task with dd
+        # Delete task(s) with dd
         elif key == "d":
             if self.last_key == "d":
-                task_id = table.get_selected_task_id()
-                if task_id is not None:
-                    storage.delete_task(task_id)
-                    self.refresh_tasks()
+                task_ids = self.target_task_ids(count)
+                if task_ids:
+                    self.delete_tasks(task_ids)
                 self.last_key = None
             else:
                 self.last_key = "d"
         
+        # Undo (u) and redo (Ctrl+R)
+        elif key == "u" or key == "ctrl+r":
+            self.undo(redo=key == "ctrl+r", count=count)
+            self.last_key = None
+        
+        # Cycle the sort order (s) and hide or show completed tasks (h)
+        elif key == "s":
+            self.set_view_options(SORTS[(SORTS.index(self.sort_mode) + 1) % len(SORTS)], self.hide_completed)
+            self.last_key = None
+        
+        elif key == "h":
+            self.set_view_options(self.sort_mode, not self.hide_completed)
+            self.last_key = None
+        
+        # Filter tasks by title
+        elif key == "slash":
+            self.set_visual(False)
+            self.show_input("search", self.search_query)
+            self.last_key = None
+        
         # Go back to workspaces
         elif key == "backspace":
             self.exit_to_workspaces()
             self.last_key = None
         
-        # G to go to bottom
+        # G to go to bottom, or to row N with a count
         elif key == "G":
             if table.row_count > 0:
-                table.move_cursor(row=table.row_count - 1)
+                table.move_cursor(row=self.count - 1 if self.count else table.row_count - 1)
             self.last_key = None
         
         # gg to go to top
@@ -316,6 +645,10 @@ class TodoApp(App):
         
         else:
             self.last_key = None
+        
+        # The count is used up unless the command is still pending (the first d of dd)
+        if self.last_key is None:
+            self.count = 0
     
     # ─── Input Handling ────────────────────────────────────────────────────────
     
@@ -331,6 +664,7 @@ class TodoApp(App):
             "edit_task": "Edit task title...",
             "add_workspace": "Enter new workspace name...",
             "edit_workspace": "Edit workspace name...",
+            "search": "Search tasks... (Enter to keep the filter, Esc to clear it)",
         }
         task_input.placeholder = placeholders.get(mode, "Enter text...")
         task_input.focus()
@@ -349,23 +683,35 @@ class TodoApp(App):
         else:
             self.query_one(TaskTable).focus()
     
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Narrow the task view as the search query is typed."""
+        if self.input_mode == "search":
+            self.set_search(event.value)
+    
     def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handle input submission."""
         value = event.value.strip()
         
-        if value:
+        if self.input_mode == "search":
+            pass  # The filter was applied as it was typed; keep it
+        elif value:
             if self.input_mode == "add_task":
-                storage.add_task(value, self.current_workspace_id)
-                self.refresh_tasks()
+                task = storage.add_task(value, self.current_workspace_id)
+                if self.is_sorted_view():
+                    self.show_changed_tasks([task])
+                else:
+                    self.view_indexes.place([task])
+                    self.refresh_tasks()
             elif self.input_mode == "edit_task" and self.editing_id is not None:
                 storage.update_task_title(self.editing_id, value)
-                self.refresh_tasks()
+                self.refresh_tasks(changed_task_id=self.editing_id)
             elif self.input_mode == "add_workspace":
                 storage.add_workspace(value)
                 self.refresh_workspaces()
             elif self.input_mode == "edit_workspace" and self.editing_id is not None:
                 storage.update_workspace_name(self.editing_id, value)
                 self.refresh_workspaces()
+            self.changed()
         
         self.hide_input()
     
@@ -374,7 +720,15 @@ class TodoApp(App):
         task_input = self.query_one("#task-input", Input)
         
         if not task_input.has_class("hidden"):
+            if self.input_mode == "search":
+                self.set_search("")
             self.hide_input()
+        elif self.view_mode == "tasks" and (self.count or self.query_one(TaskTable).visual_anchor is not None):
+            self.count = 0
+            self.last_key = None
+            self.set_visual(False)
+        elif self.view_mode == "tasks" and self.search_query:
+            self.set_search("")
         elif self.view_mode == "tasks":
             self.exit_to_workspaces()
         else:
@@ -384,4 +738,7 @@ class TodoApp(App):
 def run_app() -> None:
     """Run the Todo TUI application."""
     app = TodoApp()
-    app.run()
+    try:
+        app.run()
+    finally:
+        storage.flush()  # Anything the writer thread hadn't saved yet
@@ -0,0 +1,507 @@
+"""Storage backend interface shared by the JSON and SQLite stores."""
+
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .fileio import FSYNC_BATCHED, FSYNC_POLICIES
+from .models import PRIORITIES, PRIORITY_CODES, STATUS_CODES, STATUSES, Task, Workspace, WorkspaceStats
+from .search import matches
+from .undo import REDO, UNDO, Change, UndoLog
+
+
+# Flush policies
+FLUSH_IMMEDIATE = "immediate"  # Write after every mutation
+FLUSH_INTERVAL = "interval"  # Write at most once per flush_interval seconds
+FLUSH_MANUAL = "manual"  # Write only on flush() and at process exit
+FLUSH_POLICIES = (FLUSH_IMMEDIATE, FLUSH_INTERVAL, FLUSH_MANUAL)
+
+# Priority filter value that matches tasks without a priority
+PRIORITY_NONE = "none"
+PRIORITY_FILTERS = (*PRIORITIES[1:], PRIORITY_NONE)
+
+
+def filter_codes(status: Optional[str], priority: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Status and priority codes for ``iter_tasks`` filters, None where there is no filter.
+
+    Raises ValueError for a status or priority that doesn't exist.
+    """
+    if status is not None and status not in STATUS_CODES:
+        raise ValueError(f"Unknown status: {status!r} (expected one of {', '.join(STATUSES)})")
+    if priority is not None and priority not in PRIORITY_FILTERS:
+        raise ValueError(f"Unknown priority: {priority!r} (expected one of {', '.join(PRIORITY_FILTERS)})")
+    status_code = None if status is None else STATUS_CODES[status]
+    priority_code = None if priority is None else PRIORITY_CODES[None if priority == PRIORITY_NONE else priority]
+    return status_code, priority_code
+
+
+def filter_tasks(
+    tasks: Iterable[Task],
+    workspace_id: Optional[int],
+    status_code: Optional[int],
+    priority_code: Optional[int],
+) -> Iterator[Task]:
+    """Lazily keep the tasks matching every filter that isn't None."""
+    if workspace_id is not None:
+        tasks = (t for t in tasks if t.workspace_id == workspace_id)
+    if status_code is not None:
+        tasks = (t for t in tasks if t.status_code == status_code)
+    if priority_code is not None:
+        tasks = (t for t in tasks if t.priority_code == priority_code)
+    return iter(tasks)
+
+
+class StorageBackend(ABC):
+    """Interface for a task and workspace store.
+
+    Every mutation returns as soon as the in-memory or transactional state is
+    updated; when it is written is decided by ``flush_policy``, and how hard
+    writes are forced to disk by ``fsync_policy`` (see ``todo.fileio``).
+    Callers that need durability call ``flush()``.
+
+    Inside ``with store.batch():`` nothing is flushed until the block ends,
+    so a batch of mutations is read once and written once.
+
+    ``flush()`` may be called from another thread than the mutations, so a
+    UI can leave writing to a background thread under the manual policy.
+
+    With an ``undo_log`` set, every task and workspace mutation records the
+    prior state of the records it touches (see ``todo.undo``): one change
+    per mutation, or per batch. Archiving, history and the ``replace_*``
+    methods aren't recorded.
+    """
+
+    #: Short name used by the SILO_BACKEND selector
+    name = ""
+
+    def __init__(
+        self,
+        flush_policy: str = FLUSH_IMMEDIATE,
+        flush_interval: float = 1.0,
+        fsync_policy: str = FSYNC_BATCHED,
+    ) -> None:
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy: {flush_policy!r}")
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync_policy!r}")
+        self.flush_policy = flush_policy
+        self.fsync_policy = fsync_policy
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._batch_depth = 0
+        #: Where mutations record their inverse; None disables undo
+        self.undo_log: Optional[UndoLog] = None
+        self._change: Optional[Change] = None  # Inverse of the mutation or batch in progress
+        self._undoing = False
+
+    def _maybe_flush(self) -> None:
+        """Flush after a mutation if the flush policy says so."""
+        if self._batch_depth:
+            return
+        self._end_change()
+        if self.flush_policy == FLUSH_IMMEDIATE:
+            self.flush()
+        elif self.flush_policy == FLUSH_INTERVAL:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Write any pending changes to disk, including the undo log's."""
+
+    def _begin_batch(self) -> None:
+        """Mark the point ``rollback()`` returns to."""
+
+    def _end_batch(self) -> None:
+        """Forget the rollback point of a batch that completed."""
+
+    @abstractmethod
+    def rollback(self) -> None:
+        """Discard the changes made since the current batch began."""
+
+    @contextmanager
+    def batch(self) -> Iterator["StorageBackend"]:
+        """Apply a group of mutations with a single write.
+
+        Inside the block mutations don't flush, whatever the flush policy;
+        the whole batch is written when the block exits, or later if the
+        policy defers writes. If it raises, the batch's changes are rolled
+        back instead, leaving any unwritten changes made before it. A nested
+        batch is part of the outermost one.
+        """
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+
+        self._begin_batch()
+        self._batch_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth = 0
+            self._change = None
+            self.rollback()
+            raise
+        self._batch_depth = 0
+        self._end_batch()
+        self._maybe_flush()
+
+    # ─── Undo ──────────────────────────────────────────────────────────────────
+
+    def _recording(self) -> bool:
+        """Whether mutations should record their inverse."""
+        return self.undo_log is not None and not self._undoing
+
+    def _collect(self, label: str) -> Change:
+        """The change collecting the current mutation's inverse."""
+        if self._change is None:
+            self._change = Change(label)
+        return self._change
+
+    def _remember_tasks(self, label: str, task_ids: Iterable[int], new: bool = False) -> None:
+        """Keep the current state of tasks a mutation is about to change.
+
+        With ``new``, the tasks are being created under these IDs; otherwise
+        IDs not in the store are skipped. Only the first state of a task in
+        a batch is kept.
+        """
+        if not self._recording():
+            return
+        if self._change is not None:
+            task_ids = [i for i in task_ids if i not in self._change.tasks]
+        if new:
+            states = dict.fromkeys(task_ids)
+        else:
+            states = {i: Task.from_codes(*task._fields()) for i, task in self.get_tasks(list(task_ids)).items()}
+        if states:
+            self._collect(label).tasks.update(states)
+
+    def _remember_workspace(self, label: str, workspace_id: int, new: bool = False) -> None:
+        """Keep the current state of a workspace a mutation is about to change."""
+        if not self._recording() or (self._change is not None and workspace_id in self._change.workspaces):
+            return
+        if new:
+            self._collect(label).workspaces[workspace_id] = None
+            return
+        workspace = self.get_workspace(workspace_id)
+        if workspace is not None:
+            self._collect(label).workspaces[workspace_id] = Workspace.from_dict(workspace.to_dict())
+
+    def _end_change(self) -> None:
+        """Hand the finished mutation's inverse to the undo log."""
+        change, self._change = self._change, None
+        if change:
+            self.undo_log.record(change)
+
+    def apply_change(self, change: Change) -> Change:
+        """Put back the records a change holds, in one batch. Returns its inverse.
+
+        Nothing is recorded for undo; the caller decides where the inverse goes.
+        """
+        inverse = Change(change.label)
+        self._undoing = True
+        try:
+            with self.batch():
+                if change.workspaces:
+                    current = {ws.id: ws for ws in self.workspaces()}
+                    for workspace_id in change.workspaces:
+                        workspace = current.get(workspace_id)
+                        inverse.workspaces[workspace_id] = None if workspace is None else Workspace.from_dict(workspace.to_dict())
+                    for workspace_id, workspace in change.workspaces.items():
+                        if workspace is None:
+                            current.pop(workspace_id, None)
+                        else:
+                            current[workspace_id] = Workspace.from_dict(workspace.to_dict())
+                    self.replace_workspaces(sorted(current.values(), key=lambda ws: ws.id))
+
+                found = self.get_tasks(list(change.tasks))
+                for task_id in change.tasks:
+                    task = found.get(task_id)
+                    inverse.tasks[task_id] = None if task is None else Task.from_codes(*task._fields())
+                self.delete_tasks([task_id for task_id, task in change.tasks.items() if task is None])
+                self.restore_tasks([task for task in change.tasks.values() if task is not None])
+        finally:
+            self._undoing = False
+        return inverse
+
+    def _step(self, source: str, target: str) -> Optional[Change]:
+        """Apply the newest change on one stack and push its inverse on the other."""
+        log = self.undo_log
+        if log is None:
+            return None
+        with self._step_lock():
+            change = log.pop(source)
+            if change is None:
+                return None
+            log.push(target, self.apply_change(change))
+        self._maybe_flush()
+        return change
+
+    def _step_lock(self) -> ContextManager:
+        """Lock held from taking a change off one undo stack until its inverse is on the other."""
+        return self.undo_log.lock
+
+    def undo(self) -> Optional[Change]:
+        """Undo the last recorded change. Returns it, or None if there was nothing to undo."""
+        return self._step(UNDO, REDO)
+
+    def redo(self) -> Optional[Change]:
+        """Redo the last undone change. Returns it, or None if there was nothing to redo."""
+        return self._step(REDO, UNDO)
+
+    def reload(self) -> None:
+        """Drop any cached data so the next access re-reads storage."""
+
+    def watched_paths(self) -> List[Path]:
+        """Files that change when another process writes to this store."""
+        return []
+
+    def has_external_changes(self) -> bool:
+        """Check whether another process changed the data since we last read it."""
+        return False
+
+    # ─── Tasks ─────────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def tasks(self, workspace_id: Optional[int] = None) -> List[Task]:
+        """Return tasks in display order, filtered by workspace. None means all tasks."""
+
+    @abstractmethod
+    def get_task(self, task_id: int) -> Optional[Task]:
+        """Look up a task by ID."""
+
+    def task_ids(self, workspace_id: Optional[int] = None) -> List[int]:
+        """Return task IDs in display order, filtered by workspace. None means all tasks."""
+        return [t.id for t in self.tasks(workspace_id)]
+
+    def get_tasks(self, task_ids: List[int]) -> Dict[int, Task]:
+        """Look up several tasks by ID. Missing IDs are left out."""
+        found = {}
+        for task_id in task_ids:
+            task = self.get_task(task_id)
+            if task is not None:
+                found[task_id] = task
+        return found
+
+    def iter_tasks(
+        self,
+        workspace_id: Optional[int] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        """Yield tasks in display order matching every filter given, at most ``limit`` of them.
+
+        ``status`` is pending or completed; ``priority`` is low, medium, high
+        or PRIORITY_NONE for tasks without one. Raises ValueError for any
+        other value.
+        """
+        status_code, priority_code = filter_codes(status, priority)
+        return islice(filter_tasks(self.tasks(workspace_id), None, status_code, priority_code), limit)
+
+    @abstractmethod
+    def replace_tasks(self, tasks: List[Task]) -> None:
+        """Replace every task with the given list."""
+
+    @abstractmethod
+    def add_task(self, title: str, workspace_id: Optional[int] = None) -> Task:
+        """Create a new task at the end of the list."""
+
+    @abstractmethod
+    def insert_task(self, task: Task) -> Task:
+        """Add a copy of ``task`` at the end of the list under a new ID, keeping its other fields."""
+
+    @abstractmethod
+    def delete_task(self, task_id: int) -> bool:
+        """Delete a task by ID. Returns True if task was found and deleted."""
+
+    @abstractmethod
+    def delete_tasks(self, task_ids: List[int]) -> int:
+        """Delete several tasks at once. Returns the number deleted."""
+
+    @abstractmethod
+    def restore_tasks(self, tasks: List[Task]) -> None:
+        """Add or overwrite tasks under their own IDs, keeping every field including rank."""
+
+    @abstractmethod
+    def toggle_task(self, task_id: int) -> bool:
+        """Toggle a task's completion status. Returns True if task was found."""
+
+    @abstractmethod
+    def update_task_title(self, task_id: int, new_title: str) -> bool:
+        """Update a task's title. Returns True if task was found."""
+
+    @abstractmethod
+    def cycle_task_priority(self, task_id: int) -> bool:
+        """Cycle a task's priority. Returns True if task was found."""
+
+    @abstractmethod
+    def move_task_before(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just before another, changing only its rank. Returns True if moved."""
+
+    @abstractmethod
+    def move_task_after(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just after another, changing only its rank. Returns True if moved."""
+
+    def _neighbour_id(self, task_id: int, step: int, workspace_id: Optional[int]) -> Optional[int]:
+        """ID of the task ``step`` (1 or -1) rows away in the list filtered by workspace_id."""
+        ids = self.task_ids(workspace_id)
+        try:
+            i = ids.index(task_id) + step
+        except ValueError:
+            return None
+        return ids[i] if 0 <= i < len(ids) else None
+
+    def move_task_up(self, task_id: int, workspace_id: Optional[int] = None) -> bool:
+        """Move a task above the previous task in the list filtered by workspace_id. Returns True if moved.
+
+        Tasks outside the list are skipped over, so the move is visible
+        however many of them lie in between.
+        """
+        neighbour = self._neighbour_id(task_id, -1, workspace_id)
+        return neighbour is not None and self.move_task_before(task_id, neighbour)
+
+    def move_task_down(self, task_id: int, workspace_id: Optional[int] = None) -> bool:
+        """Move a task below the next task in the list filtered by workspace_id. Returns True if moved."""
+        neighbour = self._neighbour_id(task_id, 1, workspace_id)
+        return neighbour is not None and self.move_task_after(task_id, neighbour)
+
+    def move_task_to(self, task_id: int, index: int, workspace_id: Optional[int] = None) -> bool:
+        """Move a task to row ``index`` of the list filtered by workspace_id. Returns True if moved.
+
+        Negative indexes count from the end, so 0 is the top and -1 the
+        bottom; out-of-range indexes are clamped.
+        """
+        ids = self.task_ids(workspace_id)
+        if task_id not in ids or len(ids) < 2:
+            return False
+        if index < 0:
+            index += len(ids)
+        index = max(0, min(index, len(ids) - 1))
+        ids.remove(task_id)
+        if index == 0:
+            return self.move_task_before(task_id, ids[0])
+        return self.move_task_after(task_id, ids[index - 1])
+
+    @abstractmethod
+    def clear_completed(self) -> int:
+        """Remove all completed tasks and archive them to history. Returns number of tasks archived."""
+
+    @abstractmethod
+    def workspace_task_count(self, workspace_id: int) -> int:
+        """Get the number of tasks in a workspace."""
+
+    def workspace_stats(self) -> Dict[Optional[int], WorkspaceStats]:
+        """Get task counts for every workspace in a single pass.
+
+        Keyed by workspace ID; unassigned tasks are counted under None.
+        Workspaces without tasks are absent.
+        """
+        stats: Dict[Optional[int], WorkspaceStats] = {}
+        for task in self.tasks():
+            ws_stats = stats.get(task.workspace_id)
+            if ws_stats is None:
+                ws_stats = stats[task.workspace_id] = WorkspaceStats()
+            ws_stats.add_task(task)
+        return stats
+
+    # ─── Search ────────────────────────────────────────────────────────────────
+
+    def search_task_ids(self, query: str, workspace_id: Optional[int] = None) -> List[int]:
+        """IDs of tasks whose titles match ``query``, in display order.
+
+        Each query word matches the start of a word in the title, and every
+        word must match. An empty query matches every task. Backends should
+        override this with an indexed lookup.
+        """
+        return [t.id for t in self.tasks(workspace_id) if matches(query, t.title)]
+
+    def search_history(self, query: str, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks whose titles match ``query``, newest first."""
+        return (t for t in self.iter_history(workspace_id=workspace_id) if matches(query, t.title))
+
+    # ─── History ───────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def load_history(self) -> List[Task]:
+        """Load all archived tasks, oldest first."""
+
+    def iter_history(self, since: Optional[str] = None, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks newest first.
+
+        ``since`` is an ISO date or timestamp; only tasks completed at or
+        after it are returned. Backends should override this to avoid
+        loading the whole history.
+        """
+        for task in reversed(self.load_history()):
+            if since is not None and (task.completed_at is None or task.completed_at < since):
+                continue
+            if workspace_id is not None and task.workspace_id != workspace_id:
+                continue
+            yield task
+
+    def history_count(self) -> int:
+        """Number of archived tasks."""
+        return len(self.load_history())
+
+    @abstractmethod
+    def save_history(self, tasks: List[Task]) -> None:
+        """Replace the history with the given tasks."""
+
+    @abstractmethod
+    def clear_history(self) -> int:
+        """Clear all history. Returns number of tasks removed."""
+
+    # ─── Workspaces ────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def workspaces(self) -> List[Workspace]:
+        """Return all workspaces."""
+
+    @abstractmethod
+    def get_workspace(self, workspace_id: int) -> Optional[Workspace]:
+        """Look up a workspace by ID."""
+
+    @abstractmethod
+    def replace_workspaces(self, workspaces: List[Workspace]) -> None:
+        """Replace every workspace with the given list."""
+
+    @abstractmethod
+    def add_workspace(self, name: str) -> Workspace:
+        """Create a new workspace."""
+
+    @abstractmethod
+    def delete_workspace(self, workspace_id: int) -> bool:
+        """Delete a workspace and all its tasks. Returns True if found and deleted."""
+
+    @abstractmethod
+    def update_workspace_name(self, workspace_id: int, new_name: str) -> bool:
+        """Update a workspace's name. Returns True if found."""
+
+
+def copy_store(source: StorageBackend, target: StorageBackend) -> None:
+    """Copy all workspaces, tasks and history from one backend to another.
+
+    IDs and ordering are preserved. Raises RuntimeError if the target doesn't
+    hold the same number of records afterwards.
+    """
+    workspaces = source.workspaces()
+    tasks = source.tasks()
+    history = source.load_history()
+
+    target.replace_workspaces(workspaces)
+    target.replace_tasks(tasks)
+    target.save_history(history)
+    target.flush()
+
+    copied = (len(target.workspaces()), len(target.tasks()), len(target.load_history()))
+    expected = (len(workspaces), len(tasks), len(history))
+    if copied != expected:
+        raise RuntimeError(f"Copy incomplete: expected {expected} records, found {copied}")
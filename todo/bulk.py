@@ -0,0 +1,150 @@
+"""Bulk import and export of tasks as JSON Lines or CSV.
+
+Both formats carry the same fields for each task: id, title, workspace (by
+name), status, priority, created_at and completed_at. Only ``title`` is
+required on import. Imported tasks are given new IDs and added after the
+existing ones, and workspaces named in the file are created if they don't
+exist. Records are read and written one at a time, and an import runs as a
+single store batch, so it is written once and a bad record leaves the
+store untouched.
+"""
+
+import csv
+import json
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple
+
+from .backend import StorageBackend
+from .models import PRIORITY_CODES, STATUS_CODES, Task, now_timestamp
+
+
+FORMATS = ("jsonl", "csv")
+FIELDS = ("id", "title", "workspace", "status", "priority", "created_at", "completed_at")
+
+
+def format_for_path(path: str) -> str:
+    """Pick a format from a file name: CSV for ``.csv`` files, JSON Lines otherwise."""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+# ─── Import ────────────────────────────────────────────────────────────────────
+
+def read_records(f: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, record) pairs from a JSON Lines or CSV file.
+
+    Blank lines are skipped. Raises ValueError for a line that isn't a JSON
+    object.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: invalid JSON ({e.msg})") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_number}: expected a JSON object")
+        yield line_number, record
+
+
+def task_from_record(record: dict, workspace_id: Optional[int]) -> Task:
+    """Build a task from an imported record. Empty fields count as missing.
+
+    A completed task without a completion time is taken as completed now.
+    """
+    title = record.get("title")
+    if not title or not isinstance(title, str):
+        raise ValueError("missing title")
+    status = record.get("status") or "pending"
+    if status not in STATUS_CODES:
+        raise ValueError(f"unknown status {status!r}")
+    priority = record.get("priority") or None
+    if priority not in PRIORITY_CODES:
+        raise ValueError(f"unknown priority {priority!r}")
+
+    task = Task(
+        id=0,
+        title=title,
+        workspace_id=workspace_id,
+        status=status,
+        created_at=record.get("created_at") or None,
+        completed_at=record.get("completed_at") or None,
+        priority=priority,
+    )
+    if task.is_completed() and task.completed_ts is None:
+        task.completed_ts = now_timestamp()
+    return task
+
+
+def import_tasks(
+    store: StorageBackend,
+    records: Iterable[Tuple[int, dict]],
+    workspace_id: Optional[int] = None,
+) -> int:
+    """Add every record to the store in one batch. Returns the number of tasks added.
+
+    ``workspace_id`` puts every task in that workspace; otherwise each goes
+    to the workspace named in its record, or none. Raises ValueError,
+    naming the line, for a bad record; nothing is imported then.
+    """
+    workspaces: Dict[str, int] = {ws.name.lower(): ws.id for ws in store.workspaces()}
+    count = 0
+    with store.batch():
+        for line_number, record in records:
+            try:
+                target = workspace_id
+                name = record.get("workspace")
+                if target is None and name:
+                    target = workspaces.get(str(name).lower())
+                    if target is None:
+                        target = workspaces[str(name).lower()] = store.add_workspace(str(name)).id
+                task = task_from_record(record, target)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Line {line_number}: {e}") from None
+            store.insert_task(task)
+            count += 1
+    return count
+
+
+# ─── Export ────────────────────────────────────────────────────────────────────
+
+def export_records(store: StorageBackend, workspace_id: Optional[int] = None) -> Iterator[dict]:
+    """Yield a record for each task in display order, optionally from one workspace."""
+    names = {ws.id: ws.name for ws in store.workspaces()}
+    return task_records(store.tasks(workspace_id), names)
+
+
+def task_records(tasks: Iterable[Task], names: Dict[int, str]) -> Iterator[dict]:
+    """Yield a record for each task, naming workspaces from ``names`` (workspace ID to name)."""
+    for task in tasks:
+        yield {
+            "id": task.id,
+            "title": task.title,
+            "workspace": names.get(task.workspace_id),
+            "status": task.status,
+            "priority": task.priority,
+            "created_at": task.created_at,
+            "completed_at": task.completed_at,
+        }
+
+
+def write_records(f: IO[str], records: Iterable[dict], fmt: str) -> int:
+    """Write records as JSON Lines or CSV. Returns the number written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+        return count
+
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
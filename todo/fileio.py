@@ -0,0 +1,243 @@
+"""Crash-safe file writes and corruption recovery for the storage files.
+
+Every file is written to a temporary file and renamed over the original, so
+a crash or Ctrl-C leaves either the old or the new contents, never a
+truncated file. The previous version is kept as ``<name>.bak`` and is used
+to recover if the main file is ever found corrupted.
+
+How often data is forced to disk is set by the fsync policy:
+
+- ``always``: fsync every write before it is renamed into place
+- ``batched``: fsync pending files at most once per second and at exit
+- ``never``: leave it to the operating system
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Optional, Set, Tuple
+
+from . import perf
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FSYNC_ALWAYS = "always"
+FSYNC_BATCHED = "batched"
+FSYNC_NEVER = "never"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_BATCHED, FSYNC_NEVER)
+
+# Seconds between fsyncs under the batched policy
+BATCH_INTERVAL = 1.0
+
+# Files written since the last batched sync. Written to from the writer and
+# compactor threads too, so it is only read or swapped under _sync_lock.
+_pending_sync: Set[Path] = set()
+_sync_lock = threading.Lock()
+_last_batch_sync = time.monotonic()
+
+
+class CorruptFileError(Exception):
+    """A storage file couldn't be parsed and there was no good backup."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(
+            f"{path} is corrupted and no valid backup was found. "
+            f"Fix or remove the file to continue."
+        )
+        self.path = path
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Return (mtime_ns, size, inode) for a file, or None if it doesn't exist.
+
+    Atomic writes always create a new inode, so any rewrite changes the signature.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileLock:
+    """Reentrant advisory lock shared by every process using the same lock file.
+
+    The lock file also holds a generation counter that writers bump after
+    each committed write, so a process can tell whether anyone else wrote
+    since it last synced. Uses fcntl.flock; where that is unavailable only
+    threads within this process are serialized.
+    """
+
+    # The lock file holds fixed-width decimal counters
+    SLOT_WIDTH = 20
+    GENERATION_SLOT = 0
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def _read_slot(self, slot: int) -> int:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(slot * self.SLOT_WIDTH)
+                data = f.read(self.SLOT_WIDTH)
+        except FileNotFoundError:
+            return 0
+        try:
+            return int(data)
+        except ValueError:
+            return 0
+
+    def _write_slot(self, slot: int, value: int) -> None:
+        os.pwrite(self._fd, str(value).rjust(self.SLOT_WIDTH).encode(), slot * self.SLOT_WIDTH)
+
+    def generation(self) -> int:
+        """Read the current generation. Safe to call without holding the lock."""
+        return self._read_slot(self.GENERATION_SLOT)
+
+    def bump_generation(self) -> int:
+        """Increment the generation. Must be called while holding the lock."""
+        generation = self.generation() + 1
+        self._write_slot(self.GENERATION_SLOT, generation)
+        return generation
+
+
+def backup_path(path: Path) -> Path:
+    """Path of the last-good copy kept for ``path``."""
+    return path.with_name(path.name + ".bak")
+
+
+def _fsync_path(path: Path) -> None:
+    """fsync a file or directory by path, ignoring files that have gone away."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Some platforms can't fsync directories
+    finally:
+        os.close(fd)
+
+
+def sync_pending() -> None:
+    """fsync every file written under the batched policy since the last sync."""
+    global _pending_sync, _last_batch_sync
+    with _sync_lock:
+        paths, _pending_sync = _pending_sync, set()
+    for path in paths:
+        _fsync_path(path)
+    for directory in {p.parent for p in paths}:
+        _fsync_path(directory)
+    _last_batch_sync = time.monotonic()
+
+
+atexit.register(sync_pending)
+
+
+def after_write(path: Path, fsync_policy: str) -> None:
+    """Apply the fsync policy to a file that was just written or appended to.
+
+    Under ``always`` the caller is expected to have synced already; this only
+    handles the batched policy's bookkeeping.
+    """
+    if fsync_policy == FSYNC_BATCHED:
+        with _sync_lock:
+            _pending_sync.add(path)
+        if time.monotonic() - _last_batch_sync >= BATCH_INTERVAL:
+            sync_pending()
+
+
+def atomic_write_bytes(path: Path, data: bytes, fsync_policy: str = FSYNC_BATCHED, backup: bool = True) -> None:
+    """Replace ``path`` with ``data`` atomically, keeping the old version as a backup."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if fsync_policy == FSYNC_ALWAYS:
+            f.flush()
+            os.fsync(f.fileno())
+    perf.count_written(len(data))
+
+    if backup and path.exists():
+        bak_tmp = path.with_name(f"{path.name}.{os.getpid()}.bak.tmp")
+        try:
+            os.link(path, bak_tmp)
+            os.replace(bak_tmp, backup_path(path))
+        except OSError:
+            pass  # Hard links unsupported; go without a backup
+
+    os.replace(tmp, path)
+    if fsync_policy == FSYNC_ALWAYS:
+        _fsync_path(path.parent)
+    after_write(path, fsync_policy)
+
+
+def atomic_write_text(path: Path, data: str, fsync_policy: str = FSYNC_BATCHED, backup: bool = True) -> None:
+    """Replace ``path`` with ``data`` as UTF-8, atomically, keeping the old version as a backup."""
+    atomic_write_bytes(path, data.encode(), fsync_policy, backup)
+
+
+def read_recovering(path: Path, parse: Callable[[bytes], Any], default: Any) -> Any:
+    """Read a file and parse its contents, recovering from its backup if it is corrupted.
+
+    ``parse`` raises ValueError for contents it can't parse. Returns
+    ``default`` if the file doesn't exist. Raises CorruptFileError if
+    neither the file nor its backup can be parsed.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return default
+    perf.count_read(len(data))
+
+    try:
+        return parse(data)
+    except ValueError:  # Includes JSONDecodeError and UnicodeDecodeError
+        pass
+
+    bak = backup_path(path)
+    try:
+        bak_data = bak.read_bytes()
+        result = parse(bak_data)
+    except (FileNotFoundError, ValueError):
+        raise CorruptFileError(path) from None
+
+    # Keep the damaged file around for inspection, then restore the backup
+    os.replace(path, path.with_name(f"{path.name}.corrupt-{int(time.time())}"))
+    atomic_write_bytes(path, bak_data, FSYNC_ALWAYS, backup=False)
+    warnings.warn(f"{path} was corrupted; restored the last good copy from {bak}")
+    return result
+
+
+def read_json(path: Path, default: Any) -> Any:
+    """Read a JSON file, recovering from its backup if it is corrupted (see ``read_recovering``)."""
+    return read_recovering(path, json.loads, default)
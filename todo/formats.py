@@ -0,0 +1,268 @@
+"""On-disk formats for the task snapshot (``tasks.json``).
+
+- ``json``: a list of task dictionaries indented for reading, as written
+  by older versions. Files without a header are read as this format.
+- ``compact``: one JSON object holding a header and a row per task, each
+  row a list of the task's encoded fields. Still valid JSON, but about a
+  third of the size, and rows load without parsing dates.
+- ``jsonl``: a header line, then one row per line, so a reader can stop
+  early or process one task at a time.
+- ``binary``: a header, then each field stored as a ``marshal``-encoded
+  column. Fastest to load and save, and ``read_columns`` decodes only
+  the columns it is asked for.
+
+The header records the format, its version and the field order:
+``{"format": "compact", "version": 1, "fields": [...], "seq": 0, ...}``.
+Readers detect the format from the header, so every format loads
+whatever the store is set to write.
+"""
+
+import json
+import marshal
+import re
+import struct
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from .models import Task
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMAT_JSONL = "jsonl"
+FORMAT_BINARY = "binary"
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT, FORMAT_JSONL, FORMAT_BINARY)
+# Readable by every version of silo; the others are opt-in
+DEFAULT_FORMAT = FORMAT_JSON
+
+VERSION = 1
+# Field order of rows and columns, matching Task.from_codes
+FIELDS = ("id", "title", "workspace_id", "status_code", "priority_code", "created_ts", "completed_ts", "rank")
+# Values for fields missing from a file written with fewer fields
+FIELD_DEFAULTS = {"workspace_id": None, "status_code": 0, "priority_code": 0, "completed_ts": None, "rank": 0}
+
+BINARY_MAGIC = b"SILO-BIN\n"
+_HEADER = re.compile(rb'\s*\{"format":\s*"(\w+)"')
+_LENGTH = struct.Struct("<I")
+
+
+class UnsupportedFormatError(Exception):
+    """A tasks file was written in a format or version this version of silo can't read."""
+
+
+class TaskFormat:
+    """Encodes a snapshot (sequence number plus tasks) to bytes and back."""
+
+    name = ""
+
+    def dump(self, seq: int, tasks: Sequence[Task]) -> bytes:
+        raise NotImplementedError
+
+    def load(self, data: bytes) -> Tuple[int, List[Task]]:
+        raise NotImplementedError
+
+    def read_columns(self, data: bytes, fields: Sequence[str]) -> Dict[str, list]:
+        """Return only the given fields, one list per field in task order."""
+        _, tasks = self.load(data)
+        return {field: [getattr(task, field) for task in tasks] for field in fields}
+
+
+def _header(name: str, seq: int) -> dict:
+    return {"format": name, "version": VERSION, "fields": FIELDS, "seq": seq}
+
+
+def _check_header(header: dict) -> List[str]:
+    """Return the field order of a file after checking that it is readable."""
+    if header.get("version", VERSION) > VERSION:
+        raise UnsupportedFormatError(
+            f"Tasks file is {header['format']} version {header['version']}; this silo reads up to {VERSION}"
+        )
+    return header.get("fields", FIELDS)
+
+
+def _tasks_from_rows(fields: Sequence[str], rows) -> List[Task]:
+    """Build tasks from rows whose fields are in ``fields`` order."""
+    from_codes = Task.from_codes
+    if tuple(fields) == FIELDS:
+        return [from_codes(*row) for row in rows]
+    positions = [fields.index(field) if field in fields else None for field in FIELDS]
+    defaults = [FIELD_DEFAULTS.get(field) for field in FIELDS]
+    return [
+        from_codes(*[default if i is None else row[i] for i, default in zip(positions, defaults)])
+        for row in rows
+    ]
+
+
+def _pick(fields: Sequence[str], rows, wanted: Sequence[str]) -> Dict[str, list]:
+    columns = {}
+    for field in wanted:
+        if field in fields:
+            i = fields.index(field)
+            columns[field] = [row[i] for row in rows]
+        else:
+            columns[field] = [FIELD_DEFAULTS.get(field)] * len(rows)
+    return columns
+
+
+class LegacyJSON(TaskFormat):
+    """Indented list of task dictionaries; with a journal, ``{"seq": n, "tasks": [...]}``."""
+
+    name = FORMAT_JSON
+
+    def dump(self, seq: int, tasks: Sequence[Task]) -> bytes:
+        items = [task.to_dict() for task in tasks]
+        return json.dumps({"seq": seq, "tasks": items} if seq else items, indent=2).encode()
+
+    def _items(self, data: bytes) -> Tuple[int, list]:
+        data = json.loads(data)
+        if isinstance(data, dict):
+            return data.get("seq", 0), data.get("tasks", [])
+        if isinstance(data, list):
+            return 0, data
+        return 0, []
+
+    def load(self, data: bytes) -> Tuple[int, List[Task]]:
+        seq, items = self._items(data)
+        return seq, [Task.from_dict(item) for item in items]  # A task without an id or title is damage
+
+
+class CompactJSON(TaskFormat):
+    """One JSON object: the header plus ``"tasks"``, a list of rows."""
+
+    name = FORMAT_COMPACT
+
+    def dump(self, seq: int, tasks: Sequence[Task]) -> bytes:
+        data = _header(self.name, seq)
+        data["tasks"] = [task._fields() for task in tasks]
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def load(self, data: bytes) -> Tuple[int, List[Task]]:
+        data = json.loads(data)
+        return data.get("seq", 0), _tasks_from_rows(_check_header(data), data["tasks"])
+
+    def read_columns(self, data: bytes, fields: Sequence[str]) -> Dict[str, list]:
+        data = json.loads(data)
+        return _pick(_check_header(data), data["tasks"], fields)
+
+
+class JSONLines(TaskFormat):
+    """A header line followed by one row per line."""
+
+    name = FORMAT_JSONL
+
+    def dump(self, seq: int, tasks: Sequence[Task]) -> bytes:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        lines = [dumps(_header(self.name, seq))]
+        lines.extend(dumps(task._fields()) for task in tasks)
+        lines.append("")
+        return "\n".join(lines).encode()
+
+    def iter_rows(self, data: bytes) -> Tuple[dict, Iterator[list]]:
+        """Return the header and an iterator decoding the rows one at a time."""
+        lines = data.splitlines()
+        header = json.loads(lines[0])
+        _check_header(header)
+        return header, map(json.loads, lines[1:])
+
+    def _all_rows(self, data: bytes) -> Tuple[dict, list]:
+        # Decoding every row as one JSON array is much faster than line by line
+        header_line, _, body = data.partition(b"\n")
+        header = json.loads(header_line)
+        _check_header(header)
+        return header, json.loads(b"[" + b",".join(body.splitlines()) + b"]")
+
+    def load(self, data: bytes) -> Tuple[int, List[Task]]:
+        header, rows = self._all_rows(data)
+        return header.get("seq", 0), _tasks_from_rows(header.get("fields", FIELDS), rows)
+
+    def read_columns(self, data: bytes, fields: Sequence[str]) -> Dict[str, list]:
+        header, rows = self._all_rows(data)
+        return _pick(header.get("fields", FIELDS), rows, fields)
+
+
+class Binary(TaskFormat):
+    """Magic line, header length and JSON header, then one marshal blob per field.
+
+    The header lists each column's byte length, so a reader can slice out
+    and decode just the columns it needs.
+    """
+
+    name = FORMAT_BINARY
+
+    def dump(self, seq: int, tasks: Sequence[Task]) -> bytes:
+        rows = [task._fields() for task in tasks]
+        blobs = [marshal.dumps([*column]) for column in zip(*rows)] if rows else [marshal.dumps([])] * len(FIELDS)
+        header = _header(self.name, seq)
+        header["count"] = len(rows)
+        header["lengths"] = [len(blob) for blob in blobs]
+        header = json.dumps(header, separators=(",", ":")).encode()
+        return b"".join([BINARY_MAGIC, _LENGTH.pack(len(header)), header, *blobs])
+
+    def _columns(self, data: bytes, wanted: Sequence[str]) -> Tuple[dict, Dict[str, list]]:
+        start = len(BINARY_MAGIC)
+        (length,) = _LENGTH.unpack_from(data, start)
+        start += _LENGTH.size
+        header = json.loads(data[start:start + length])
+        fields = _check_header(header)
+        start += length
+
+        columns = {}
+        for field, size in zip(fields, header["lengths"]):
+            if field in wanted:
+                column = marshal.loads(data[start:start + size])
+                if len(column) != header["count"]:
+                    raise ValueError(f"Column {field} has {len(column)} values, expected {header['count']}")
+                columns[field] = column
+            start += size
+        for field in wanted:
+            if field not in columns:
+                columns[field] = [FIELD_DEFAULTS.get(field)] * header["count"]
+        return header, columns
+
+    def load(self, data: bytes) -> Tuple[int, List[Task]]:
+        header, columns = self._columns(data, FIELDS)
+        return header.get("seq", 0), [*map(Task.from_codes, *(columns[field] for field in FIELDS))]
+
+    def read_columns(self, data: bytes, fields: Sequence[str]) -> Dict[str, list]:
+        return self._columns(data, fields)[1]
+
+
+_FORMATS: Dict[str, TaskFormat] = {fmt.name: fmt for fmt in (LegacyJSON(), CompactJSON(), JSONLines(), Binary())}
+
+
+def get_format(name: str) -> TaskFormat:
+    """Look up a format by name."""
+    try:
+        return _FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown tasks file format: {name!r} (expected one of {', '.join(FORMATS)})") from None
+
+
+def detect(data: bytes) -> TaskFormat:
+    """Find the format a file was written in from its first bytes."""
+    if data.startswith(BINARY_MAGIC):
+        return _FORMATS[FORMAT_BINARY]
+    match = _HEADER.match(data[:64])
+    if match is None:
+        return _FORMATS[FORMAT_JSON]
+    name = match.group(1).decode()
+    if name not in _FORMATS:
+        raise UnsupportedFormatError(f"Tasks file is in the {name} format, which this silo can't read")
+    return _FORMATS[name]
+
+
+def loads(data: bytes) -> Tuple[int, List[Task]]:
+    """Decode a snapshot in any format. Raises ValueError if it is damaged."""
+    try:
+        return detect(data).load(data)
+    except (KeyError, IndexError, TypeError, EOFError, struct.error) as e:
+        raise ValueError(f"Damaged tasks file: {e}") from e
+
+
+def read_columns(data: bytes, fields: Sequence[str]) -> Dict[str, list]:
+    """Decode only some fields of a snapshot in any format, one list per field."""
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown task fields: {', '.join(sorted(unknown))}")
+    try:
+        return detect(data).read_columns(data, fields)
+    except (KeyError, IndexError, TypeError, EOFError, struct.error) as e:
+        raise ValueError(f"Damaged tasks file: {e}") from e
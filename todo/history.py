@@ -0,0 +1,422 @@
+"""Append-only, segmented history of archived tasks.
+
+History lives in its own directory as one newline-delimited JSON segment per
+month of archiving (``2024-05.jsonl``) plus a small ``manifest.json``. The
+manifest lists the segments oldest first with the committed size in bytes
+and the number of entries of each; it is the only file ever rewritten.
+
+- Archiving appends to the newest segment and then rewrites the manifest, so
+  it costs time proportional to the tasks archived, not to the history.
+- Clearing empties the manifest; the segment files are deleted afterwards.
+- Bytes past a segment's committed size, left by an interrupted append, are
+  never read and are overwritten by the next append.
+
+Each line is a task dictionary plus ``archived_at``, the time it was moved
+to history. Lines are in ``archived_at`` order, which lets a ``since``
+filter stop reading as soon as it reaches older entries, and skip whole
+segments from earlier months.
+
+``index.json`` is a search index over the titles (see ``todo.search``),
+keyed by the byte offset of each line, counting all segments as if they
+were one file, so a match is read with a single seek. It records how much
+of each segment it covers and is brought up to date when history is
+searched.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from . import perf
+from .fileio import (
+    FSYNC_ALWAYS, FSYNC_BATCHED, FSYNC_NEVER, FileLock, after_write, atomic_write_bytes, atomic_write_text, read_json,
+    read_recovering,
+)
+from .models import Task
+from .search import SearchIndex
+
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+INDEX_NAME = "index.json"
+SEGMENT_SUFFIX = ".jsonl"
+# Segment for entries with no archive time
+UNDATED = "0000-00"
+
+# Bytes read per step when scanning backwards
+BLOCK_SIZE = 64 * 1024
+
+
+def read_lines_reversed(path: Path, end: Optional[int] = None, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Yield the lines of a file from last to first, reading it in blocks from ``end``."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        if end is not None:
+            position = min(position, end)
+        partial = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + partial).split(b"\n")
+            partial = lines[0]  # May continue in the previous block
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line
+        if partial:
+            yield partial
+
+
+def _is_entry(item) -> bool:
+    """Whether a parsed entry is a task record, with at least an id and a title."""
+    return isinstance(item, dict) and "id" in item and "title" in item
+
+
+def _decode(line: bytes) -> Optional[dict]:
+    """Parse one history line, or None for a torn or damaged line."""
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return item if _is_entry(item) else None
+
+
+def _parse_legacy(data: bytes) -> list:
+    """Parse an old ``history.json`` list. Raises ValueError if any entry is damaged."""
+    items = json.loads(data)
+    if not isinstance(items, list):
+        return []
+    if not all(map(_is_entry, items)):
+        raise ValueError("Damaged entry in history.json")
+    return items
+
+
+def _encode(item: dict) -> bytes:
+    return (json.dumps(item, separators=(",", ":")) + "\n").encode()
+
+
+def _month(archived_at: Optional[str]) -> str:
+    return archived_at[:7] if archived_at else UNDATED
+
+
+def _backfill(items: Iterable[dict]) -> List[dict]:
+    """Give items without ``archived_at`` an estimate based on ``completed_at``.
+
+    The estimate never goes backwards, so the items stay in archived_at order.
+    """
+    result = []
+    latest = ""
+    for item in items:
+        if not item.get("archived_at"):
+            latest = max(latest, item.get("completed_at") or "")
+            item["archived_at"] = latest or None
+        result.append(item)
+    return result
+
+
+class HistoryLog:
+    """Segmented history stored in ``directory``.
+
+    Older single-file histories in ``legacy_paths`` (a ``history.json`` list
+    or a ``history.jsonl`` log) are converted on first use. Writes take
+    ``lock``; reads don't, since segments only ever grow up to the size the
+    manifest records.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        legacy_paths: Sequence[Path] = (),
+        lock: Optional[FileLock] = None,
+        fsync_policy: str = FSYNC_BATCHED,
+    ) -> None:
+        self.directory = directory
+        self.manifest_path = directory / MANIFEST_NAME
+        self.legacy_paths = list(legacy_paths)
+        self.lock = lock or FileLock(directory / ".lock")
+        self.fsync_policy = fsync_policy
+        self.index_path = directory / INDEX_NAME
+        self._index: Optional[SearchIndex] = None
+        self._indexed: List[list] = []  # [name, size] of each segment covered by _index
+        self._indexed_epoch = 0
+
+    # ─── Manifest ──────────────────────────────────────────────────────────────
+
+    def _read_manifest(self) -> dict:
+        """The manifest: ``segments``, oldest first, and ``epoch``, bumped whenever history is rewritten."""
+        manifest = read_json(self.manifest_path, {})
+        if not isinstance(manifest, dict):
+            manifest = {}
+        manifest.setdefault("epoch", 0)
+        manifest.setdefault("segments", [])
+        return manifest
+
+    def _segments(self) -> List[dict]:
+        """Segments listed in the manifest, oldest first."""
+        self._migrate()
+        return self._read_manifest()["segments"]
+
+    def _write_manifest(self, segments: List[dict], rewritten: bool = False) -> None:
+        """Commit a new segment list. Set ``rewritten`` unless it only appends to the old one."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        epoch = self._read_manifest()["epoch"] + (1 if rewritten else 0)
+        data = {"version": MANIFEST_VERSION, "epoch": epoch, "segments": segments}
+        atomic_write_text(self.manifest_path, json.dumps(data, indent=2), self.fsync_policy)
+
+    def _remove_unlisted(self, segments: List[dict]) -> None:
+        """Delete segment files the manifest no longer refers to."""
+        listed = {segment["name"] for segment in segments}
+        for path in self.directory.glob(f"*{SEGMENT_SUFFIX}"):
+            if path.name not in listed:
+                path.unlink(missing_ok=True)
+
+    def _migrate(self) -> None:
+        """Convert single-file histories from older versions into segments."""
+        legacy = [path for path in self.legacy_paths if path.exists()]
+        if not legacy:
+            return
+        with self.lock:
+            legacy = [path for path in self.legacy_paths if path.exists()]
+            if not legacy:
+                return
+            items = []
+            for path in legacy:
+                if path.suffix == ".json":
+                    items.extend(read_recovering(path, _parse_legacy, []))
+                else:
+                    with open(path, "rb") as f:
+                        items.extend(item for item in map(_decode, f) if item is not None)
+            items.extend(self._items(self._read_manifest()["segments"]))
+            self._rewrite(items)
+            for path in legacy:
+                path.unlink()
+
+    # ─── Reading ───────────────────────────────────────────────────────────────
+
+    def _items(self, segments: List[dict]) -> Iterator[dict]:
+        """Yield the raw entries of ``segments``, oldest first."""
+        for segment in segments:
+            try:
+                with open(self.directory / segment["name"], "rb") as f:
+                    data = f.read(segment["size"])
+            except FileNotFoundError:
+                continue
+            for line in data.splitlines():
+                item = _decode(line)
+                if item is not None:
+                    yield item
+
+    def __iter__(self) -> Iterator[Task]:
+        """Yield archived tasks, oldest first."""
+        for item in self._items(self._segments()):
+            yield Task.from_dict(item)
+
+    def newest_first(self, since: Optional[str] = None, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks, newest first, decoding lines only as they are consumed.
+
+        ``since`` is an ISO date or timestamp; only tasks completed at or
+        after it are returned. ``workspace_id`` limits results to one
+        workspace.
+        """
+        for segment in reversed(self._segments()):
+            if since is not None and segment["name"][:7] < since[:7]:
+                return  # Whole segment, and everything before it, was archived earlier
+            for line in read_lines_reversed(self.directory / segment["name"], segment["size"]):
+                item = _decode(line)
+                if item is None:
+                    continue
+                if since is not None:
+                    archived_at = item.get("archived_at") or item.get("completed_at")
+                    if archived_at is not None and archived_at < since:
+                        return  # Everything further back was archived even earlier
+                    completed_at = item.get("completed_at")
+                    if completed_at is None or completed_at < since:
+                        continue
+                if workspace_id is not None and item.get("workspace_id") != workspace_id:
+                    continue
+                yield Task.from_dict(item)
+
+    def count(self) -> int:
+        """Number of archived tasks, read from the manifest."""
+        return sum(segment["count"] for segment in self._segments())
+
+    def load(self) -> List[Task]:
+        """Read the whole history, oldest first."""
+        return list(self)
+
+    # ─── Search ────────────────────────────────────────────────────────────────
+
+    def _read_index(self) -> None:
+        """Load the saved search index, if there is a readable one."""
+        try:
+            data = json.loads(self.index_path.read_text())
+            self._index = SearchIndex.from_dict(data)
+            self._indexed = data["segments"]
+            self._indexed_epoch = data["epoch"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            self._index, self._indexed = None, []
+
+    def _update_index(self, manifest: dict) -> SearchIndex:
+        """Index whatever was appended since the index was last saved.
+
+        Starts over if the history was cleared or rewritten in the meantime.
+        """
+        if self._index is None:
+            self._read_index()
+        segments = manifest["segments"]
+        indexed = self._indexed
+        consistent = (
+            self._index is not None and self._indexed_epoch == manifest["epoch"] and len(indexed) <= len(segments)
+        ) and all(
+            name == segment["name"] and (size == segment["size"] or (i == len(indexed) - 1 and size <= segment["size"]))
+            for i, ((name, size), segment) in enumerate(zip(indexed, segments))
+        )
+        if not consistent:
+            indexed = []
+
+        changed = not consistent
+        documents = []
+        base = 0
+        for i, segment in enumerate(segments):
+            start = indexed[i][1] if i < len(indexed) else 0
+            if start < segment["size"]:
+                try:
+                    with open(self.directory / segment["name"], "rb") as f:
+                        f.seek(start)
+                        data = f.read(segment["size"] - start)
+                except FileNotFoundError:
+                    data = b""
+                offset = base + start
+                for line in data.split(b"\n"):
+                    item = _decode(line) if line else None
+                    if item is not None:
+                        documents.append((offset, item.get("title", "")))
+                    offset += len(line) + 1
+                if i < len(indexed):
+                    indexed[i] = [segment["name"], segment["size"]]
+                else:
+                    indexed.append([segment["name"], segment["size"]])
+                changed = True
+            base += segment["size"]
+
+        if not consistent:
+            self._index = SearchIndex.build(documents)
+        else:
+            for key, title in documents:
+                self._index.add(key, title)
+        self._indexed = indexed
+        self._indexed_epoch = manifest["epoch"]
+        if changed:
+            data = self._index.to_dict()
+            data["epoch"] = manifest["epoch"]
+            data["segments"] = indexed
+            atomic_write_text(self.index_path, json.dumps(data), FSYNC_NEVER, backup=False)
+        return self._index
+
+    def search(self, query: str, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks whose titles match ``query``, newest first."""
+        self._migrate()
+        manifest = self._read_manifest()
+        found = self._update_index(manifest).search(query)
+        if found is None:
+            yield from self.newest_first(workspace_id=workspace_id)
+            return
+        offsets = sorted(found, reverse=True)
+        segments = manifest["segments"]
+        base = sum(segment["size"] for segment in segments)
+        i = 0
+        for segment in reversed(segments):
+            base -= segment["size"]
+            # Seek to each match in this segment, from its end
+            end = i
+            while end < len(offsets) and offsets[end] >= base:
+                end += 1
+            if end == i:
+                continue
+            try:
+                f = open(self.directory / segment["name"], "rb")
+            except FileNotFoundError:
+                i = end
+                continue
+            with f:
+                for offset in offsets[i:end]:
+                    f.seek(offset - base)
+                    item = _decode(f.readline())
+                    if item is None or (workspace_id is not None and item.get("workspace_id") != workspace_id):
+                        continue
+                    yield Task.from_dict(item)
+            i = end
+
+    # ─── Writing ───────────────────────────────────────────────────────────────
+
+    def append(self, tasks: Iterable[Task]) -> None:
+        """Archive tasks by appending them to the newest segment."""
+        archived_at = datetime.now().isoformat()
+        lines = [_encode(task.to_dict() | {"archived_at": archived_at}) for task in tasks]
+        if not lines:
+            return
+        data = b"".join(lines)
+        month = _month(archived_at)
+        with self.lock:
+            segments = self._segments()
+            if not segments or segments[-1]["name"][:7] < month:
+                segments.append({"name": month + SEGMENT_SUFFIX, "size": 0, "count": 0})
+            segment = segments[-1]
+            path = self.directory / segment["name"]
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, segment["size"])  # Drop anything left by an interrupted append
+                os.pwrite(fd, data, segment["size"])
+                if self.fsync_policy == FSYNC_ALWAYS:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            after_write(path, self.fsync_policy)
+            perf.count_written(data)
+
+            segment["size"] += len(data)
+            segment["count"] += len(lines)
+            self._write_manifest(segments)
+
+    def _rewrite(self, items: List[dict]) -> None:
+        """Replace every segment with ``items``, oldest first. Caller holds the lock."""
+        segments: List[dict] = []
+        groups: List[List[bytes]] = []
+        for item in _backfill(items):
+            month = max(_month(item["archived_at"]), segments[-1]["name"][:7] if segments else UNDATED)
+            if not segments or segments[-1]["name"][:7] != month:
+                segments.append({"name": month + SEGMENT_SUFFIX, "size": 0, "count": 0})
+                groups.append([])
+            groups[-1].append(_encode(item))
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for segment, lines in zip(segments, groups):
+            data = b"".join(lines)
+            atomic_write_bytes(self.directory / segment["name"], data, self.fsync_policy, backup=False)
+            segment["size"] = len(data)
+            segment["count"] = len(lines)
+        self._write_manifest(segments, rewritten=True)
+        self._remove_unlisted(segments)
+
+    def replace(self, tasks: Iterable[Task]) -> None:
+        """Replace the whole history with the given tasks, oldest first."""
+        items = [task.to_dict() for task in tasks]
+        with self.lock:
+            self._migrate()
+            self._rewrite(items)
+
+    def clear(self) -> int:
+        """Remove every archived task. Returns how many there were."""
+        with self.lock:
+            count = self.count()
+            self._write_manifest([], rewritten=True)
+            self._remove_unlisted([])
+        return count
@@ -0,0 +1,276 @@
+"""Append-only operation journal for task mutations.
+
+In journal mode, ``tasks.json`` is a snapshot and every mutation is appended
+to ``tasks.journal`` as one compact JSON record per line. Loading replays the
+snapshot plus the journal. Once the journal grows past a size threshold it is
+folded into a fresh snapshot by a background thread.
+
+Each record carries a sequence number ``s``. The snapshot stores the sequence
+number it covers, so records already folded into it are skipped on replay,
+even if the process stopped between writing the snapshot and trimming the
+journal.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_right
+from operator import attrgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import formats, perf
+from .fileio import (
+    FSYNC_ALWAYS, FSYNC_BATCHED, FileLock, after_write, atomic_write_bytes, atomic_write_text, file_signature,
+    read_recovering,
+)
+from .formats import DEFAULT_FORMAT
+from .models import Task, renumber_ranks
+
+
+# Compact the journal into a new snapshot once it grows past this many bytes
+DEFAULT_COMPACT_THRESHOLD = 1024 * 1024
+
+
+def read_snapshot(path: Path) -> Tuple[int, List[Task]]:
+    """Read a tasks snapshot in any format (see ``todo.formats``). Returns (sequence number, tasks).
+
+    Snapshots written outside journal mode have sequence 0. A corrupted
+    snapshot is recovered from its backup (see ``todo.fileio``).
+    """
+    return read_recovering(path, formats.loads, (0, []))
+
+
+def write_snapshot(
+    path: Path, seq: int, tasks: List[Task], fsync_policy: str = FSYNC_BATCHED, fmt: str = DEFAULT_FORMAT
+) -> None:
+    """Atomically write a tasks snapshot covering journal records up to ``seq``."""
+    atomic_write_bytes(path, formats.get_format(fmt).dump(seq, tasks), fsync_policy)
+
+
+def insert_by_rank(tasks: List[Task], task: Task) -> None:
+    """Insert a task into a rank-ordered list, after any tasks of equal rank."""
+    if not tasks or tasks[-1].rank <= task.rank:
+        tasks.append(task)
+    else:
+        tasks.insert(bisect_right(tasks, task.rank, key=attrgetter("rank")), task)
+
+
+def apply_record(tasks: List[Task], index: Dict[int, Task], record: dict) -> None:
+    """Apply a single journal record to a task list and its id index."""
+    op = record["op"]
+
+    if op == "add" or op == "put":  # put restores a task under its own ID
+        task = Task.from_dict(record["task"])
+        existing = index.get(task.id)
+        if existing is not None:
+            tasks.remove(existing)
+        insert_by_rank(tasks, task)
+        index[task.id] = task
+
+    elif op == "rank":
+        task = index.get(record["id"])
+        if task is not None:
+            tasks.remove(task)
+            task.rank = record["rank"]
+            insert_by_rank(tasks, task)
+
+    elif op == "rerank":
+        renumber_ranks(tasks)
+
+    elif op == "set":
+        task = index.get(record["id"])
+        if task is not None:
+            for name, value in record["fields"].items():
+                setattr(task, name, value)
+
+    elif op == "del":
+        task = index.pop(record["id"], None)
+        if task is not None:
+            tasks.remove(task)
+
+    elif op == "move":  # Written before ranks existed
+        task = index.get(record["id"])
+        if task is not None:
+            tasks.remove(task)
+            tasks.insert(record["to"], task)
+
+    elif op == "del_ws":
+        kept = [t for t in tasks if t.workspace_id != record["ws"]]
+        tasks[:] = kept
+        index.clear()
+        index.update((t.id, t) for t in kept)
+
+    elif op == "clear":
+        kept = [t for t in tasks if not t.is_completed()]
+        tasks[:] = kept
+        index.clear()
+        index.update((t.id, t) for t in kept)
+
+    elif op == "reset":
+        tasks[:] = [Task.from_dict(item) for item in record["tasks"]]
+        index.clear()
+        index.update((t.id, t) for t in tasks)
+
+
+def replay_records(tasks: List[Task], seq: int, records: List[dict], renumbered: Dict[int, int]) -> int:
+    """Apply unwritten records on top of tasks read after ``seq``. Returns the last sequence number.
+
+    The records are renumbered in place to follow ``seq``. An added task
+    whose ID is already taken gets the next free one; the change is noted
+    in ``renumbered`` and later records referring to the old ID follow it.
+    """
+    index = {t.id: t for t in tasks}
+    next_id = max(index, default=0) + 1
+    for record in records:
+        if record["op"] == "add":
+            item = record["task"]
+            if item["id"] in index:
+                renumbered[item["id"]] = next_id
+                item["id"] = next_id
+            next_id = max(next_id, item["id"] + 1)
+        elif "id" in record and record["id"] in renumbered:
+            record["id"] = renumbered[record["id"]]
+        seq += 1
+        record["s"] = seq
+        apply_record(tasks, index, record)
+    return seq
+
+
+class Journal:
+    """Append-only journal file with background compaction."""
+
+    def __init__(
+        self,
+        path: Path,
+        snapshot_path: Path,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+        fsync_policy: str = FSYNC_BATCHED,
+        file_lock: Optional[FileLock] = None,
+        snapshot_format: str = DEFAULT_FORMAT,
+    ) -> None:
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.compact_threshold = compact_threshold
+        self.fsync_policy = fsync_policy
+        self.snapshot_format = snapshot_format
+        # Serializes writers across processes; always taken before self._lock
+        self.file_lock = file_lock or FileLock(path.with_name(".lock"))
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        # (snapshot, journal) file signatures as last written or read by us
+        self.known_signature: Optional[tuple] = None
+
+    def current_signature(self) -> tuple:
+        """Return the signatures of the snapshot and journal files."""
+        return (file_signature(self.snapshot_path), file_signature(self.path))
+
+    def remember_signature(self) -> None:
+        """Record the current file signatures as known to this process."""
+        with self._lock:
+            self.known_signature = self.current_signature()
+
+    def exists(self) -> bool:
+        """Check whether the journal file exists."""
+        return self.path.exists()
+
+    def size(self) -> int:
+        """Current journal size in bytes."""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def read(self, after_seq: int = 0) -> List[dict]:
+        """Read records with a sequence number greater than ``after_seq``."""
+        with self._lock:
+            return self._read_unlocked(after_seq)
+
+    def _read_unlocked(self, after_seq: int) -> List[dict]:
+        try:
+            text = self.path.read_text()
+        except FileNotFoundError:
+            return []
+        perf.count_read(text)
+        lines = text.splitlines()
+
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn write at the end of the file
+            if record.get("s", 0) > after_seq:
+                records.append(record)
+        return records
+
+    def append(self, records: List[dict]) -> None:
+        """Append records to the journal in a single write."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        with self.file_lock, self._lock:
+            with open(self.path, "a") as f:
+                f.write(data)
+                if self.fsync_policy == FSYNC_ALWAYS:
+                    f.flush()
+                    os.fsync(f.fileno())
+            after_write(self.path, self.fsync_policy)
+            perf.count_written(data)
+            self.known_signature = self.current_signature()
+
+    def remove(self) -> None:
+        """Delete the journal file."""
+        self.wait()
+        with self._lock:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def needs_compaction(self) -> bool:
+        """Check whether the journal has grown past the compaction threshold."""
+        return self.size() >= self.compact_threshold
+
+    def compact_in_background(self, through_seq: int) -> None:
+        """Fold records up to ``through_seq`` into a new snapshot on a background thread."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self.compact, args=(through_seq,), name="silo-journal-compactor"
+        )
+        self._compactor.start()
+
+    def compact(self, through_seq: int) -> None:
+        """Fold records up to ``through_seq`` into a new snapshot and trim the journal.
+
+        Works purely from the files on disk, so it doesn't touch the caller's
+        in-memory tasks and can run concurrently with new appends. The fold
+        happens outside the file lock; if another process rewrote the snapshot
+        meanwhile, the result is discarded.
+        """
+        snapshot_signature = file_signature(self.snapshot_path)
+        seq, tasks = read_snapshot(self.snapshot_path)
+        index = {t.id: t for t in tasks}
+        for record in self.read(after_seq=seq):
+            if record["s"] > through_seq:
+                break
+            apply_record(tasks, index, record)
+
+        with self.file_lock:
+            if file_signature(self.snapshot_path) != snapshot_signature:
+                return
+            write_snapshot(self.snapshot_path, through_seq, tasks, self.fsync_policy, self.snapshot_format)
+
+            # Keep only records appended after the snapshot was taken
+            with self._lock:
+                remaining = self._read_unlocked(through_seq)
+                data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in remaining)
+                atomic_write_text(self.path, data, self.fsync_policy, backup=False)
+                self.known_signature = self.current_signature()
+
+    def wait(self) -> None:
+        """Wait for a running background compaction to finish."""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
@@ -1,22 +1,42 @@
-"""Typer CLI entry points for Todo app."""
+"""Typer CLI entry points for Todo app.
+
+Textual and Rich are slow to import, so they are imported only by the
+commands that use them: Textual when the viewer is launched, Rich when
+there is output to print.
+"""
+
+from itertools import islice
+from typing import TYPE_CHECKING, Optional
 
 import typer
-from rich.console import Console
-from rich.table import Table
 from . import storage
-from .app import run_app
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 app = typer.Typer(
     name="todo",
     help="A terminal-based todo list with vim-style navigation.",
     no_args_is_help=True,
 )
-console = Console()
+_console: "Console | None" = None
+
+
+def get_console() -> "Console":
+    """Get the shared Rich console, creating it on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        
+        _console = Console()
+    return _console
 
 
 @app.command()
 def o() -> None:
     """Launch the interactive todo list viewer."""
+    from .app import run_app
+    
     run_app()
 
 @app.command()
@@ -24,37 +44,65 @@ def clear() -> None:
     """Remove all completed tasks and archive them to history."""
     count = storage.clear_completed()
     if count > 0:
-        console.print(f"[green]✓[/green] Archived {count} completed task(s) to history")
+        get_console().print(f"[green]✓[/green] Archived {count} completed task(s) to history")
     else:
-        console.print("[yellow]No completed tasks to clear[/yellow]")
+        get_console().print("[yellow]No completed tasks to clear[/yellow]")
+
+
+# Rows shown by 'history' when neither --limit nor --pager is given
+DEFAULT_HISTORY_LIMIT = 100
 
 
 @app.command()
 def history(
-    clear_all: bool = typer.Option(False, "--clear", "-c", help="Clear all history")
+    clear_all: bool = typer.Option(False, "--clear", "-c", help="Clear all history"),
+    limit: Optional[int] = typer.Option(
+        None, "--limit", "-n", help=f"Show at most this many entries (default {DEFAULT_HISTORY_LIMIT}, 0 for all)"
+    ),
+    since: Optional[str] = typer.Option(None, "--since", "-s", help="Only tasks completed on or after this date"),
+    workspace: Optional[str] = typer.Option(None, "--workspace", "-w", help="Only tasks from this workspace (name or ID)"),
+    pager: bool = typer.Option(False, "--pager", "-p", help="Stream all matching entries through $PAGER"),
 ) -> None:
-    """View or clear completed task history."""
+    """View or clear completed task history, most recent first."""
     if clear_all:
         count = storage.clear_history()
         if count > 0:
-            console.print(f"[green]✓[/green] Cleared {count} task(s) from history")
+            get_console().print(f"[green]✓[/green] Cleared {count} task(s) from history")
         else:
-            console.print("[yellow]History is already empty[/yellow]")
+            get_console().print("[yellow]History is already empty[/yellow]")
         return
     
-    tasks = storage.load_history()
+    if since is not None:
+        since = _parse_since(since)
+    workspace_id = _resolve_workspace(workspace) if workspace is not None else None
+    if limit is None:
+        limit = 0 if pager else DEFAULT_HISTORY_LIMIT
+    
+    tasks = storage.iter_history(since, workspace_id)
+    if limit > 0:
+        tasks = islice(tasks, limit)
+    
+    if pager:
+        _page_history(tasks)
+        return
     
+    tasks = [*tasks]
     if not tasks:
-        console.print("[dim]No history yet. Completed tasks appear here after running 'todo clear'.[/dim]")
+        if since is None and workspace_id is None:
+            get_console().print("[dim]No history yet. Completed tasks appear here after running 'todo clear'.[/dim]")
+        else:
+            get_console().print("[dim]No history entries match.[/dim]")
         return
     
+    from rich.table import Table
+    
     table = Table(show_header=True, header_style="bold", title="[bold]Completed Task History[/bold]")
     table.add_column("ID", width=4)
     table.add_column("Title", min_width=40)
     table.add_column("Created", width=10)
     table.add_column("Completed", width=10)
     
-    for task in reversed(tasks):  # Show most recent first
+    for task in tasks:
         table.add_row(
             str(task.id),
             task.title,
@@ -62,8 +110,336 @@ def history(
             _format_date_from_iso(task.completed_at) if task.completed_at else "-",
         )
     
-    console.print(table)
-    console.print(f"\n[dim]{len(tasks)} completed task(s) in history. Use 'todo history --clear' to delete.[/dim]")
+    get_console().print(table)
+    total = storage.history_count()
+    if len(tasks) == limit and (since is not None or workspace_id is not None or total > limit):
+        get_console().print(
+            f"\n[dim]Showing the newest {limit} matching task(s) of {total} in history. "
+            "Use --limit 0 or --pager to see more, 'todo history --clear' to delete.[/dim]"
+        )
+    else:
+        get_console().print(f"\n[dim]{total} completed task(s) in history. Use 'todo history --clear' to delete.[/dim]")
+
+
+def _parse_since(value: str) -> str:
+    """Validate a --since date and return it in ISO form for comparison with stored timestamps."""
+    from datetime import datetime
+    
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        get_console().print(f"[red]Invalid date '{value}'. Use YYYY-MM-DD or an ISO timestamp.[/red]")
+        raise typer.Exit(1)
+
+
+def _resolve_workspace(value: str) -> int:
+    """Find a workspace by name (case-insensitive) or ID."""
+    workspaces = storage.load_workspaces()
+    for ws in workspaces:
+        if ws.name.lower() == value.lower():
+            return ws.id
+    if value.isdigit() and any(ws.id == int(value) for ws in workspaces):
+        return int(value)
+    get_console().print(f"[red]No workspace named '{value}'[/red]")
+    raise typer.Exit(1)
+
+
+def _history_line(task) -> str:
+    completed = _format_date_from_iso(task.completed_at) if task.completed_at else "-"
+    return f"{task.id:>6}  {task.formatted_date():<10}  {completed:<10}  {task.title}\n"
+
+
+def _page_history(tasks) -> None:
+    """Write history lines to $PAGER as they are decoded, or straight to stdout if it isn't a terminal."""
+    import os
+    import shlex
+    import subprocess
+    import sys
+    
+    header = f"{'ID':>6}  {'Created':<10}  {'Completed':<10}  Title\n"
+    if not sys.stdout.isatty():
+        sys.stdout.write(header)
+        for task in tasks:
+            sys.stdout.write(_history_line(task))
+        return
+    
+    command = shlex.split(os.environ.get("PAGER") or "less -R")
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, text=True)
+    except OSError:
+        get_console().print(f"[red]Could not start pager '{command[0]}'[/red]")
+        raise typer.Exit(1)
+    try:
+        process.stdin.write(header)
+        for task in tasks:
+            process.stdin.write(_history_line(task))
+        process.stdin.close()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass  # The pager was quit before reaching the end
+    process.wait()
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Words to find; each matches the start of a word in the title"),
+    workspace: Optional[str] = typer.Option(None, "--workspace", "-w", help="Only tasks from this workspace (name or ID)"),
+    include_history: bool = typer.Option(True, "--history/--no-history", help="Also search archived tasks"),
+    limit: int = typer.Option(50, "--limit", "-n", help="Show at most this many matches (0 for all)"),
+) -> None:
+    """Find tasks and archived tasks by title."""
+    from itertools import chain
+    
+    workspace_id = _resolve_workspace(workspace) if workspace is not None else None
+    task_ids = storage.search_task_ids(query, workspace_id)
+    found = storage.get_tasks(task_ids)
+    matches = (found[task_id] for task_id in task_ids)
+    if include_history:
+        archived = storage.search_history(query, workspace_id)
+        matches = chain(((task, False) for task in matches), ((task, True) for task in archived))
+    else:
+        matches = ((task, False) for task in matches)
+    if limit > 0:
+        matches = islice(matches, limit + 1)
+    matches = [*matches]
+    
+    if not matches:
+        get_console().print(f"[dim]No tasks match '{query}'.[/dim]")
+        return
+    
+    import re
+    from rich.table import Table
+    from rich.text import Text
+    from .search import tokenize
+    
+    # Highlight the start of each word that matched a query term
+    terms = sorted(tokenize(query), key=len, reverse=True)
+    highlight = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, terms)) + ")", re.IGNORECASE) if terms else None
+    
+    table = Table(show_header=True, header_style="bold")
+    table.add_column("ID", width=4)
+    table.add_column("Title", min_width=30)
+    table.add_column("Status", width=10)
+    table.add_column("Date", width=10)
+    
+    for task, archived in matches[:limit] if limit > 0 else matches:
+        title = Text(task.title)
+        if highlight is not None:
+            title.highlight_regex(highlight, "bold #e0af68")
+        if archived:
+            status = Text("Archived", style="dim")
+            date = _format_date_from_iso(task.completed_at) if task.completed_at else "-"
+        elif task.is_completed():
+            status = Text("Completed", style="green")
+            date = task.formatted_date()
+        else:
+            status = Text("Pending", style="yellow")
+            date = task.formatted_date()
+        table.add_row(str(task.id), title, status, date)
+    
+    get_console().print(table)
+    if limit > 0 and len(matches) > limit:
+        get_console().print(f"\n[dim]Showing the first {limit} matches. Use --limit 0 to see all.[/dim]")
+
+
+@app.command()
+def move(
+    task_id: int = typer.Argument(..., help="ID of the task to move"),
+    position: str = typer.Argument(..., help="top, bottom, or a row number counted from 1"),
+) -> None:
+    """Move a task to the top, the bottom or a given row of its workspace."""
+    if position == "top":
+        index = 0
+    elif position == "bottom":
+        index = -1
+    elif position.isdigit() and int(position) > 0:
+        index = int(position) - 1
+    else:
+        get_console().print(f"[red]Invalid position '{position}'. Use top, bottom or a row number.[/red]")
+        raise typer.Exit(1)
+
+    task = storage.get_task(task_id)
+    if task is None:
+        get_console().print(f"[red]No task with ID {task_id}[/red]")
+        raise typer.Exit(1)
+    if storage.move_task_to(task_id, index, task.workspace_id):
+        get_console().print(f"[green]✓[/green] Moved task {task_id} to {position}")
+    else:
+        get_console().print(f"[yellow]Task {task_id} is already at {position}[/yellow]")
+
+
+@app.command()
+def undo(
+    steps: int = typer.Argument(1, min=1, help="Number of changes to undo"),
+    redo: bool = typer.Option(False, "--redo", "-r", help="Redo undone changes instead"),
+) -> None:
+    """Undo the last changes to tasks and workspaces, made here or in the viewer."""
+    for _ in range(steps):
+        change = storage.redo() if redo else storage.undo()
+        if change is None:
+            get_console().print(f"[yellow]Nothing to {'redo' if redo else 'undo'}[/yellow]")
+            break
+        get_console().print(f"[green]✓[/green] {'Redid' if redo else 'Undid'} {change.describe()}")
+
+
+@app.command("import")
+def import_(
+    file: str = typer.Argument(..., help="JSON Lines or CSV file to read, or - for standard input"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="jsonl or csv (default: from the file name)"),
+    workspace: Optional[str] = typer.Option(
+        None, "--workspace", "-w", help="Put every task in this workspace (name or ID) instead of the one in the file"
+    ),
+) -> None:
+    """Add tasks from a JSON Lines or CSV file in a single write."""
+    import sys
+    from . import bulk
+
+    fmt = _check_format(fmt or bulk.format_for_path(file))
+    workspace_id = _resolve_workspace(workspace) if workspace is not None else None
+    try:
+        f = sys.stdin if file == "-" else open(file, newline="", encoding="utf-8")
+    except OSError as e:
+        get_console().print(f"[red]Could not open {file}: {e.strerror}[/red]")
+        raise typer.Exit(1)
+    try:
+        with f:
+            count = bulk.import_tasks(storage.get_store(), bulk.read_records(f, fmt), workspace_id)
+    except ValueError as e:
+        get_console().print(f"[red]{e}. Nothing was imported.[/red]")
+        raise typer.Exit(1)
+    get_console().print(f"[green]✓[/green] Imported {count} task(s)")
+
+
+@app.command()
+def export(
+    file: str = typer.Argument("-", help="File to write, or - for standard output"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="jsonl or csv (default: from the file name)"),
+    workspace: Optional[str] = typer.Option(None, "--workspace", "-w", help="Only tasks from this workspace (name or ID)"),
+) -> None:
+    """Write all tasks to a JSON Lines or CSV file."""
+    import sys
+    from . import bulk
+
+    fmt = _check_format(fmt or bulk.format_for_path(file))
+    workspace_id = _resolve_workspace(workspace) if workspace is not None else None
+    records = bulk.export_records(storage.get_store(), workspace_id)
+    if file == "-":
+        bulk.write_records(sys.stdout, records, fmt)
+        return
+    try:
+        with open(file, "w", newline="", encoding="utf-8") as f:
+            count = bulk.write_records(f, records, fmt)
+    except OSError as e:
+        get_console().print(f"[red]Could not write {file}: {e.strerror}[/red]")
+        raise typer.Exit(1)
+    get_console().print(f"[green]✓[/green] Exported {count} task(s) to {file}")
+
+
+def _check_format(fmt: str) -> str:
+    from .bulk import FORMATS
+
+    if fmt not in FORMATS:
+        get_console().print(f"[red]Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}[/red]")
+        raise typer.Exit(1)
+    return fmt
+
+
+@app.command()
+def perf(
+    last: Optional[int] = typer.Option(None, "--last", "-n", min=1, help="Only the newest N recorded processes"),
+    clear_all: bool = typer.Option(False, "--clear", "-c", help="Delete the recorded figures"),
+) -> None:
+    """Summarize timings recorded with SILO_PROFILE=1, slowest operations first."""
+    from . import perf as profiling
+    
+    if clear_all:
+        count = profiling.clear_metrics()
+        get_console().print(f"[green]✓[/green] Cleared figures from {count} process(es)")
+        return
+    
+    sessions = profiling.load_sessions(last=last)
+    if not sessions:
+        get_console().print("[dim]Nothing recorded yet. Run silo with SILO_PROFILE=1 to record timings.[/dim]")
+        return
+    
+    from rich.table import Table
+    
+    table = Table(show_header=True, header_style="bold", title="[bold]Operation Timings (ms)[/bold]")
+    table.add_column("Operation", min_width=24)
+    for column in ("Calls", "p50", "p95", "p99", "Total", "Read", "Written"):
+        table.add_column(column, justify="right")
+    
+    for row in profiling.summarize(sessions):
+        table.add_row(
+            row["name"],
+            str(row["calls"]),
+            f"{row['p50']:.2f}",
+            f"{row['p95']:.2f}",
+            f"{row['p99']:.2f}",
+            f"{row['total']:.1f}",
+            _format_bytes(row["read"]),
+            _format_bytes(row["written"]),
+        )
+    
+    get_console().print(table)
+    
+    counters = profiling.sum_counters(sessions)
+    if counters:
+        rates = profiling.hit_rates(counters)
+        table = Table(show_header=True, header_style="bold", title="[bold]Counters[/bold]")
+        table.add_column("Counter", min_width=24)
+        table.add_column("Count", justify="right")
+        for name, value in counters.items():
+            table.add_row(name, f"{value:,}")
+        for name, rate in rates.items():
+            table.add_row(f"{name} hit rate", f"{rate:.1%}")
+        get_console().print(table)
+    get_console().print(f"\n[dim]{len(sessions)} process(es) since {sessions[0].get('started', '?')}[/dim]")
+
+
+def _format_bytes(size: int) -> str:
+    """Format a byte count for display, like 12.3 KiB."""
+    if size < 1024:
+        return f"{size} B" if size else "-"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
+
+
+@app.command()
+def migrate(
+    backend: Optional[str] = typer.Argument(None, help="Backend to move to: json or sqlite"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", "-f", help="Format to write tasks.json in: json, compact, jsonl or binary"
+    ),
+) -> None:
+    """Copy all tasks, workspaces and history into another storage backend, or convert tasks.json to another format."""
+    from .formats import FORMATS
+
+    if backend is None and fmt is None:
+        get_console().print("[red]Give a backend to move to, --format, or both[/red]")
+        raise typer.Exit(1)
+    if backend is not None and backend not in storage.BACKENDS:
+        get_console().print(f"[red]Unknown backend '{backend}'. Choose from: {', '.join(storage.BACKENDS)}[/red]")
+        raise typer.Exit(1)
+    if fmt is not None and fmt not in FORMATS:
+        get_console().print(f"[red]Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        if backend is not None:
+            store = storage.migrate(backend)
+            get_console().print(
+                f"[green]✓[/green] Moved {len(store.tasks())} task(s), {len(store.workspaces())} workspace(s) "
+                f"and {store.history_count()} history entries to the {backend} backend"
+            )
+        if fmt is not None:
+            storage.set_format(fmt)
+            get_console().print(f"[green]✓[/green] tasks.json is now written in the {fmt} format")
+    except (ValueError, RuntimeError) as e:
+        get_console().print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
 
 
 def _format_date_from_iso(iso_time: str) -> str:
@@ -77,36 +453,104 @@ def _format_date_from_iso(iso_time: str) -> str:
         return "-"
 
 
+LIST_FORMATS = ("table", "tsv", "json", "jsonl")
+
+
+def _tsv_line(task, names) -> str:
+    title = task.title.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+    workspace = names.get(task.workspace_id, "")
+    return f"{task.id}\t{task.status}\t{task.priority or ''}\t{workspace}\t{task.created_at}\t{title}\n"
+
+
+def _json_lines(tasks, names, array: bool):
+    """Yield tasks as JSON lines, or as the lines of one JSON array."""
+    import json
+    from .bulk import task_records
+    
+    if not array:
+        for record in task_records(tasks, names):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        return
+    separator = "[\n"
+    for record in task_records(tasks, names):
+        yield separator + json.dumps(record, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n" if separator == ",\n" else "[]\n"
+
+
+def _write_lines(lines) -> None:
+    """Write lines to stdout as they are produced, stopping quietly if the reader goes away."""
+    import os
+    import sys
+    
+    try:
+        for line in lines:
+            sys.stdout.write(line)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (head, grep -m) has all it wants; don't let the exit-time flush fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
 @app.command()
-def list() -> None:
-    """List all tasks (non-interactive)."""
-    tasks = storage.load_tasks()
+def list(
+    workspace: Optional[str] = typer.Option(None, "--workspace", "-w", help="Only tasks from this workspace (name or ID)"),
+    status: Optional[str] = typer.Option(None, "--status", "-s", help="Only pending or completed tasks"),
+    priority: Optional[str] = typer.Option(None, "--priority", "-p", help="Only high, medium, low or none priority tasks"),
+    limit: int = typer.Option(0, "--limit", "-n", min=0, help="Show at most this many tasks (0 for all)"),
+    fmt: str = typer.Option(
+        "table", "--format", "-f",
+        help="table, tsv (id, status, priority, workspace, created, title), json or jsonl",
+    ),
+) -> None:
+    """List tasks in display order (non-interactive).
+    
+    The tsv, json and jsonl formats are written a task at a time, for scripts and status bars.
+    """
+    if fmt not in LIST_FORMATS:
+        get_console().print(f"[red]Unknown format '{fmt}'. Choose from: {', '.join(LIST_FORMATS)}[/red]")
+        raise typer.Exit(1)
+    workspace_id = _resolve_workspace(workspace) if workspace is not None else None
+    store = storage.get_store()
+    try:
+        tasks = store.iter_tasks(workspace_id, status, priority, limit or None)
+    except ValueError as e:
+        get_console().print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    
+    if fmt != "table":
+        names = {ws.id: ws.name for ws in store.workspaces()}
+        if fmt == "tsv":
+            _write_lines(_tsv_line(task, names) for task in tasks)
+        else:
+            _write_lines(_json_lines(tasks, names, array=fmt == "json"))
+        return
     
+    tasks = [*tasks]
     if not tasks:
-        console.print("[dim]No tasks yet. Use 'todo create' or 'todo view' to add tasks.[/dim]")
+        if workspace or status or priority:
+            get_console().print("[dim]No tasks match.[/dim]")
+        else:
+            get_console().print("[dim]No tasks yet. Use 'todo create' or 'todo view' to add tasks.[/dim]")
         return
     
+    from rich.table import Table
+    from .render import row_cache
+    
     table = Table(show_header=True, header_style="bold")
     table.add_column("✓", width=3)
     table.add_column("ID", width=4)
     table.add_column("Title", min_width=30)
+    table.add_column("Priority", width=8)
     table.add_column("Status", width=10)
     table.add_column("Created", width=12)
     
+    # The viewer's cells, from the same cache
     for task in tasks:
-        checkbox = "[green][x][/green]" if task.is_completed() else "[ ]"
-        status_style = "green" if task.is_completed() else "yellow"
-        title_style = "dim strike" if task.is_completed() else ""
-        
-        table.add_row(
-            checkbox,
-            str(task.id),
-            f"[{title_style}]{task.title}[/{title_style}]" if title_style else task.title,
-            f"[{status_style}]{task.status.capitalize()}[/{status_style}]",
-            task.formatted_date(),
-        )
+        check, *cells = row_cache.cells(task)
+        table.add_row(check, str(task.id), *cells)
     
-    console.print(table)
+    get_console().print(table)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,73 @@
 """Task and Workspace data models with JSON serialization."""
 
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
-from typing import Optional
-import json
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
 
 
-@dataclass
+# Status and priority are stored as small integer codes indexing these tuples,
+# so every task shares the same string objects
+STATUSES = ("pending", "completed")
+PENDING, COMPLETED = 0, 1
+PRIORITIES = (None, "low", "medium", "high")  # Also the cycle order
+NO_PRIORITY, LOW, MEDIUM, HIGH = 0, 1, 2, 3
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+PRIORITY_CODES = {name: code for code, name in enumerate(PRIORITIES)}
+
+# Tasks are ordered by an integer rank. New ranks are spaced RANK_GAP apart,
+# so a task can be moved between two others by giving it the midpoint of
+# their ranks, without renumbering anything else.
+RANK_GAP = 1 << 16
+
+# Timestamps are stored as microseconds since 1970-01-01 in local time,
+# matching the naive ISO strings used in the JSON files
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def _datetime_to_timestamp(dt: datetime) -> int:
+    # Plain integer arithmetic; several times faster than subtracting datetimes
+    seconds = (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+    return seconds * 1_000_000 + dt.microsecond
+
+
+def now_timestamp() -> int:
+    """Current local time as integer microseconds."""
+    return _datetime_to_timestamp(datetime.now())
+
+
+def timestamp_from_iso(value: str) -> int:
+    """Parse an ISO timestamp into integer microseconds.
+    
+    A timestamp with a UTC offset is converted to local time first, so it
+    keeps referring to the same instant.
+    """
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return _datetime_to_timestamp(dt)
+
+
+def _read_timestamp(value, default: Optional[int]) -> Optional[int]:
+    """Parse a timestamp from a stored file, or ``default`` if it is missing or unreadable.
+    
+    One bad value shouldn't make the whole file unreadable.
+    """
+    if value is None:
+        return default
+    try:
+        return timestamp_from_iso(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def timestamp_to_iso(timestamp: int) -> str:
+    """Format integer microseconds as an ISO timestamp."""
+    return (_EPOCH + timedelta(microseconds=timestamp)).isoformat()
+
+
+@dataclass(slots=True)
 class Workspace:
     """Represents a workspace for organizing tasks."""
     
@@ -16,7 +77,7 @@ class Workspace:
     
     def to_dict(self) -> dict:
         """Convert workspace to dictionary for JSON serialization."""
-        return asdict(self)
+        return {"id": self.id, "name": self.name, "created_at": self.created_at}
     
     @classmethod
     def from_dict(cls, data: dict) -> "Workspace":
@@ -28,57 +89,347 @@ class Workspace:
         )
 
 
-@dataclass
 class Task:
-    """Represents a single todo task."""
+    """Represents a single todo task.
     
-    id: int
-    title: str
-    workspace_id: Optional[int] = None  # None means unassigned/legacy task
-    status: str = "pending"  # "pending" or "completed"
-    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
-    completed_at: Optional[str] = None
-    priority: Optional[str] = None  # "high", "medium", "low", or None
+    Slotted, with status and priority stored as integer codes and timestamps
+    as integer microseconds, so a large task list stays small. The status,
+    priority, created_at and completed_at properties convert to and from the
+    strings used in the JSON files. Unknown status strings are read as
+    pending and unknown priorities as none.
+    
+    ``rank`` orders tasks: every list of tasks, whole or filtered by
+    workspace, is in ascending rank order. It is assigned by the store.
+    """
+    
+    __slots__ = ("id", "title", "workspace_id", "status_code", "priority_code", "created_ts", "completed_ts", "rank")
+    
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        workspace_id: Optional[int] = None,  # None means unassigned/legacy task
+        status: str = "pending",
+        created_at: Optional[str] = None,  # Defaults to now
+        completed_at: Optional[str] = None,
+        priority: Optional[str] = None,  # "high", "medium", "low", or None
+        rank: int = 0,
+    ) -> None:
+        self.id = id
+        self.title = title
+        self.workspace_id = workspace_id
+        self.status_code = STATUS_CODES.get(status, PENDING)
+        self.priority_code = PRIORITY_CODES.get(priority, NO_PRIORITY)
+        self.created_ts = now_timestamp() if created_at is None else timestamp_from_iso(created_at)
+        self.completed_ts = None if completed_at is None else timestamp_from_iso(completed_at)
+        self.rank = rank
+    
+    @classmethod
+    def from_codes(
+        cls,
+        id: int,
+        title: str,
+        workspace_id: Optional[int],
+        status_code: int,
+        priority_code: int,
+        created_ts: int,
+        completed_ts: Optional[int],
+        rank: int = 0,
+    ) -> "Task":
+        """Create a task from already-encoded fields, skipping all parsing."""
+        task = object.__new__(cls)
+        task.id = id
+        task.title = title
+        task.workspace_id = workspace_id
+        task.status_code = status_code
+        task.priority_code = priority_code
+        task.created_ts = created_ts
+        task.completed_ts = completed_ts
+        task.rank = rank
+        return task
+    
+    def _fields(self) -> tuple:
+        return (self.id, self.title, self.workspace_id, self.status_code,
+                self.priority_code, self.created_ts, self.completed_ts, self.rank)
+    
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+    
+    __hash__ = None  # Mutable, like the dataclass it replaces
+    
+    def __repr__(self) -> str:
+        return (
+            f"Task(id={self.id!r}, title={self.title!r}, workspace_id={self.workspace_id!r}, "
+            f"status={self.status!r}, created_at={self.created_at!r}, "
+            f"completed_at={self.completed_at!r}, priority={self.priority!r}, rank={self.rank!r})"
+        )
+    
+    @property
+    def status(self) -> str:
+        """Either "pending" or "completed"."""
+        return STATUSES[self.status_code]
+    
+    @status.setter
+    def status(self, value: str) -> None:
+        self.status_code = STATUS_CODES.get(value, PENDING)
+    
+    @property
+    def priority(self) -> Optional[str]:
+        """One of "high", "medium", "low", or None."""
+        return PRIORITIES[self.priority_code]
+    
+    @priority.setter
+    def priority(self, value: Optional[str]) -> None:
+        self.priority_code = PRIORITY_CODES.get(value, NO_PRIORITY)
+    
+    @property
+    def created_at(self) -> str:
+        """Creation time as an ISO timestamp."""
+        return timestamp_to_iso(self.created_ts)
+    
+    @created_at.setter
+    def created_at(self, value: str) -> None:
+        self.created_ts = timestamp_from_iso(value)
+    
+    @property
+    def completed_at(self) -> Optional[str]:
+        """Completion time as an ISO timestamp, or None if not completed."""
+        return None if self.completed_ts is None else timestamp_to_iso(self.completed_ts)
+    
+    @completed_at.setter
+    def completed_at(self, value: Optional[str]) -> None:
+        self.completed_ts = None if value is None else timestamp_from_iso(value)
+    
+    @property
+    def version(self) -> tuple:
+        """A value that changes whenever a field shown in task listings changes.
+        
+        Derived from those fields rather than counted, so a copy read again
+        from storage has the same version as the task it replaces unless it
+        was edited in between.
+        """
+        return (self.title, self.status_code, self.priority_code, self.created_ts)
     
     def toggle(self) -> None:
         """Toggle task between pending and completed."""
-        if self.status == "pending":
-            self.status = "completed"
-            self.completed_at = datetime.now().isoformat()
+        if self.status_code == PENDING:
+            self.status_code = COMPLETED
+            self.completed_ts = now_timestamp()
         else:
-            self.status = "pending"
-            self.completed_at = None
+            self.status_code = PENDING
+            self.completed_ts = None
     
     def is_completed(self) -> bool:
         """Check if task is completed."""
-        return self.status == "completed"
+        return self.status_code == COMPLETED
     
     def cycle_priority(self) -> None:
         """Cycle through priority levels: None -> Low -> Medium -> High -> None."""
-        cycle = [None, "low", "medium", "high"]
-        current_index = cycle.index(self.priority) if self.priority in cycle else 0
-        next_index = (current_index + 1) % len(cycle)
-        self.priority = cycle[next_index]
+        self.priority_code = (self.priority_code + 1) % len(PRIORITIES)
     
     def to_dict(self) -> dict:
         """Convert task to dictionary for JSON serialization."""
-        return asdict(self)
+        completed_ts = self.completed_ts
+        return {
+            "id": self.id,
+            "title": self.title,
+            "workspace_id": self.workspace_id,
+            "status": STATUSES[self.status_code],
+            "created_at": timestamp_to_iso(self.created_ts),
+            "completed_at": None if completed_ts is None else timestamp_to_iso(completed_ts),
+            "priority": PRIORITIES[self.priority_code],
+            "rank": self.rank,
+        }
     
     @classmethod
     def from_dict(cls, data: dict) -> "Task":
-        """Create task from dictionary."""
-        return cls(
-            id=data["id"],
-            title=data["title"],
-            workspace_id=data.get("workspace_id"),
-            status=data.get("status", "pending"),
-            created_at=data.get("created_at", datetime.now().isoformat()),
-            completed_at=data.get("completed_at"),
-            priority=data.get("priority"),
+        """Create task from dictionary. Files from before ranks existed read as rank 0.
+        
+        A missing or unreadable creation time reads as now, and an unreadable
+        completion time as none.
+        """
+        created_ts = _read_timestamp(data.get("created_at"), None)
+        return cls.from_codes(
+            data["id"],
+            data["title"],
+            data.get("workspace_id"),
+            STATUS_CODES.get(data.get("status"), PENDING),
+            PRIORITY_CODES.get(data.get("priority"), NO_PRIORITY),
+            now_timestamp() if created_ts is None else created_ts,
+            _read_timestamp(data.get("completed_at"), None),
+            data.get("rank", 0),
         )
     
     def formatted_date(self) -> str:
         """Get the creation date formatted as date only."""
-        created = datetime.fromisoformat(self.created_at)
+        created = _EPOCH + timedelta(microseconds=self.created_ts)
         return created.strftime("%Y-%m-%d")
 
+
+def rank_between(low: Optional[int], high: Optional[int]) -> Optional[int]:
+    """A rank strictly between two neighbours' ranks, or None if there is no room.
+    
+    A missing neighbour (None) means the start or end of the list.
+    """
+    if low is None:
+        return RANK_GAP if high is None else high - RANK_GAP
+    if high is None:
+        return low + RANK_GAP
+    if high - low < 2:
+        return None
+    return (low + high) // 2
+
+
+def renumber_ranks(tasks: List[Task]) -> None:
+    """Respace the ranks of tasks in list order, RANK_GAP apart."""
+    for i, task in enumerate(tasks, 1):
+        task.rank = i * RANK_GAP
+
+
+def ensure_ranks(tasks: List[Task]) -> bool:
+    """Renumber ranks in list order unless they already increase strictly.
+    
+    Lists from files written before ranks existed have rank 0 throughout.
+    Returns True if the ranks were renumbered.
+    """
+    previous = None
+    for task in tasks:
+        if previous is not None and task.rank <= previous:
+            renumber_ranks(tasks)
+            return True
+        previous = task.rank
+    return False
+
+
+class TaskColumns:
+    """Column-oriented task collection backed by ``array``.
+    
+    Stores one machine integer per field per task plus the titles, which is
+    several times smaller than a list of Task objects. Meant for large,
+    read-mostly sets such as history or exports; indexing builds a Task on
+    the fly.
+    """
+    
+    # Stands in for None in the integer columns
+    MISSING = -(1 << 63)
+    
+    def __init__(self, tasks: Iterable[Task] = ()) -> None:
+        self.ids = array("q")
+        self.titles: List[str] = []
+        self.workspace_ids = array("q")
+        self.status_codes = array("b")
+        self.priority_codes = array("b")
+        self.created = array("q")
+        self.completed = array("q")
+        self.extend(tasks)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def append(self, task: Task) -> None:
+        """Add a task at the end."""
+        missing = self.MISSING
+        self.ids.append(task.id)
+        self.titles.append(task.title)
+        self.workspace_ids.append(missing if task.workspace_id is None else task.workspace_id)
+        self.status_codes.append(task.status_code)
+        self.priority_codes.append(task.priority_code)
+        self.created.append(task.created_ts)
+        self.completed.append(missing if task.completed_ts is None else task.completed_ts)
+    
+    def extend(self, tasks: Iterable[Task]) -> None:
+        """Add several tasks at the end."""
+        for task in tasks:
+            self.append(task)
+    
+    def __getitem__(self, index: int) -> Task:
+        missing = self.MISSING
+        workspace_id = self.workspace_ids[index]
+        completed = self.completed[index]
+        return Task.from_codes(
+            self.ids[index],
+            self.titles[index],
+            None if workspace_id == missing else workspace_id,
+            self.status_codes[index],
+            self.priority_codes[index],
+            self.created[index],
+            None if completed == missing else completed,
+        )
+    
+    def __iter__(self) -> Iterator[Task]:
+        for index in range(len(self.ids)):
+            yield self[index]
+    
+    @classmethod
+    def from_dicts(cls, items: Iterable[dict]) -> "TaskColumns":
+        """Build the columns straight from task dictionaries, without Task objects."""
+        columns = cls()
+        missing = cls.MISSING
+        for item in items:
+            workspace_id = item.get("workspace_id")
+            created_ts = _read_timestamp(item.get("created_at"), None)
+            columns.ids.append(item["id"])
+            columns.titles.append(item["title"])
+            columns.workspace_ids.append(missing if workspace_id is None else workspace_id)
+            columns.status_codes.append(STATUS_CODES.get(item.get("status"), PENDING))
+            columns.priority_codes.append(PRIORITY_CODES.get(item.get("priority"), NO_PRIORITY))
+            columns.created.append(now_timestamp() if created_ts is None else created_ts)
+            columns.completed.append(_read_timestamp(item.get("completed_at"), missing))
+        return columns
+    
+    def to_dicts(self) -> List[dict]:
+        """Convert every task to a dictionary for JSON serialization, without Task objects."""
+        missing = self.MISSING
+        return [
+            {
+                "id": task_id,
+                "title": title,
+                "workspace_id": None if workspace_id == missing else workspace_id,
+                "status": STATUSES[status],
+                "created_at": timestamp_to_iso(created),
+                "completed_at": None if completed == missing else timestamp_to_iso(completed),
+                "priority": PRIORITIES[priority],
+            }
+            for task_id, title, workspace_id, status, priority, created, completed in zip(
+                self.ids, self.titles, self.workspace_ids, self.status_codes,
+                self.priority_codes, self.created, self.completed,
+            )
+        ]
+
+
+@dataclass
+class WorkspaceStats:
+    """Aggregated task counts for a workspace."""
+    
+    total: int = 0
+    pending: int = 0
+    completed: int = 0
+    high: int = 0
+    medium: int = 0
+    low: int = 0
+    
+    def add_task(self, task: Task) -> None:
+        """Count a single task."""
+        self.total += 1
+        if task.status_code == COMPLETED:
+            self.completed += 1
+        else:
+            self.pending += 1
+        priority = task.priority_code
+        if priority == HIGH:
+            self.high += 1
+        elif priority == MEDIUM:
+            self.medium += 1
+        elif priority == LOW:
+            self.low += 1
+    
+    def merge(self, other: "WorkspaceStats") -> None:
+        """Add another workspace's counts to this one."""
+        self.total += other.total
+        self.pending += other.pending
+        self.completed += other.completed
+        self.high += other.high
+        self.medium += other.medium
+        self.low += other.low
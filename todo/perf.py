@@ -0,0 +1,275 @@
+"""Opt-in timers and counters for the hot paths.
+
+Set SILO_PROFILE=1 to record how long each storage function, table
+populate and view refresh takes, how often it is called and how many
+bytes of storage files it reads and writes, plus named counters such as
+the row cache's hits and misses. Bytes are counted for every
+operation running when the I/O happens, so an operation's figures
+include the work of anything it calls, like its timings do. When the
+process exits its figures are appended as one JSON line to
+``~/.todo/perf.jsonl``, which keeps the last PERF_MAX_SESSIONS processes;
+``silo perf`` summarizes it.
+
+Without SILO_PROFILE, ``timed`` returns functions unchanged and the byte
+counters return at once, so instrumentation costs nothing.
+"""
+
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+ENABLED = os.environ.get("SILO_PROFILE", "") not in ("", "0")
+
+DEFAULT_METRICS_FILE = Path.home() / ".todo" / "perf.jsonl"
+# Processes kept in the metrics file
+PERF_MAX_SESSIONS = 200
+# Durations kept per operation per process; longer runs keep a uniform sample
+PERF_MAX_SAMPLES = 2000
+
+
+class OpStats:
+    """Calls, durations and I/O recorded for one operation."""
+
+    __slots__ = ("calls", "total", "samples", "read", "written")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total = 0.0  # Milliseconds
+        self.samples: List[float] = []
+        self.read = 0
+        self.written = 0
+
+    def add(self, ms: float) -> None:
+        self.calls += 1
+        self.total += ms
+        if len(self.samples) < PERF_MAX_SAMPLES:
+            self.samples.append(ms)
+        else:
+            # Reservoir sampling keeps every call equally likely to be in the sample
+            slot = random.randrange(self.calls)
+            if slot < PERF_MAX_SAMPLES:
+                self.samples[slot] = ms
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total": round(self.total, 3),
+            "ms": [round(ms, 3) for ms in self.samples],
+            "read": self.read,
+            "written": self.written,
+        }
+
+
+_ops: Dict[str, OpStats] = {}
+_counters: Dict[str, int] = {}
+_lock = threading.Lock()
+_local = threading.local()  # .running: names of the operations running in this thread
+_started = time.time()
+
+
+def _stats(name: str) -> OpStats:
+    stats = _ops.get(name)
+    if stats is None:
+        with _lock:
+            stats = _ops.setdefault(name, OpStats())
+    return stats
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator recording calls to a function under ``name`` when profiling is on."""
+    def decorator(fn: F) -> F:
+        if not ENABLED:
+            return fn
+        stats = _stats(name)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            running = getattr(_local, "running", None)
+            if running is None:
+                running = _local.running = []
+            running.append(name)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                running.pop()
+                with _lock:
+                    stats.add(ms)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def instrument(namespace: dict, prefix: str, exclude: Iterable[str] = ()) -> None:
+    """Wrap the public functions defined in a module's namespace with ``timed``."""
+    if not ENABLED:
+        return
+    module = namespace["__name__"]
+    skip = set(exclude)
+    for name, value in [*namespace.items()]:
+        if (
+            callable(value) and not isinstance(value, type) and not name.startswith("_")
+            and name not in skip and getattr(value, "__module__", None) == module
+        ):
+            namespace[name] = timed(f"{prefix}.{name}")(value)
+
+
+def _count(field: str, data) -> None:
+    running = getattr(_local, "running", None)
+    if not running:
+        return
+    if isinstance(data, int):
+        size = data
+    else:
+        size = len(data.encode()) if isinstance(data, str) else len(data)
+    with _lock:
+        for name in set(running):
+            stats = _ops[name]
+            setattr(stats, field, getattr(stats, field) + size)
+
+
+def count_read(data) -> None:
+    """Count bytes read from a storage file: a byte count, bytes or text."""
+    if ENABLED:
+        _count("read", data)
+
+
+def count_written(data) -> None:
+    """Count bytes written to a storage file: a byte count, bytes or text."""
+    if ENABLED:
+        _count("written", data)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add ``n`` to a named counter, like ``render.cache.hit``."""
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+# ─── Metrics File ──────────────────────────────────────────────────────────────
+
+def write_metrics(path: Path = DEFAULT_METRICS_FILE) -> None:
+    """Append this process's figures to the metrics file, dropping the oldest processes."""
+    with _lock:
+        ops = {name: stats.to_dict() for name, stats in _ops.items() if stats.calls}
+        counters = dict(_counters)
+    if not ops and not counters:
+        return
+    line = json.dumps({
+        "started": datetime.fromtimestamp(_started).isoformat(timespec="seconds"),
+        "seconds": round(time.time() - _started, 3),
+        "command": " ".join([os.path.basename(sys.argv[0]), *sys.argv[1:]]),
+        "ops": ops,
+        "counters": counters,
+    }, separators=(",", ":")) + "\n"
+
+    from .fileio import FileLock, atomic_write_text
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(path.with_name(path.name + ".lock")):
+        lines = read_lines(path)
+        if len(lines) >= PERF_MAX_SESSIONS:
+            kept = lines[len(lines) - PERF_MAX_SESSIONS + 1:]
+            atomic_write_text(path, "".join(kept) + line, backup=False)
+        else:
+            with open(path, "a") as f:
+                f.write(line)
+
+
+def read_lines(path: Path) -> List[str]:
+    try:
+        with open(path) as f:
+            return [line for line in f if line.endswith("\n")]  # Skip a torn last line
+    except FileNotFoundError:
+        return []
+
+
+def load_sessions(path: Path = DEFAULT_METRICS_FILE, last: Optional[int] = None) -> List[dict]:
+    """Read the recorded processes, oldest first, optionally only the newest ``last``."""
+    sessions = []
+    for line in read_lines(path):
+        try:
+            sessions.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return sessions[-last:] if last else sessions
+
+
+def percentile(sorted_ms: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_ms:
+        return 0.0
+    rank = max(1, -(-len(sorted_ms) * p // 100))
+    return sorted_ms[int(rank) - 1]
+
+
+def summarize(sessions: List[dict]) -> List[dict]:
+    """Combine figures per operation across processes, slowest total first.
+
+    Each row has ``name``, ``calls``, ``total``, ``p50``, ``p95``, ``p99``
+    (milliseconds), ``read`` and ``written`` (bytes).
+    """
+    combined: Dict[str, dict] = {}
+    for session in sessions:
+        for name, op in session.get("ops", {}).items():
+            row = combined.setdefault(name, {"name": name, "calls": 0, "total": 0.0, "ms": [], "read": 0, "written": 0})
+            row["calls"] += op.get("calls", 0)
+            row["total"] += op.get("total", 0.0)
+            row["ms"].extend(op.get("ms", []))
+            row["read"] += op.get("read", 0)
+            row["written"] += op.get("written", 0)
+
+    rows = []
+    for row in combined.values():
+        samples = sorted(row.pop("ms"))
+        for p in (50, 95, 99):
+            row[f"p{p}"] = percentile(samples, p)
+        rows.append(row)
+    rows.sort(key=lambda row: row["total"], reverse=True)
+    return rows
+
+
+def sum_counters(sessions: List[dict]) -> Dict[str, int]:
+    """Add up each counter across processes, by name."""
+    totals: Dict[str, int] = {}
+    for session in sessions:
+        for name, value in session.get("counters", {}).items():
+            totals[name] = totals.get(name, 0) + value
+    return dict(sorted(totals.items()))
+
+
+def hit_rates(counters: Dict[str, int]) -> Dict[str, float]:
+    """Hit rate of each ``<name>.hit``/``<name>.miss`` counter pair, by name."""
+    rates = {}
+    for name in counters:
+        prefix, _, kind = name.rpartition(".")
+        if kind in ("hit", "miss") and prefix not in rates:
+            hits = counters.get(prefix + ".hit", 0)
+            lookups = hits + counters.get(prefix + ".miss", 0)
+            rates[prefix] = hits / lookups if lookups else 0.0
+    return rates
+
+
+def clear_metrics(path: Path = DEFAULT_METRICS_FILE) -> int:
+    """Delete the metrics file. Returns the number of processes it held."""
+    count = len(read_lines(path))
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    return count
+
+
+if ENABLED:
+    atexit.register(write_metrics)
@@ -0,0 +1,116 @@
+"""Formatted task cells shared by the task table and ``silo list``.
+
+Formatting a row builds a Rich Text for every column and a date string, so
+finished rows are kept in an LRU cache keyed by task ID and version. A
+refresh only formats the tasks that changed since they were last shown;
+unchanged tasks, even when read again from storage, reuse their cells.
+"""
+
+from collections import OrderedDict
+
+from rich.text import Text
+
+from . import perf
+from .models import HIGH, LOW, MEDIUM, Task
+
+# Rows kept in the cache; a few screens of the largest workspaces
+ROW_CACHE_SIZE = 4096
+
+# (key, label) of each cell, in order
+COLUMNS = (
+    ("check", "✓"),
+    ("title", "Title"),
+    ("priority", "Priority"),
+    ("status", "Status"),
+    ("created", "Created"),
+)
+
+_PRIORITY_CELLS = {
+    HIGH: ("High", "bold red"),
+    MEDIUM: ("Medium", "bold yellow"),
+    LOW: ("Low", "dim"),
+}
+
+
+def format_cells(task: Task) -> tuple[Text, ...]:
+    """Format a task's cells, one Text per column in COLUMNS order."""
+    if task.is_completed():
+        check = Text("[x]", style="bold green")
+        title = Text(task.title, style="dim strike")
+        status = Text("Completed", style="bold green")
+    else:
+        check = Text("[ ]", style="dim")
+        title = Text(task.title)
+        status = Text("Pending", style="bold yellow")
+    label, style = _PRIORITY_CELLS.get(task.priority_code, ("-", "dim"))
+    return check, title, Text(label, style=style), status, Text(task.formatted_date(), style="dim")
+
+
+def fit_cells(cells: tuple[Text, ...], widths: tuple[int, ...]) -> tuple[Text, ...]:
+    """Copies of cells cut or padded to the given column widths."""
+    fitted = []
+    for cell, width in zip(cells, widths):
+        cell = cell.copy()
+        cell.truncate(width, overflow="ellipsis", pad=True)
+        fitted.append(cell)
+    return tuple(fitted)
+
+
+class RowCache:
+    """LRU cache of formatted cells by task ID and version.
+
+    Each row also keeps the last copy of its cells fitted to column widths.
+    The cells are shared between callers: copy a Text before changing it.
+    """
+
+    def __init__(self, maxsize: int = ROW_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._rows: OrderedDict[tuple[int, tuple], list] = OrderedDict()  # key -> [cells, (widths, fitted) | None]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _entry(self, task: Task) -> list:
+        key = (task.id, task.version)
+        rows = self._rows
+        entry = rows.get(key)
+        if entry is not None:
+            rows.move_to_end(key)
+            self.hits += 1
+            perf.count("render.cache.hit")
+            return entry
+        self.misses += 1
+        perf.count("render.cache.miss")
+        entry = rows[key] = [format_cells(task), None]
+        if len(rows) > self.maxsize:
+            rows.popitem(last=False)
+        return entry
+
+    def cells(self, task: Task) -> tuple[Text, ...]:
+        """The task's formatted cells, formatting them only if this version isn't cached."""
+        return self._entry(task)[0]
+
+    def fitted(self, task: Task, widths: tuple[int, ...]) -> tuple[Text, ...]:
+        """The task's cells cut or padded to ``widths``, fitting them only once per version."""
+        entry = self._entry(task)
+        fitted = entry[1]
+        if fitted is None or fitted[0] != widths:
+            fitted = entry[1] = (widths, fit_cells(entry[0], widths))
+        return fitted[1]
+
+    def clear(self) -> None:
+        """Drop every cached row and reset the hit counts."""
+        self._rows.clear()
+        self.hits = self.misses = 0
+
+
+# Shared by every renderer in the process
+row_cache = RowCache()
@@ -0,0 +1,127 @@
+"""Inverted index for searching task titles.
+
+Titles are split into lowercase word tokens. The index maps each token to
+the set of documents (task IDs, or history positions) containing it, and
+keeps the tokens sorted, so every query word is matched as a prefix with a
+binary search instead of a scan over all titles. A query matches a title
+when every query word is a prefix of some word in the title.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Distinct lowercase words of ``text``, in order of first appearance."""
+    return tuple(dict.fromkeys(_WORD.findall(text.lower())))
+
+
+def matches(query: str, text: str) -> bool:
+    """Check a single title against a query without an index."""
+    words = tokenize(text)
+    return all(any(word.startswith(term) for word in words) for term in tokenize(query))
+
+
+class SearchIndex:
+    """Token -> document postings with prefix lookup.
+
+    Documents are integer keys; ``add`` and ``remove`` keep the postings
+    current one document at a time.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Set[int]] = {}
+        self._tokens: List[str] = []  # sorted keys of _postings
+        self._docs: Dict[int, Tuple[str, ...]] = {}  # key -> its tokens, for removal
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._docs
+
+    def add(self, key: int, text: str) -> None:
+        """Index a document. Any previous text for ``key`` is replaced."""
+        if key in self._docs:
+            self.remove(key)
+        tokens = tokenize(text)
+        self._docs[key] = tokens
+        for token in tokens:
+            docs = self._postings.get(token)
+            if docs is None:
+                self._postings[token] = {key}
+                insort(self._tokens, token)
+            else:
+                docs.add(key)
+
+    def remove(self, key: int) -> None:
+        """Drop a document from the index, if present."""
+        for token in self._docs.pop(key, ()):
+            docs = self._postings[token]
+            docs.discard(key)
+            if not docs:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def _token_range(self, prefix: str) -> Tuple[int, int]:
+        """Slice of the sorted tokens that start with ``prefix``."""
+        start = bisect_left(self._tokens, prefix)
+        return start, bisect_left(self._tokens, prefix + "\U0010ffff", start)
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """Documents matching every word of ``query``, or None for an empty query."""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        # Longest terms first: they tend to match fewest documents
+        results: Optional[Set[int]] = None
+        for term in sorted(terms, key=len, reverse=True):
+            start, end = self._token_range(term)
+            if results is not None and len(results) < end - start:
+                # Fewer candidates left than matching tokens: check each candidate's own tokens
+                docs = self._docs
+                results = {key for key in results if any(token.startswith(term) for token in docs[key])}
+            else:
+                postings = self._postings
+                docs = set().union(*[postings[token] for token in self._tokens[start:end]])
+                results = docs if results is None else results & docs
+            if not results:
+                break
+        return results
+
+    # ─── Persistence ───────────────────────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        return {"postings": {token: sorted(docs) for token, docs in self._postings.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchIndex":
+        index = cls()
+        docs: Dict[int, List[str]] = {}
+        for token, keys in data.get("postings", {}).items():
+            index._postings[token] = set(keys)
+            for key in keys:
+                docs.setdefault(key, []).append(token)
+        index._tokens = sorted(index._postings)
+        index._docs = {key: tuple(tokens) for key, tokens in docs.items()}
+        return index
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[int, str]]) -> "SearchIndex":
+        """Index (key, text) pairs in bulk."""
+        index = cls()
+        postings = index._postings
+        for key, text in documents:
+            tokens = tokenize(text)
+            index._docs[key] = tokens
+            for token in tokens:
+                docs = postings.get(token)
+                if docs is None:
+                    postings[token] = {key}
+                else:
+                    docs.add(key)
+        index._tokens = sorted(postings)
+        return index
@@ -0,0 +1,676 @@
+"""SQLite storage backend.
+
+Tasks live in a single table indexed on workspace, status, priority and
+position, so workspace filtering, counts and single-task edits touch only
+the affected rows instead of the whole data set. The position column holds
+each task's rank (see ``todo.models``), so a move updates a single row.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .backend import FLUSH_IMMEDIATE, PRIORITY_NONE, StorageBackend, filter_codes
+from .fileio import FSYNC_ALWAYS, FSYNC_BATCHED, FSYNC_NEVER
+from .models import RANK_GAP, Task, Workspace, WorkspaceStats, ensure_ranks, rank_between
+from .search import tokenize
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    workspace_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at TEXT NOT NULL,
+    completed_at TEXT,
+    priority TEXT,
+    position INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS tasks_workspace ON tasks (workspace_id, position);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, workspace_id);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority, workspace_id);
+CREATE INDEX IF NOT EXISTS tasks_position ON tasks (position);
+
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    workspace_id INTEGER,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    completed_at TEXT,
+    priority TEXT
+);
+
+-- Inverted index over titles: tasks under their ID, archived tasks under minus their seq
+CREATE TABLE IF NOT EXISTS search_terms (
+    token TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (token, doc)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS search_terms_doc ON search_terms (doc);
+"""
+
+# PRAGMA user_version once search_terms has been filled for existing data
+SEARCH_INDEX_VERSION = 1
+
+# PRAGMA synchronous level for each fsync policy. In WAL mode NORMAL only
+# syncs at checkpoints, which is SQLite's equivalent of batching.
+SYNCHRONOUS = {
+    FSYNC_ALWAYS: "FULL",
+    FSYNC_BATCHED: "NORMAL",
+    FSYNC_NEVER: "OFF",
+}
+
+TASK_COLUMNS = "id, title, workspace_id, status, created_at, completed_at, priority"
+# Columns of the tasks table, ending with the rank
+RANKED_COLUMNS = f"{TASK_COLUMNS}, position"
+
+# Seconds to wait for another process's write transaction before giving up
+BUSY_TIMEOUT = 30.0
+
+
+def _task_from_row(row: tuple) -> Task:
+    """Build a Task from a row selected with TASK_COLUMNS or RANKED_COLUMNS."""
+    return Task(
+        id=row[0],
+        title=row[1],
+        workspace_id=row[2],
+        status=row[3],
+        created_at=row[4],
+        completed_at=row[5],
+        priority=row[6],
+        rank=row[7] if len(row) > 7 else 0,
+    )
+
+
+def _task_to_row(task: Task) -> tuple:
+    """Convert a Task to a tuple matching TASK_COLUMNS."""
+    return (
+        task.id,
+        task.title,
+        task.workspace_id,
+        task.status,
+        task.created_at,
+        task.completed_at,
+        task.priority,
+    )
+
+
+class SqliteStore(StorageBackend):
+    """Task and workspace store backed by a SQLite database.
+
+    Each mutation runs in the current transaction; ``flush()`` commits it.
+    Mutations that read before they write take the database write lock
+    first, so concurrent processes can't interleave between the read and
+    the write. Under a deferred flush policy, or inside a batch, the lock is
+    held until the next flush, and other writers wait up to BUSY_TIMEOUT
+    seconds for it. A batch runs in a savepoint, so rolling it back keeps
+    earlier uncommitted changes.
+
+    The connection may be shared with a thread that only calls ``flush()``.
+    Mutations, batches and flushes hold ``_mutex``, so a flush in that
+    thread can't commit in the middle of a mutation or a batch.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: Path,
+        flush_policy: str = FLUSH_IMMEDIATE,
+        flush_interval: float = 1.0,
+        fsync_policy: str = FSYNC_BATCHED,
+    ) -> None:
+        super().__init__(flush_policy, flush_interval, fsync_policy)
+        self.path = path
+        self._mutex = threading.RLock()  # Guards the transaction against a flush in another thread
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS[fsync_policy]}")
+        self.conn.executescript(SCHEMA)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SEARCH_INDEX_VERSION:
+            self._begin()
+            self._reindex()
+            self.conn.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        self.conn.commit()
+        self._flushed_changes = self.conn.total_changes  # Rows changed up to the last commit
+        self._data_version = self._read_data_version()
+
+    def flush(self) -> None:
+        """Commit the current transaction. Inside a batch the commit is left to the end of the batch."""
+        with self._mutex:
+            if not self._batch_depth:
+                self.conn.commit()
+                self._flushed_changes = self.conn.total_changes
+        if self.undo_log is not None:
+            self.undo_log.flush()
+        self._last_flush = time.monotonic()
+
+    def _begin_batch(self) -> None:
+        """Open a savepoint for the batch, inside the current transaction."""
+        self._begin()
+        self.conn.execute("SAVEPOINT batch")
+
+    def _end_batch(self) -> None:
+        self.conn.execute("RELEASE batch")
+
+    def rollback(self) -> None:
+        """Roll back to the start of the current batch."""
+        self.conn.execute("ROLLBACK TO batch")
+        self.conn.execute("RELEASE batch")
+
+    @contextmanager
+    def batch(self) -> Iterator["SqliteStore"]:
+        """Apply a group of mutations in one savepoint, holding the connection throughout."""
+        with self._mutex, super().batch():
+            yield self
+
+    def close(self) -> None:
+        """Commit and close the database connection."""
+        with self._mutex:
+            self.conn.commit()
+            self.conn.close()
+
+    def _read_data_version(self) -> int:
+        """SQLite's counter of commits made by other connections."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def watched_paths(self) -> List[Path]:
+        """Files that change when another process writes to this store."""
+        return [self.path, self.path.with_name(self.path.name + "-wal")]
+
+    def has_external_changes(self) -> bool:
+        """Check whether another connection committed since the last check."""
+        version = self._read_data_version()
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
+
+    def _begin(self) -> None:
+        """Start a write transaction now, unless one is already open."""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def _changed(self, cursor: sqlite3.Cursor) -> bool:
+        """Flush per policy if a statement changed rows. Returns whether it did."""
+        if cursor.rowcount > 0:
+            self._maybe_flush()
+            return True
+        self._unchanged()
+        return False
+
+    def _unchanged(self) -> None:
+        """End a mutation that matched nothing without holding the write lock for it.
+
+        The statement still opened a write transaction. Unless a batch is
+        open or earlier changes are waiting for the flush policy, it is
+        committed now, which writes nothing but releases the lock.
+        """
+        self._maybe_flush()
+        if not self._batch_depth and self.conn.in_transaction and self.conn.total_changes == self._flushed_changes:
+            self.conn.commit()
+
+    # ─── Search Index ──────────────────────────────────────────────────────────
+
+    def _index(self, docs) -> None:
+        """Add (doc, title) pairs to the search index."""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO search_terms (token, doc) VALUES (?, ?)",
+            ((token, doc) for doc, title in docs for token in tokenize(title)),
+        )
+
+    def _reindex(self, tasks: bool = True, history: bool = True) -> None:
+        """Rebuild the index entries of the tasks and/or history tables."""
+        if tasks:
+            self.conn.execute("DELETE FROM search_terms WHERE doc > 0")
+            self._index(self.conn.execute("SELECT id, title FROM tasks").fetchall())
+        if history:
+            self.conn.execute("DELETE FROM search_terms WHERE doc < 0")
+            self._index(self.conn.execute("SELECT -seq, title FROM history").fetchall())
+
+    def _match_condition(self, query: str, history: bool = False) -> Optional[tuple]:
+        """SQL condition selecting tasks (or history rows) that match every word of ``query``.
+
+        The longest word picks the candidates through the token index; the
+        other words are checked per candidate through the doc index. Returns
+        (sql, params), or None for an empty query.
+        """
+        terms = sorted(tokenize(query), key=len, reverse=True)
+        if not terms:
+            return None
+        if history:
+            sql = "seq IN (SELECT -doc FROM search_terms WHERE token >= ? AND token < ? AND doc < 0)"
+            doc = "-history.seq"
+        else:
+            sql = "id IN (SELECT doc FROM search_terms WHERE token >= ? AND token < ? AND doc > 0)"
+            doc = "tasks.id"
+        params = [terms[0], terms[0] + "\U0010ffff"]
+        for term in terms[1:]:
+            sql += f" AND EXISTS (SELECT 1 FROM search_terms WHERE doc = {doc} AND token >= ? AND token < ?)"
+            params += [term, term + "\U0010ffff"]
+        return sql, params
+
+    def search_task_ids(self, query: str, workspace_id: Optional[int] = None) -> List[int]:
+        """IDs of tasks matching ``query``, in display order, from the search_terms index."""
+        condition = self._match_condition(query)
+        if condition is None:
+            return self.task_ids(workspace_id)
+        sql, params = condition
+        if workspace_id is not None:
+            sql += " AND workspace_id = ?"
+            params.append(workspace_id)
+        return [row[0] for row in self.conn.execute(f"SELECT id FROM tasks WHERE {sql} ORDER BY position", params)]
+
+    def search_history(self, query: str, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks matching ``query``, newest first."""
+        condition = self._match_condition(query, history=True)
+        if condition is None:
+            return self.iter_history(workspace_id=workspace_id)
+        sql, params = condition
+        if workspace_id is not None:
+            sql += " AND workspace_id = ?"
+            params.append(workspace_id)
+        rows = self.conn.execute(f"SELECT {TASK_COLUMNS} FROM history WHERE {sql} ORDER BY seq DESC", params)
+        return (_task_from_row(row) for row in rows)
+
+    # ─── Tasks ─────────────────────────────────────────────────────────────────
+
+    def tasks(self, workspace_id: Optional[int] = None) -> List[Task]:
+        """Return tasks in display order, filtered by workspace. None means all tasks."""
+        if workspace_id is None:
+            rows = self.conn.execute(f"SELECT {RANKED_COLUMNS} FROM tasks ORDER BY position")
+        else:
+            rows = self.conn.execute(
+                f"SELECT {RANKED_COLUMNS} FROM tasks WHERE workspace_id = ? ORDER BY position",
+                (workspace_id,),
+            )
+        return [_task_from_row(row) for row in rows]
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        """Look up a task by ID."""
+        row = self.conn.execute(f"SELECT {RANKED_COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _task_from_row(row) if row else None
+
+    def task_ids(self, workspace_id: Optional[int] = None) -> List[int]:
+        """Return task IDs in display order, filtered by workspace. None means all tasks."""
+        if workspace_id is None:
+            rows = self.conn.execute("SELECT id FROM tasks ORDER BY position")
+        else:
+            rows = self.conn.execute(
+                "SELECT id FROM tasks WHERE workspace_id = ? ORDER BY position", (workspace_id,)
+            )
+        return [row[0] for row in rows]
+
+    def iter_tasks(
+        self,
+        workspace_id: Optional[int] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        """Yield matching tasks in display order, filtered and limited by the query and fetched as consumed."""
+        filter_codes(status, priority)
+        conditions, params = [], []
+        if workspace_id is not None:
+            conditions.append("workspace_id = ?")
+            params.append(workspace_id)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if priority == PRIORITY_NONE:
+            conditions.append("priority IS NULL")
+        elif priority is not None:
+            conditions.append("priority = ?")
+            params.append(priority)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {RANKED_COLUMNS} FROM tasks{where} ORDER BY position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self.conn.execute(sql, params)
+        return (_task_from_row(row) for row in rows)
+
+    def get_tasks(self, task_ids: List[int]) -> Dict[int, Task]:
+        """Look up several tasks by ID with one query per 500 IDs."""
+        found = {}
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT {RANKED_COLUMNS} FROM tasks WHERE id IN ({placeholders})", chunk)
+            for row in rows:
+                found[row[0]] = _task_from_row(row)
+        return found
+
+    def replace_tasks(self, tasks: List[Task]) -> None:
+        """Replace every task with the given list."""
+        with self._mutex:
+            tasks = list(tasks)
+            ensure_ranks(tasks)
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.executemany(
+                f"INSERT INTO tasks ({RANKED_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_task_to_row(t) + (t.rank,) for t in tasks),
+            )
+            self._reindex(history=False)
+            self._maybe_flush()
+
+    def add_task(self, title: str, workspace_id: Optional[int] = None) -> Task:
+        """Create a new task at the end of the list."""
+        return self._append(Task(id=0, title=title, workspace_id=workspace_id))
+
+    def insert_task(self, task: Task) -> Task:
+        """Add a copy of ``task`` at the end of the list under a new ID, keeping its other fields."""
+        return self._append(Task.from_codes(*task._fields()))
+
+    def _append(self, task: Task) -> Task:
+        """Give a new task the next ID and add it at the end of the list."""
+        with self._mutex:
+            self._begin()
+            # Separate subqueries, so each MAX is a single index lookup rather than a table scan
+            last_id, last_rank = self.conn.execute(
+                "SELECT (SELECT MAX(id) FROM tasks), (SELECT MAX(position) FROM tasks)"
+            ).fetchone()
+            task.id = (last_id or 0) + 1
+            task.rank = rank_between(last_rank, None)
+            self._remember_tasks("add", [task.id], new=True)
+            self.conn.execute(
+                f"INSERT INTO tasks ({RANKED_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                _task_to_row(task) + (task.rank,),
+            )
+            self._index([(task.id, task.title)])
+            self._maybe_flush()
+            return task
+
+    def delete_task(self, task_id: int) -> bool:
+        """Delete a task by ID. Returns True if task was found and deleted."""
+        with self._mutex:
+            self._remember_tasks("delete", [task_id])
+            self.conn.execute("DELETE FROM search_terms WHERE doc = ?", (task_id,))
+            return self._changed(self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)))
+
+    def delete_tasks(self, task_ids: List[int]) -> int:
+        """Delete several tasks with one statement per 500 IDs. Returns the number deleted."""
+        with self._mutex:
+            self._remember_tasks("delete", task_ids)
+            count = 0
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                self.conn.execute(f"DELETE FROM search_terms WHERE doc IN ({placeholders})", chunk)
+                count += self.conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", chunk).rowcount
+            self._maybe_flush()
+            return count
+
+    def restore_tasks(self, tasks: List[Task]) -> None:
+        """Add or overwrite tasks under their own IDs, keeping every field including rank."""
+        with self._mutex:
+            if not tasks:
+                return
+            self._begin()
+            task_ids = [t.id for t in tasks]
+            self._remember_tasks("restore", task_ids)
+            self._remember_tasks("restore", task_ids, new=True)  # The rest are new
+            self.conn.executemany("DELETE FROM search_terms WHERE doc = ?", ((i,) for i in task_ids))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO tasks ({RANKED_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_task_to_row(t) + (t.rank,) for t in tasks),
+            )
+            self._index((t.id, t.title) for t in tasks)
+            self._maybe_flush()
+
+    def toggle_task(self, task_id: int) -> bool:
+        """Toggle a task's completion status. Returns True if task was found."""
+        with self._mutex:
+            self._begin()
+            task = self.get_task(task_id)
+            if task is None:
+                self._unchanged()
+                return False
+            self._remember_tasks("toggle", [task_id])
+            task.toggle()
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, completed_at = ? WHERE id = ?",
+                (task.status, task.completed_at, task_id),
+            )
+            self._maybe_flush()
+            return True
+
+    def update_task_title(self, task_id: int, new_title: str) -> bool:
+        """Update a task's title. Returns True if task was found."""
+        with self._mutex:
+            self._remember_tasks("edit", [task_id])
+            cursor = self.conn.execute("UPDATE tasks SET title = ? WHERE id = ?", (new_title, task_id))
+            if cursor.rowcount > 0:
+                self.conn.execute("DELETE FROM search_terms WHERE doc = ?", (task_id,))
+                self._index([(task_id, new_title)])
+            return self._changed(cursor)
+
+    def cycle_task_priority(self, task_id: int) -> bool:
+        """Cycle a task's priority. Returns True if task was found."""
+        with self._mutex:
+            self._begin()
+            task = self.get_task(task_id)
+            if task is None:
+                self._unchanged()
+                return False
+            self._remember_tasks("priority", [task_id])
+            task.cycle_priority()
+            self.conn.execute("UPDATE tasks SET priority = ? WHERE id = ?", (task.priority, task_id))
+            self._maybe_flush()
+            return True
+
+    def move_task_before(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just before another, updating only its row. Returns True if moved."""
+        return self._move(task_id, anchor_id, after=False)
+
+    def move_task_after(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just after another, updating only its row. Returns True if moved."""
+        return self._move(task_id, anchor_id, after=True)
+
+    def _move(self, task_id: int, anchor_id: int, after: bool) -> bool:
+        """Give a task a rank between the anchor and the anchor's neighbour on one side."""
+        with self._mutex:
+            self._begin()
+            ranks = dict(self.conn.execute("SELECT id, position FROM tasks WHERE id IN (?, ?)", (task_id, anchor_id)))
+            if task_id == anchor_id or len(ranks) < 2:
+                self._unchanged()
+                return False
+            if after:
+                query = "SELECT id, position FROM tasks WHERE position > ? ORDER BY position LIMIT 1"
+            else:
+                query = "SELECT id, position FROM tasks WHERE position < ? ORDER BY position DESC LIMIT 1"
+
+            def free_rank(anchor: int) -> tuple:
+                """(neighbour's ID, rank between it and the anchor or None if there is no room)."""
+                neighbour_id, other = self.conn.execute(query, (anchor,)).fetchone() or (None, None)
+                return neighbour_id, rank_between(anchor, other) if after else rank_between(other, anchor)
+
+            neighbour_id, rank = free_rank(ranks[anchor_id])
+            if neighbour_id == task_id:
+                self._unchanged()  # Already there
+                return False
+            self._remember_tasks("move", [task_id])
+            if rank is None:
+                # No room left between the neighbours: respace every rank once
+                self._remember_tasks("move", self.task_ids())
+                self._rerank()
+                anchor_rank = self.conn.execute("SELECT position FROM tasks WHERE id = ?", (anchor_id,)).fetchone()[0]
+                _, rank = free_rank(anchor_rank)
+            self.conn.execute("UPDATE tasks SET position = ? WHERE id = ?", (rank, task_id))
+            self._maybe_flush()
+            return True
+
+    def _rerank(self) -> None:
+        """Respace every rank RANK_GAP apart, keeping the order."""
+        ids = [row[0] for row in self.conn.execute("SELECT id FROM tasks ORDER BY position")]
+        self.conn.executemany(
+            "UPDATE tasks SET position = ? WHERE id = ?", ((i * RANK_GAP, task_id) for i, task_id in enumerate(ids, 1))
+        )
+
+    def _neighbour_id(self, task_id: int, step: int, workspace_id: Optional[int]) -> Optional[int]:
+        """ID of the nearest task ``step`` (1 or -1) rows away with the given workspace (None for any)."""
+        row = self.conn.execute("SELECT position FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        if step > 0:
+            sql, order = "SELECT id FROM tasks WHERE position > ?", "position"
+        else:
+            sql, order = "SELECT id FROM tasks WHERE position < ?", "position DESC"
+        params = [row[0]]
+        if workspace_id is not None:
+            sql += " AND workspace_id = ?"
+            params.append(workspace_id)
+        row = self.conn.execute(f"{sql} ORDER BY {order} LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def clear_completed(self) -> int:
+        """Remove all completed tasks and archive them to history. Returns number of tasks archived."""
+        with self._mutex:
+            self._begin()
+            last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM history").fetchone()[0]
+            self.conn.execute(
+                f"INSERT INTO history ({TASK_COLUMNS}) "
+                f"SELECT {TASK_COLUMNS} FROM tasks WHERE status = 'completed' ORDER BY position"
+            )
+            self.conn.execute("DELETE FROM search_terms WHERE doc IN (SELECT id FROM tasks WHERE status = 'completed')")
+            self._index(self.conn.execute("SELECT -seq, title FROM history WHERE seq > ?", (last_seq,)).fetchall())
+            count = self.conn.execute("DELETE FROM tasks WHERE status = 'completed'").rowcount
+            self._maybe_flush()
+            return count
+
+    def workspace_task_count(self, workspace_id: int) -> int:
+        """Get the number of tasks in a workspace."""
+        return self.conn.execute("SELECT COUNT(*) FROM tasks WHERE workspace_id = ?", (workspace_id,)).fetchone()[0]
+
+    def workspace_stats(self) -> Dict[Optional[int], WorkspaceStats]:
+        """Get task counts for every workspace with a single grouped query."""
+        rows = self.conn.execute(
+            "SELECT workspace_id, COUNT(*), "
+            "SUM(status = 'pending'), SUM(status = 'completed'), "
+            "SUM(priority = 'high'), SUM(priority = 'medium'), SUM(priority = 'low') "
+            "FROM tasks GROUP BY workspace_id"
+        )
+        return {row[0]: WorkspaceStats(*(n or 0 for n in row[1:])) for row in rows}
+
+    # ─── History ───────────────────────────────────────────────────────────────
+
+    def load_history(self) -> List[Task]:
+        """Load all archived tasks, oldest first."""
+        rows = self.conn.execute(f"SELECT {TASK_COLUMNS} FROM history ORDER BY seq")
+        return [_task_from_row(row) for row in rows]
+
+    def iter_history(self, since: Optional[str] = None, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks newest first, fetching rows as they are consumed."""
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("completed_at >= ?")
+            params.append(since)
+        if workspace_id is not None:
+            conditions.append("workspace_id = ?")
+            params.append(workspace_id)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(f"SELECT {TASK_COLUMNS} FROM history{where} ORDER BY seq DESC", params)
+        return (_task_from_row(row) for row in rows)
+
+    def history_count(self) -> int:
+        """Number of archived tasks."""
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def save_history(self, tasks: List[Task]) -> None:
+        """Replace the history with the given tasks."""
+        with self._mutex:
+            self.conn.execute("DELETE FROM history")
+            self.conn.executemany(
+                f"INSERT INTO history ({TASK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_task_to_row(t) for t in tasks),
+            )
+            self._reindex(tasks=False)
+            self._maybe_flush()
+
+    def clear_history(self) -> int:
+        """Clear all history. Returns number of tasks removed."""
+        with self._mutex:
+            count = self.conn.execute("DELETE FROM history").rowcount
+            self.conn.execute("DELETE FROM search_terms WHERE doc < 0")
+            self._maybe_flush()
+            return count
+
+    # ─── Workspaces ────────────────────────────────────────────────────────────
+
+    def workspaces(self) -> List[Workspace]:
+        """Return all workspaces."""
+        rows = self.conn.execute("SELECT id, name, created_at FROM workspaces ORDER BY position")
+        return [Workspace(id=row[0], name=row[1], created_at=row[2]) for row in rows]
+
+    def get_workspace(self, workspace_id: int) -> Optional[Workspace]:
+        """Look up a workspace by ID."""
+        row = self.conn.execute(
+            "SELECT id, name, created_at FROM workspaces WHERE id = ?", (workspace_id,)
+        ).fetchone()
+        return Workspace(id=row[0], name=row[1], created_at=row[2]) if row else None
+
+    def replace_workspaces(self, workspaces: List[Workspace]) -> None:
+        """Replace every workspace with the given list."""
+        with self._mutex:
+            self.conn.execute("DELETE FROM workspaces")
+            self.conn.executemany(
+                "INSERT INTO workspaces (id, name, created_at, position) VALUES (?, ?, ?, ?)",
+                ((ws.id, ws.name, ws.created_at, i) for i, ws in enumerate(workspaces)),
+            )
+            self._maybe_flush()
+
+    def add_workspace(self, name: str) -> Workspace:
+        """Create a new workspace."""
+        with self._mutex:
+            self._begin()
+            next_id, next_position = self.conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1, COALESCE(MAX(position), -1) + 1 FROM workspaces"
+            ).fetchone()
+            workspace = Workspace(id=next_id, name=name)
+            self._remember_workspace("add workspace", workspace.id, new=True)
+            self.conn.execute(
+                "INSERT INTO workspaces (id, name, created_at, position) VALUES (?, ?, ?, ?)",
+                (workspace.id, workspace.name, workspace.created_at, next_position),
+            )
+            self._maybe_flush()
+            return workspace
+
+    def delete_workspace(self, workspace_id: int) -> bool:
+        """Delete a workspace and all its tasks. Returns True if found and deleted."""
+        with self._mutex:
+            if self._recording():
+                self._remember_workspace("delete workspace", workspace_id)
+                self._remember_tasks("delete workspace", self.task_ids(workspace_id))
+            cursor = self.conn.execute("DELETE FROM workspaces WHERE id = ?", (workspace_id,))
+            if cursor.rowcount == 0:
+                self._unchanged()
+                return False
+            self.conn.execute(
+                "DELETE FROM search_terms WHERE doc IN (SELECT id FROM tasks WHERE workspace_id = ?)", (workspace_id,)
+            )
+            self.conn.execute("DELETE FROM tasks WHERE workspace_id = ?", (workspace_id,))
+            self._maybe_flush()
+            return True
+
+    def update_workspace_name(self, workspace_id: int, new_name: str) -> bool:
+        """Update a workspace's name. Returns True if found."""
+        with self._mutex:
+            self._remember_workspace("rename workspace", workspace_id)
+            return self._changed(
+                self.conn.execute("UPDATE workspaces SET name = ? WHERE id = ?", (new_name, workspace_id))
+            )
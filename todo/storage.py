@@ -1,47 +1,980 @@
-"""JSON file storage for tasks and workspaces."""
+"""Storage for tasks and workspaces.
 
+The module-level functions operate on a process-wide store, which is the
+JSON ``TaskStore`` by default or the SQLite store when selected with the
+SILO_BACKEND environment variable or the ``backend`` entry in
+``~/.todo/config.json``.
+"""
+
+import atexit
 import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
 
-from .models import Task, Workspace
+from . import perf
+from .backend import (
+    FLUSH_IMMEDIATE, FLUSH_POLICIES, StorageBackend, copy_store, filter_codes, filter_tasks,
+)
+from .fileio import FSYNC_ALWAYS, FSYNC_BATCHED, FileLock, atomic_write_text, file_signature, read_json, read_recovering
+from .formats import DEFAULT_FORMAT, get_format
+from .history import HistoryLog
+from .journal import (
+    DEFAULT_COMPACT_THRESHOLD, Journal, apply_record, insert_by_rank, read_snapshot, replay_records, write_snapshot,
+)
+from .models import Task, Workspace, WorkspaceStats, ensure_ranks, rank_between, renumber_ranks
+from .search import SearchIndex
+from .undo import Change, UndoLog
 
 
 # Default storage location
 DEFAULT_TODO_DIR = Path.home() / ".todo"
 DEFAULT_TASKS_FILE = DEFAULT_TODO_DIR / "tasks.json"
-DEFAULT_HISTORY_FILE = DEFAULT_TODO_DIR / "history.json"
+DEFAULT_HISTORY_DIR = DEFAULT_TODO_DIR / "history"
 DEFAULT_WORKSPACES_FILE = DEFAULT_TODO_DIR / "workspaces.json"
+DEFAULT_CONFIG_FILE = DEFAULT_TODO_DIR / "config.json"
+
+BACKENDS = ("json", "sqlite")
 
 
 def ensure_storage_exists() -> None:
     """Create storage directory and files if they don't exist."""
     DEFAULT_TODO_DIR.mkdir(parents=True, exist_ok=True)
-    if not DEFAULT_TASKS_FILE.exists():
-        DEFAULT_TASKS_FILE.write_text("[]")
-    if not DEFAULT_HISTORY_FILE.exists():
-        DEFAULT_HISTORY_FILE.write_text("[]")
-    if not DEFAULT_WORKSPACES_FILE.exists():
-        DEFAULT_WORKSPACES_FILE.write_text("[]")
+    for path in (DEFAULT_TASKS_FILE, DEFAULT_WORKSPACES_FILE):
+        if not path.exists():
+            atomic_write_text(path, "[]", backup=False)
+    DEFAULT_HISTORY_DIR.mkdir(exist_ok=True)
+
+
+class TaskStore(StorageBackend):
+    """In-memory store for tasks and workspaces backed by the JSON files.
+
+    Each file is parsed once and kept in memory together with an id -> object
+    index, so mutations only touch the affected record. Task and workspace
+    writes are flushed according to ``flush_policy``; anything still dirty
+    is flushed at exit. Archived tasks are appended to segments under
+    ``history/`` (see ``todo.history``).
+
+    Mutations run under an in-memory lock and re-read any file another
+    process has changed before applying themselves. Only the files whose
+    signature changed are re-read. Writes run under an advisory lock on
+    ``<root>/.lock`` that is shared with other silo processes; the lock file
+    also holds a generation counter bumped on every write. ``flush()`` holds
+    the in-memory lock only while it takes the pending changes, so a flush
+    in a background thread never holds up mutations. If another process
+    committed since our unwritten task changes were made, they are replayed
+    on top of the new state instead of overwriting it: an added task whose
+    ID was taken meanwhile gets the next free one, and for the same field of
+    the same task the last writer wins.
+
+    With ``journal=True``, task mutations are appended to ``tasks.journal``
+    instead of rewriting ``tasks.json`` (see ``todo.journal``).
+
+    ``tasks.json`` is written in ``file_format`` and read in whatever format
+    it was written in (see ``todo.formats``).
+
+    A batch holds the in-memory lock from start to end, so the files are
+    read once and not checked again until it is written.
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_TODO_DIR,
+        flush_policy: str = FLUSH_IMMEDIATE,
+        flush_interval: float = 1.0,
+        journal: bool = False,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+        fsync_policy: str = FSYNC_BATCHED,
+        file_format: str = DEFAULT_FORMAT,
+    ) -> None:
+        super().__init__(flush_policy, flush_interval, fsync_policy)
+        get_format(file_format)
+        self.root = root
+        self.tasks_file = root / "tasks.json"
+        self.workspaces_file = root / "workspaces.json"
+        self.journaled = journal
+        self.file_format = file_format
+        self.lock = FileLock(root / ".lock")
+        self.journal = Journal(
+            root / "tasks.journal", self.tasks_file, compact_threshold, fsync_policy, self.lock, file_format
+        )
+        self.history = HistoryLog(
+            root / "history", (root / "history.json", root / "history.jsonl"), self.lock, fsync_policy
+        )
+
+        self._tasks: Optional[List[Task]] = None
+        self._task_index: Dict[int, Task] = {}
+        self._positions: Optional[Dict[int, int]] = None  # id -> list position, built lazily
+        self._next_task_id = 1
+        self._seq = 0  # Last journal sequence number applied
+        self._pending: List[dict] = []  # Task change records not yet written
+        self._search: Optional[SearchIndex] = None  # Title index, built on first search
+        self._workspaces: Optional[List[Workspace]] = None
+        self._workspace_index: Dict[int, Workspace] = {}
+        self._next_workspace_id = 1
+
+        self._signatures: Dict[Path, Optional[Tuple[int, int, int]]] = {}
+        self._dirty: set = set()
+        self._batch_start = 0  # Pending records made before the current batch
+        self._batch_workspaces: Optional[Tuple[List[Workspace], bool]] = None  # (copies, dirty) for rollback
+
+        # Lock order: _mem, then _flush_lock, then the file lock. A flush
+        # takes _flush_lock under _mem and writes after releasing _mem.
+        self._mem = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flushing = False  # Our own writes are under way, so changed files aren't news
+        self._writing: List[dict] = []  # Records taken by a flush and not yet on disk
+        self._writing_dirty: set = set()
+        # (seq, tasks, renumbered IDs) of a flush that replayed over another process's writes
+        self._rebased: Optional[Tuple[int, List[Task], Dict[int, int]]] = None
+        self._replayed = False  # A rebase was taken up and not yet reported by has_external_changes
+        #: Times unwritten task changes were replayed over another process's writes
+        self.conflicts = 0
+
+    # ─── Loading ───────────────────────────────────────────────────────────────
+
+    def _ensure_files(self) -> None:
+        """Create the storage directory and files if they don't exist."""
+        missing = [p for p in (self.tasks_file, self.workspaces_file) if not p.exists()]
+        if not missing:
+            return
+        with self.lock:
+            for path in missing:
+                if not path.exists():
+                    atomic_write_text(path, "[]", self.fsync_policy, backup=False)
+
+    def _read_json_list(self, path: Path, from_dict: Callable[[dict], Any]) -> list:
+        """Read a JSON list from disk, building each item with ``from_dict``, and remember the file signature.
+
+        A file that can't be parsed, or holds an item ``from_dict`` can't
+        build, is restored from its backup; if that fails too,
+        CorruptFileError is raised rather than treating the file as empty.
+        """
+        def parse(data: bytes) -> list:
+            items = json.loads(data)
+            if not isinstance(items, list):
+                return []
+            try:
+                return [from_dict(item) for item in items]
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Damaged record in {path.name}: {e}") from e
+
+        self._ensure_files()
+        items = read_recovering(path, parse, [])
+        self._signatures[path] = file_signature(path)
+        return items
+
+    def _is_stale(self, path: Path) -> bool:
+        """Check whether a file changed on disk since it was last read or written.
+
+        Atomic writes always replace the inode, so the signature catches
+        other silo processes as well as edits made outside silo.
+        """
+        return file_signature(path) != self._signatures.get(path)
+
+    def _tasks_stale(self) -> bool:
+        """Check whether the snapshot or journal changed on disk behind our back."""
+        return self.journal.current_signature() != self.journal.known_signature
+
+    def watched_paths(self) -> List[Path]:
+        """Files that change when another process writes to this store."""
+        return [self.tasks_file, self.journal.path, self.workspaces_file]
+
+    def has_external_changes(self) -> bool:
+        """Check whether another process changed tasks or workspaces since we last read them."""
+        if self._rebased is not None or self._replayed:
+            self._replayed = False
+            return True
+        if self._flushing:
+            return False
+        if self._tasks is not None and self._tasks_stale():
+            return True
+        return self._workspaces is not None and self._is_stale(self.workspaces_file)
+
+    def _load_tasks(self) -> List[Task]:
+        """Return the in-memory task list, (re)loading it if needed.
+
+        If the files changed while we hold unwritten changes, those changes
+        are replayed on top of the new contents.
+        """
+        if self._tasks is None:
+            with self._mem:
+                self._read_tasks()
+        elif self._rebased is not None:
+            with self._mem:
+                self._adopt_rebase()
+        elif not self._batch_depth and not self._flushing and self._tasks_stale():
+            with self._mem, self.lock:
+                # Check again: a flush may have finished meanwhile
+                if not self._flushing and self._tasks_stale():
+                    if self._pending:
+                        self.conflicts += 1
+                    self._read_tasks()
+        return self._tasks
+
+    def _read_task_files(self) -> Tuple[int, List[Task]]:
+        """Read the snapshot and replay any journal records on top of it. Returns the last seq and the tasks."""
+        self._ensure_files()
+        self.journal.remember_signature()
+        seq, tasks = read_snapshot(self.tasks_file)
+        index = {t.id: t for t in tasks}
+        for record in self.journal.read(after_seq=seq):
+            apply_record(tasks, index, record)
+            seq = record["s"]
+        ensure_ranks(tasks)  # Files from before ranks existed are ordered by position alone
+        return seq, tasks
+
+    def _read_tasks(self) -> None:
+        """Read the files and replay our unwritten records, including any a flush is still writing.
+
+        Runs under the file lock, so a flush's records are either on disk or
+        still held by it.
+        """
+        with self.lock:
+            seq, tasks = self._read_task_files()
+            self._seq = replay_records(tasks, seq, self._writing + self._pending, {})
+        self._set_tasks(tasks)
+        self._search = None
+
+    def _adopt_rebase(self) -> None:
+        """Take up the tasks a flush replayed over another process's writes, with our newer records on top."""
+        rebased, self._rebased = self._rebased, None
+        if rebased is None:
+            return
+        seq, tasks, renumbered = rebased
+        for old_id, new_id in renumbered.items():
+            task = self._task_index.get(old_id)
+            if task is not None:
+                task.id = new_id  # So callers holding the added task see its final ID
+        self._seq = replay_records(tasks, seq, self._pending, renumbered)
+        self._set_tasks(tasks)
+        self._search = None
+        self.conflicts += 1
+        self._replayed = True
+
+    def _load_workspaces(self) -> List[Workspace]:
+        """Return the in-memory workspace list, (re)loading it if needed. Unwritten changes are kept."""
+        if self._workspaces is None or (
+            not self._batch_depth and not self._flushing and "workspaces" not in self._dirty
+            and self._is_stale(self.workspaces_file)
+        ):
+            self._set_workspaces(self._read_json_list(self.workspaces_file, Workspace.from_dict))
+        return self._workspaces
+
+    def _set_tasks(self, tasks: List[Task]) -> None:
+        """Replace the task list and rebuild the index."""
+        self._tasks = tasks
+        self._task_index = {t.id: t for t in tasks}
+        self._positions = None
+        self._next_task_id = get_next_id(tasks)
+
+    def _set_workspaces(self, workspaces: List[Workspace]) -> None:
+        """Replace the workspace list and rebuild the index."""
+        self._workspaces = workspaces
+        self._workspace_index = {ws.id: ws for ws in workspaces}
+        self._next_workspace_id = get_next_workspace_id(workspaces)
+
+    def reload(self) -> None:
+        """Drop cached data so the next access re-reads the files.
+
+        Records a flush has already taken are kept, as they are on their way to disk.
+        """
+        with self._mem:
+            self._tasks = None
+            self._workspaces = None
+            self._rebased = None
+            self._pending = []
+            self._dirty = set()
+
+    # ─── Flushing ──────────────────────────────────────────────────────────────
+
+    def _mark_dirty(self, *records: dict) -> None:
+        """Record a pending task change and flush according to the policy.
+
+        ``records`` describe the mutation; they go to the journal in journal
+        mode and are replayed if another process writes first.
+        """
+        for record in records:
+            self._seq += 1
+            record["s"] = self._seq
+            self._pending.append(record)
+        self._dirty.add("tasks")
+        self._maybe_flush()
+
+    def _write_json_list(self, path: Path, data: list) -> None:
+        """Write a JSON list to disk and remember the new file signature."""
+        self._ensure_files()
+        with self.lock:
+            atomic_write_text(path, json.dumps(data, indent=2), self.fsync_policy)
+            self._signatures[path] = file_signature(path)
+            self.lock.bump_generation()
+
+    def _write_workspaces(self) -> None:
+        """Mark the workspace list changed and flush according to the policy."""
+        self._dirty.add("workspaces")
+        self._maybe_flush()
+
+    def _write_tasks_snapshot(self, seq: int, tasks: List[Task]) -> None:
+        """Rewrite tasks.json in full, folding in and removing any journal."""
+        self._ensure_files()
+        if self.journal.exists():
+            # Record the covered sequence first so a crash can't replay records twice
+            self.journal.wait()
+            write_snapshot(self.tasks_file, seq, tasks, self.fsync_policy, self.file_format)
+            self.journal.remove()
+        else:
+            write_snapshot(self.tasks_file, 0, tasks, self.fsync_policy, self.file_format)
+        self.journal.remember_signature()
+
+    def set_file_format(self, file_format: str) -> None:
+        """Write tasks.json in another format from now on, converting it at once."""
+        get_format(file_format)
+        with self._mem:
+            self.file_format = self.journal.snapshot_format = file_format
+            self._load_tasks()
+            self.flush()
+            tasks = self._load_tasks()
+            with self.lock:
+                self._write_tasks_snapshot(self._seq, tasks)
+                self.lock.bump_generation()
+
+    def flush(self) -> None:
+        """Write any pending changes to disk.
+
+        Holds the in-memory lock only to take the pending changes and copy
+        what is to be written, so mutations in other threads carry on while
+        the files are written under the file lock. If another process wrote
+        first, the changes are replayed over its state before anything is
+        written, and the result is taken up once the lock is free again.
+        """
+        if not (self._dirty or self._writing_dirty):
+            self._flush_undo()
+            return
+        with self._mem:
+            self._flush_lock.acquire()
+            try:
+                self._adopt_rebase()
+                records = self._writing = self._writing + self._pending
+                dirty = self._writing_dirty = self._writing_dirty | self._dirty
+                self._pending = []
+                self._dirty = set()
+                workspaces = None
+                if "workspaces" in dirty and self._workspaces is not None:
+                    workspaces = [ws.to_dict() for ws in self._workspaces]
+                fields = None
+                if "tasks" in dirty and self._tasks is not None and not self.journaled:
+                    fields = [t._fields() for t in self._tasks]
+                seq = self._seq
+                known = self.journal.known_signature
+                self._flushing = True
+            except BaseException:
+                self._flush_lock.release()
+                raise
+        try:
+            with self.lock:
+                if workspaces is not None:
+                    self._write_json_list(self.workspaces_file, workspaces)
+                if "tasks" in dirty:
+                    self._write_records(records, fields, seq, known)
+                    self.lock.bump_generation()
+                self._writing = []
+                self._writing_dirty = set()
+        finally:
+            # After a failure the records stay in _writing, to be retried by the next flush
+            self._flushing = False
+            self._flush_lock.release()
+        if self._rebased is not None:
+            with self._mem:
+                self._adopt_rebase()
+        self._flush_undo()
+
+    def _write_records(self, records: List[dict], fields: Optional[List[tuple]], seq: int, known: Optional[tuple]) -> None:
+        """Write taken task records, or the copied task ``fields`` outside journal mode. Runs under the file lock.
+
+        ``known`` is the file signature the records were made against; if
+        the files changed since, the records are replayed over what is on
+        disk and the replayed tasks are handed back through ``_rebased``
+        for ``flush()`` to take up.
+        """
+        if self.journal.current_signature() != known:
+            seq, tasks = self._read_task_files()
+            renumbered: Dict[int, int] = {}
+            seq = replay_records(tasks, seq, records, renumbered)
+            if self.journaled:
+                self.journal.append(records)
+            else:
+                self._write_tasks_snapshot(seq, tasks)
+            self._rebased = (seq, tasks, renumbered)
+        elif self.journaled:
+            self.journal.append(records)
+            if self.journal.needs_compaction():
+                self.journal.compact_in_background(seq)
+        elif fields is not None:
+            self._write_tasks_snapshot(seq, [Task.from_codes(*f) for f in fields])
+
+    def _flush_undo(self) -> None:
+        if self.undo_log is not None:
+            self.undo_log.flush()
+        self._last_flush = time.monotonic()
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes that haven't been written yet."""
+        return bool(self._dirty or self._writing_dirty)
+
+    def _begin_batch(self) -> None:
+        """Bring the data up to date and mark where the batch's records start."""
+        self._load_tasks()
+        workspaces = self._load_workspaces()
+        self._batch_start = len(self._pending)
+        self._batch_workspaces = ([Workspace.from_dict(ws.to_dict()) for ws in workspaces], "workspaces" in self._dirty)
+
+    def _end_batch(self) -> None:
+        """Forget the workspaces kept for rollback."""
+        self._batch_workspaces = None
+
+    def rollback(self) -> None:
+        """Discard the batch's changes: re-read the files and replay any unwritten records from before it."""
+        pending = self._pending[:self._batch_start]
+        workspaces, workspaces_dirty = self._batch_workspaces
+        self._batch_workspaces = None
+        self._rebased = None
+        self._pending = pending
+        self._dirty = {"tasks"} if pending else set()
+        self._read_tasks()
+        self._set_workspaces(workspaces)
+        if workspaces_dirty:
+            self._dirty.add("workspaces")
+
+    def _step_lock(self) -> ContextManager:
+        """Undo and redo only need the in-memory lock; the undo log is written by ``flush()``."""
+        return self._mem
+
+    @contextmanager
+    def batch(self) -> Iterator["TaskStore"]:
+        """Apply a group of mutations with a single load and a single write, holding the in-memory lock throughout."""
+        with self._mem, super().batch():
+            yield self
+
+    # ─── Tasks ─────────────────────────────────────────────────────────────────
+
+    def tasks(self, workspace_id: Optional[int] = None) -> List[Task]:
+        """Return tasks in display order, filtered by workspace. None means all tasks."""
+        tasks = self._load_tasks()
+        if workspace_id is None:
+            return list(tasks)
+        return [t for t in tasks if t.workspace_id == workspace_id]
+
+    def iter_tasks(
+        self,
+        workspace_id: Optional[int] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Task]:
+        """Yield matching tasks in display order straight from the loaded list, without copying it."""
+        status_code, priority_code = filter_codes(status, priority)
+        return islice(filter_tasks(self._load_tasks(), workspace_id, status_code, priority_code), limit)
+
+    def _position_index(self) -> Dict[int, int]:
+        """Return the id -> list position index, building it if needed."""
+        if self._positions is None:
+            self._positions = {t.id: i for i, t in enumerate(self._tasks)}
+        return self._positions
+
+    def _position(self, task_id: int) -> int:
+        """Return the list position of a task."""
+        return self._position_index()[task_id]
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        """Look up a task by ID."""
+        self._load_tasks()
+        return self._task_index.get(task_id)
+
+    def task_ids(self, workspace_id: Optional[int] = None) -> List[int]:
+        """Return task IDs in display order, filtered by workspace. None means all tasks."""
+        tasks = self._load_tasks()
+        if workspace_id is None:
+            return [t.id for t in tasks]
+        return [t.id for t in tasks if t.workspace_id == workspace_id]
+
+    def get_tasks(self, task_ids: List[int]) -> Dict[int, Task]:
+        """Look up several tasks by ID. Missing IDs are left out."""
+        self._load_tasks()
+        index = self._task_index
+        return {task_id: index[task_id] for task_id in task_ids if task_id in index}
+
+    def replace_tasks(self, tasks: List[Task]) -> None:
+        """Replace every task with the given list."""
+        with self._mem:
+            self._load_tasks()
+            tasks = list(tasks)
+            ensure_ranks(tasks)
+            self._set_tasks(tasks)
+            self._search = None
+            self._mark_dirty({"op": "reset", "tasks": [t.to_dict() for t in self._tasks]})
+
+    def add_task(self, title: str, workspace_id: Optional[int] = None) -> Task:
+        """Create a new task at the end of the list."""
+        return self._append(Task(id=0, title=title, workspace_id=workspace_id))
+
+    def insert_task(self, task: Task) -> Task:
+        """Add a copy of ``task`` at the end of the list under a new ID, keeping its other fields."""
+        return self._append(Task.from_codes(*task._fields()))
+
+    def _append(self, task: Task) -> Task:
+        """Give a new task the next ID and add it at the end of the list."""
+        with self._mem:
+            tasks = self._load_tasks()
+            task.id = self._next_task_id
+            task.rank = rank_between(tasks[-1].rank if tasks else None, None)
+            self._remember_tasks("add", [task.id], new=True)
+            tasks.append(task)
+            self._task_index[task.id] = task
+            if self._positions is not None:
+                self._positions[task.id] = len(tasks) - 1
+            self._next_task_id = task.id + 1
+            if self._search is not None:
+                self._search.add(task.id, task.title)
+            self._mark_dirty({"op": "add", "task": task.to_dict()})
+            return task
+
+    def delete_task(self, task_id: int) -> bool:
+        """Delete a task by ID. Returns True if task was found and deleted."""
+        with self._mem:
+            tasks = self._load_tasks()
+            if task_id not in self._task_index:
+                return False
+            self._remember_tasks("delete", [task_id])
+            i = self._position(task_id)
+            del tasks[i]
+            del self._task_index[task_id]
+            del self._positions[task_id]
+            # Shift the tasks after it up one; cheaper than rebuilding the whole index
+            self._positions.update(zip(map(attrgetter("id"), tasks[i:]), range(i, len(tasks))))
+            if self._search is not None:
+                self._search.remove(task_id)
+            self._mark_dirty({"op": "del", "id": task_id})
+            return True
+
+    def delete_tasks(self, task_ids: List[int]) -> int:
+        """Delete several tasks with one pass over the list. Returns the number deleted."""
+        with self._mem:
+            tasks = self._load_tasks()
+            doomed = {task_id for task_id in task_ids if task_id in self._task_index}
+            if not doomed:
+                return 0
+            self._remember_tasks("delete", doomed)
+            tasks[:] = [t for t in tasks if t.id not in doomed]
+            for task_id in doomed:
+                del self._task_index[task_id]
+                if self._search is not None:
+                    self._search.remove(task_id)
+            self._positions = None
+            self._mark_dirty(*({"op": "del", "id": task_id} for task_id in doomed))
+            return len(doomed)
+
+    def restore_tasks(self, tasks: List[Task]) -> None:
+        """Add or overwrite tasks under their own IDs, keeping every field including rank."""
+        if not tasks:
+            return
+        with self._mem:
+            current = self._load_tasks()
+            task_ids = [t.id for t in tasks]
+            self._remember_tasks("restore", task_ids)
+            self._remember_tasks("restore", task_ids, new=True)  # The rest are new
+            replaced = {t.id for t in tasks if t.id in self._task_index}
+            if replaced:
+                current[:] = [t for t in current if t.id not in replaced]
+            records = []
+            for task in tasks:
+                task = Task.from_codes(*task._fields())
+                insert_by_rank(current, task)
+                self._task_index[task.id] = task
+                if self._search is not None:
+                    self._search.add(task.id, task.title)
+                self._next_task_id = max(self._next_task_id, task.id + 1)
+                records.append({"op": "put", "task": task.to_dict()})
+            self._positions = None
+            self._mark_dirty(*records)
+
+    def toggle_task(self, task_id: int) -> bool:
+        """Toggle a task's completion status. Returns True if task was found."""
+        with self._mem:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            self._remember_tasks("toggle", [task_id])
+            task.toggle()
+            self._mark_dirty({"op": "set", "id": task_id, "fields": {"status": task.status, "completed_at": task.completed_at}})
+            return True
+
+    def update_task_title(self, task_id: int, new_title: str) -> bool:
+        """Update a task's title. Returns True if task was found."""
+        with self._mem:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            self._remember_tasks("edit", [task_id])
+            task.title = new_title
+            if self._search is not None:
+                self._search.add(task_id, new_title)
+            self._mark_dirty({"op": "set", "id": task_id, "fields": {"title": new_title}})
+            return True
+
+    def cycle_task_priority(self, task_id: int) -> bool:
+        """Cycle a task's priority. Returns True if task was found."""
+        with self._mem:
+            task = self.get_task(task_id)
+            if task is None:
+                return False
+            self._remember_tasks("priority", [task_id])
+            task.cycle_priority()
+            self._mark_dirty({"op": "set", "id": task_id, "fields": {"priority": task.priority}})
+            return True
+
+    def move_task_before(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just before another, changing only its rank. Returns True if moved."""
+        return self._move(task_id, anchor_id, 0)
+
+    def move_task_after(self, task_id: int, anchor_id: int) -> bool:
+        """Move a task to just after another, changing only its rank. Returns True if moved."""
+        return self._move(task_id, anchor_id, 1)
+
+    def _move(self, task_id: int, anchor_id: int, offset: int) -> bool:
+        """Give a task a rank between the anchor and its neighbour on the ``offset`` side."""
+        with self._mem:
+            tasks = self._load_tasks()
+            if task_id == anchor_id or task_id not in self._task_index or anchor_id not in self._task_index:
+                return False
+            positions = self._position_index()
+            i = positions[task_id]
+            target = positions[anchor_id] + offset  # Where to insert, counted with the task still in place
+            if target == i or target == i + 1:
+                return False
+
+            self._remember_tasks("move", [task_id])
+            low = tasks[target - 1].rank if target > 0 else None
+            high = tasks[target].rank if target < len(tasks) else None
+            rank = rank_between(low, high)
+            if rank is None:
+                # No room left between the neighbours: respace every rank once
+                self._remember_tasks("move", [t.id for t in tasks])
+                renumber_ranks(tasks)
+                self._mark_dirty({"op": "rerank"})
+                rank = rank_between(tasks[target - 1].rank, tasks[target].rank)
+
+            task = tasks.pop(i)
+            if target > i:
+                target -= 1
+            tasks.insert(target, task)
+            task.rank = rank
+            first, last = min(i, target), max(i, target)
+            positions.update(zip(map(attrgetter("id"), tasks[first:last + 1]), range(first, last + 1)))
+            self._mark_dirty({"op": "rank", "id": task_id, "rank": rank})
+            return True
+
+    def _neighbour_id(self, task_id: int, step: int, workspace_id: Optional[int]) -> Optional[int]:
+        """ID of the nearest task ``step`` (1 or -1) rows away with the given workspace (None for any)."""
+        tasks = self._load_tasks()
+        if task_id not in self._task_index:
+            return None
+        i = self._position(task_id) + step
+        while 0 <= i < len(tasks):
+            if workspace_id is None or tasks[i].workspace_id == workspace_id:
+                return tasks[i].id
+            i += step
+        return None
+
+    def clear_completed(self) -> int:
+        """Remove all completed tasks and archive them to history. Returns number of tasks archived.
+
+        Written immediately regardless of the flush policy, so the archived
+        tasks can't end up both in history and in the task list.
+        """
+        with self._mem:
+            tasks = self._load_tasks()
+            completed = [t for t in tasks if t.is_completed()]
+            if not completed:
+                return 0
+
+            self.history.append(completed)
+
+            self._set_tasks([t for t in tasks if not t.is_completed()])
+            self._unindex(completed)
+            # Name each archived task, so a replay over another process's writes removes only these
+            self._mark_dirty(*({"op": "del", "id": t.id} for t in completed))
+            self.flush()
+            return len(completed)
+
+    def workspace_task_count(self, workspace_id: int) -> int:
+        """Get the number of tasks in a workspace."""
+        return sum(1 for t in self._load_tasks() if t.workspace_id == workspace_id)
+
+    # ─── Search ────────────────────────────────────────────────────────────────
+
+    def _search_index(self) -> SearchIndex:
+        """The title index of the loaded tasks, built on first use and then kept up to date."""
+        tasks = self._load_tasks()
+        if self._search is None:
+            self._search = SearchIndex.build((t.id, t.title) for t in tasks)
+        return self._search
+
+    def _unindex(self, tasks: List[Task]) -> None:
+        if self._search is not None:
+            for task in tasks:
+                self._search.remove(task.id)
+
+    def search_task_ids(self, query: str, workspace_id: Optional[int] = None) -> List[int]:
+        """IDs of tasks matching ``query``, in display order. An empty query matches every task."""
+        found = self._search_index().search(query)
+        if found is None:
+            return self.task_ids(workspace_id)
+        tasks = self._tasks
+        if len(found) * 2 < len(tasks):
+            # Sorting the matches by position is cheaper than scanning the list until about half match
+            ids = sorted(found, key=self._position_index().__getitem__)
+        else:
+            ids = [t.id for t in tasks if t.id in found]
+        if workspace_id is None:
+            return ids
+        index = self._task_index
+        return [task_id for task_id in ids if index[task_id].workspace_id == workspace_id]
+
+    def search_history(self, query: str, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks matching ``query``, newest first."""
+        return self.history.search(query, workspace_id)
+
+    # ─── History ───────────────────────────────────────────────────────────────
+
+    def load_history(self) -> List[Task]:
+        """Load all tasks from the history file."""
+        return self.history.load()
+
+    def iter_history(self, since: Optional[str] = None, workspace_id: Optional[int] = None) -> Iterator[Task]:
+        """Yield archived tasks newest first, reading segments backwards as they are consumed."""
+        return self.history.newest_first(since, workspace_id)
+
+    def history_count(self) -> int:
+        """Number of archived tasks."""
+        return self.history.count()
+
+    def save_history(self, tasks: List[Task]) -> None:
+        """Save all tasks to the history file."""
+        self.history.replace(tasks)
+
+    def clear_history(self) -> int:
+        """Clear all history. Returns number of tasks removed."""
+        return self.history.clear()
+
+    # ─── Workspaces ────────────────────────────────────────────────────────────
+
+    def workspaces(self) -> List[Workspace]:
+        """Return all workspaces."""
+        return list(self._load_workspaces())
+
+    def get_workspace(self, workspace_id: int) -> Optional[Workspace]:
+        """Look up a workspace by ID."""
+        self._load_workspaces()
+        return self._workspace_index.get(workspace_id)
+
+    def replace_workspaces(self, workspaces: List[Workspace]) -> None:
+        """Replace every workspace with the given list."""
+        with self._mem:
+            self._set_workspaces(list(workspaces))
+            self._write_workspaces()
+
+    def add_workspace(self, name: str) -> Workspace:
+        """Create a new workspace."""
+        with self._mem:
+            workspaces = self._load_workspaces()
+            workspace = Workspace(id=self._next_workspace_id, name=name)
+            self._remember_workspace("add workspace", workspace.id, new=True)
+            workspaces.append(workspace)
+            self._workspace_index[workspace.id] = workspace
+            self._next_workspace_id = workspace.id + 1
+            self._write_workspaces()
+            return workspace
+
+    def delete_workspace(self, workspace_id: int) -> bool:
+        """Delete a workspace and all its tasks. Returns True if found and deleted."""
+        with self._mem:
+            workspaces = self._load_workspaces()
+            if workspace_id not in self._workspace_index:
+                return False
+            tasks = self._load_tasks()
+            self._remember_workspace("delete workspace", workspace_id)
+            self._remember_tasks("delete workspace", [t.id for t in tasks if t.workspace_id == workspace_id])
+            workspace = self._workspace_index.pop(workspace_id)
+            workspaces.remove(workspace)
+            self._write_workspaces()
+
+            # Also delete all tasks in this workspace
+            remaining = [t for t in tasks if t.workspace_id != workspace_id]
+            if len(remaining) < len(tasks):
+                self._set_tasks(remaining)
+                self._unindex([t for t in tasks if t.workspace_id == workspace_id])
+                self._mark_dirty({"op": "del_ws", "ws": workspace_id})
+            return True
+
+    def update_workspace_name(self, workspace_id: int, new_name: str) -> bool:
+        """Update a workspace's name. Returns True if found."""
+        with self._mem:
+            workspace = self.get_workspace(workspace_id)
+            if workspace is None:
+                return False
+            self._remember_workspace("rename workspace", workspace_id)
+            workspace.name = new_name
+            self._write_workspaces()
+            return True
+
+
+# Config functions
+
+def load_config() -> dict:
+    """Load ~/.todo/config.json. A missing file gives an empty config."""
+    data = read_json(DEFAULT_CONFIG_FILE, {})
+    return data if isinstance(data, dict) else {}
+
+
+def save_config(config: dict) -> None:
+    """Save ~/.todo/config.json."""
+    DEFAULT_TODO_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(DEFAULT_CONFIG_FILE, json.dumps(config, indent=2), FSYNC_ALWAYS)
+
+
+def selected_backend() -> str:
+    """Return the configured backend name: SILO_BACKEND, else config.json, else json."""
+    name = os.environ.get("SILO_BACKEND") or load_config().get("backend") or "json"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name!r} (expected one of {', '.join(BACKENDS)})")
+    return name
+
+
+def selected_format() -> str:
+    """Return the tasks file format: SILO_FORMAT, else config.json, else json."""
+    name = os.environ.get("SILO_FORMAT") or load_config().get("format") or DEFAULT_FORMAT
+    get_format(name)
+    return name
+
+
+def open_store(
+    name: str,
+    root: Path = DEFAULT_TODO_DIR,
+    flush_policy: str = FLUSH_IMMEDIATE,
+    fsync_policy: str = FSYNC_BATCHED,
+    file_format: Optional[str] = None,
+) -> StorageBackend:
+    """Open the named storage backend rooted at ``root``, recording undo in ``<root>/undo.jsonl``.
+
+    ``file_format`` applies to the JSON backend and defaults to ``selected_format()``.
+    """
+    if name == "sqlite":
+        from .sqlite_store import SqliteStore
+
+        store = SqliteStore(root / "silo.db", flush_policy=flush_policy, fsync_policy=fsync_policy)
+        store.undo_log = UndoLog(root / "undo.jsonl", fsync_policy=fsync_policy)
+        return store
+
+    journal = os.environ.get("SILO_JOURNAL", "") == "1"
+    store = TaskStore(
+        root, flush_policy=flush_policy, journal=journal, fsync_policy=fsync_policy,
+        file_format=file_format or selected_format(),
+    )
+    store.undo_log = UndoLog(root / "undo.jsonl", store.lock, fsync_policy)
+    return store
+
+
+_store: Optional[StorageBackend] = None
+
+
+def get_store() -> StorageBackend:
+    """Get the process-wide store shared by the CLI and the TUI.
+
+    The flush policy can be set with the SILO_FLUSH_POLICY environment variable
+    (``immediate``, ``interval`` or ``manual``), the fsync policy with
+    SILO_FSYNC (``always``, ``batched`` or ``never``), and JSON journal mode
+    is enabled with SILO_JOURNAL=1.
+    """
+    global _store
+    if _store is None:
+        policy = os.environ.get("SILO_FLUSH_POLICY", FLUSH_IMMEDIATE)
+        fsync_policy = os.environ.get("SILO_FSYNC", FSYNC_BATCHED)
+        _store = open_store(selected_backend(), DEFAULT_TODO_DIR, flush_policy=policy, fsync_policy=fsync_policy)
+        atexit.register(_store.flush)
+    return _store
+
+
+def migrate(target: str) -> StorageBackend:
+    """Copy all data from the current backend into ``target`` and select it.
+
+    The source files are left in place. Returns the new store.
+    """
+    global _store
+    source = get_store()
+    if source.name == target:
+        raise ValueError(f"Already using the {target} backend")
+
+    new_store = open_store(target, DEFAULT_TODO_DIR, source.flush_policy, source.fsync_policy)
+    copy_store(source, new_store)
+
+    config = load_config()
+    config["backend"] = target
+    save_config(config)
+
+    _store = new_store
+    atexit.register(new_store.flush)
+    return new_store
+
+
+def set_format(file_format: str) -> None:
+    """Convert tasks.json to another format and keep writing it in that format."""
+    store = get_store()
+    if not isinstance(store, TaskStore):
+        raise ValueError("File formats only apply to the json backend")
+    store.set_file_format(file_format)
+    config = load_config()
+    config["format"] = file_format
+    save_config(config)
+
+
+def set_flush_policy(policy: str) -> None:
+    """Change when the process-wide store writes: ``immediate``, ``interval`` or ``manual``."""
+    if policy not in FLUSH_POLICIES:
+        raise ValueError(f"Unknown flush policy: {policy!r}")
+    get_store().flush_policy = policy
+
+
+def flush() -> None:
+    """Write any pending changes to disk."""
+    get_store().flush()
+
+
+def watched_paths() -> List[Path]:
+    """Files that change when another process writes to the store."""
+    return get_store().watched_paths()
+
+
+def has_external_changes() -> bool:
+    """Check whether another process changed the store since we last read it."""
+    return get_store().has_external_changes()
 
 
 def load_tasks() -> List[Task]:
-    """Load all tasks from the JSON file."""
-    ensure_storage_exists()
-    
-    try:
-        data = json.loads(DEFAULT_TASKS_FILE.read_text())
-        return [Task.from_dict(item) for item in data]
-    except (json.JSONDecodeError, KeyError):
-        return []
+    """Load all tasks."""
+    return get_store().tasks()
 
 
 def save_tasks(tasks: List[Task]) -> None:
-    """Save all tasks to the JSON file."""
-    ensure_storage_exists()
-    
-    data = [task.to_dict() for task in tasks]
-    DEFAULT_TASKS_FILE.write_text(json.dumps(data, indent=2))
+    """Replace all tasks."""
+    get_store().replace_tasks(tasks)
 
 
 def get_next_id(tasks: List[Task]) -> int:
@@ -51,163 +984,167 @@ def get_next_id(tasks: List[Task]) -> int:
     return max(task.id for task in tasks) + 1
 
 
+def get_task(task_id: int) -> Optional[Task]:
+    """Get a task by ID."""
+    return get_store().get_task(task_id)
+
+
+def get_tasks(task_ids: List[int]) -> Dict[int, Task]:
+    """Get several tasks by ID. Missing IDs are left out."""
+    return get_store().get_tasks(task_ids)
+
+
+def load_task_ids(workspace_id: Optional[int]) -> List[int]:
+    """Load task IDs in display order, filtered by workspace. None means all tasks."""
+    return get_store().task_ids(workspace_id)
+
+
 def add_task(title: str, workspace_id: Optional[int] = None) -> Task:
     """Create and save a new task."""
-    tasks = load_tasks()
-    new_task = Task(id=get_next_id(tasks), title=title, workspace_id=workspace_id)
-    tasks.append(new_task)
-    save_tasks(tasks)
-    return new_task
+    return get_store().add_task(title, workspace_id)
+
+
+def insert_task(task: Task) -> Task:
+    """Save a copy of a task under a new ID, keeping its other fields."""
+    return get_store().insert_task(task)
+
+
+def batch() -> ContextManager[StorageBackend]:
+    """Group mutations into a single write: ``with storage.batch(): ...``."""
+    return get_store().batch()
+
+
+def iter_tasks(
+    workspace_id: Optional[int] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Iterator[Task]:
+    """Yield tasks in display order matching every filter given, at most ``limit`` of them."""
+    return get_store().iter_tasks(workspace_id, status, priority, limit)
 
 
 def load_tasks_by_workspace(workspace_id: Optional[int]) -> List[Task]:
     """Load tasks filtered by workspace. None means all tasks."""
-    tasks = load_tasks()
-    if workspace_id is None:
-        return tasks
-    return [t for t in tasks if t.workspace_id == workspace_id]
+    return get_store().tasks(workspace_id)
 
 
 def delete_task(task_id: int) -> bool:
     """Delete a task by ID. Returns True if task was found and deleted."""
-    tasks = load_tasks()
-    original_count = len(tasks)
-    tasks = [t for t in tasks if t.id != task_id]
-    
-    if len(tasks) < original_count:
-        save_tasks(tasks)
-        return True
-    return False
+    return get_store().delete_task(task_id)
+
+
+def delete_tasks(task_ids: List[int]) -> int:
+    """Delete several tasks at once. Returns the number deleted."""
+    return get_store().delete_tasks(task_ids)
 
 
 def toggle_task(task_id: int) -> bool:
     """Toggle a task's completion status. Returns True if task was found."""
-    tasks = load_tasks()
-    
-    for task in tasks:
-        if task.id == task_id:
-            task.toggle()
-            save_tasks(tasks)
-            return True
-    return False
+    return get_store().toggle_task(task_id)
 
 
 def update_task_title(task_id: int, new_title: str) -> bool:
     """Update a task's title. Returns True if task was found."""
-    tasks = load_tasks()
-    
-    for task in tasks:
-        if task.id == task_id:
-            task.title = new_title
-            save_tasks(tasks)
-            return True
-    return False
+    return get_store().update_task_title(task_id, new_title)
 
 
 def cycle_task_priority(task_id: int) -> bool:
     """Cycle a task's priority. Returns True if task was found."""
-    tasks = load_tasks()
-    
-    for task in tasks:
-        if task.id == task_id:
-            task.cycle_priority()
-            save_tasks(tasks)
-            return True
-    return False
-
-
-def move_task_up(task_id: int) -> bool:
-    """Move a task up in the list. Returns True if moved."""
-    tasks = load_tasks()
-    
-    for i, task in enumerate(tasks):
-        if task.id == task_id:
-            if i > 0:  # Can only move up if not already at top
-                tasks[i], tasks[i - 1] = tasks[i - 1], tasks[i]
-                save_tasks(tasks)
-                return True
-            return False
-    return False
-
-
-def move_task_down(task_id: int) -> bool:
-    """Move a task down in the list. Returns True if moved."""
-    tasks = load_tasks()
-    
-    for i, task in enumerate(tasks):
-        if task.id == task_id:
-            if i < len(tasks) - 1:  # Can only move down if not already at bottom
-                tasks[i], tasks[i + 1] = tasks[i + 1], tasks[i]
-                save_tasks(tasks)
-                return True
-            return False
-    return False
+    return get_store().cycle_task_priority(task_id)
+
+
+def move_task_up(task_id: int, workspace_id: Optional[int] = None) -> bool:
+    """Move a task above the previous task in a workspace (None means all tasks). Returns True if moved."""
+    return get_store().move_task_up(task_id, workspace_id)
+
+
+def move_task_down(task_id: int, workspace_id: Optional[int] = None) -> bool:
+    """Move a task below the next task in a workspace (None means all tasks). Returns True if moved."""
+    return get_store().move_task_down(task_id, workspace_id)
+
+
+def move_task_before(task_id: int, anchor_id: int) -> bool:
+    """Move a task to just before another. Returns True if moved."""
+    return get_store().move_task_before(task_id, anchor_id)
+
+
+def move_task_after(task_id: int, anchor_id: int) -> bool:
+    """Move a task to just after another. Returns True if moved."""
+    return get_store().move_task_after(task_id, anchor_id)
+
+
+def move_task_to(task_id: int, index: int, workspace_id: Optional[int] = None) -> bool:
+    """Move a task to a row of a workspace's list; 0 is the top and -1 the bottom. Returns True if moved."""
+    return get_store().move_task_to(task_id, index, workspace_id)
 
 
 def clear_completed() -> int:
     """Remove all completed tasks and archive them to history. Returns number of tasks archived."""
-    tasks = load_tasks()
-    completed = [t for t in tasks if t.is_completed()]
-    remaining = [t for t in tasks if not t.is_completed()]
-    
-    if completed:
-        # Archive completed tasks to history
-        history = load_history()
-        history.extend(completed)
-        save_history(history)
-    
-    save_tasks(remaining)
-    return len(completed)
+    return get_store().clear_completed()
+
+
+# Undo functions
+
+def undo() -> Optional[Change]:
+    """Undo the last change to tasks or workspaces. Returns it, or None if there was nothing to undo."""
+    return get_store().undo()
+
+
+def redo() -> Optional[Change]:
+    """Redo the last undone change. Returns it, or None if there was nothing to redo."""
+    return get_store().redo()
+
+
+# Search functions
+
+def search_task_ids(query: str, workspace_id: Optional[int] = None) -> List[int]:
+    """IDs of tasks whose titles match ``query``, in display order."""
+    return get_store().search_task_ids(query, workspace_id)
+
+
+def search_history(query: str, workspace_id: Optional[int] = None) -> Iterator[Task]:
+    """Yield archived tasks whose titles match ``query``, newest first."""
+    return get_store().search_history(query, workspace_id)
 
 
 # History functions
 
 def load_history() -> List[Task]:
     """Load all tasks from the history file."""
-    ensure_storage_exists()
-    
-    try:
-        data = json.loads(DEFAULT_HISTORY_FILE.read_text())
-        return [Task.from_dict(item) for item in data]
-    except (json.JSONDecodeError, KeyError):
-        return []
+    return get_store().load_history()
+
+
+def iter_history(since: Optional[str] = None, workspace_id: Optional[int] = None) -> Iterator[Task]:
+    """Yield archived tasks newest first, optionally filtered."""
+    return get_store().iter_history(since, workspace_id)
+
+
+def history_count() -> int:
+    """Number of archived tasks."""
+    return get_store().history_count()
 
 
 def save_history(tasks: List[Task]) -> None:
     """Save all tasks to the history file."""
-    ensure_storage_exists()
-    
-    data = [task.to_dict() for task in tasks]
-    DEFAULT_HISTORY_FILE.write_text(json.dumps(data, indent=2))
+    get_store().save_history(tasks)
 
 
 def clear_history() -> int:
     """Clear all history. Returns number of tasks removed."""
-    history = load_history()
-    count = len(history)
-    DEFAULT_HISTORY_FILE.write_text("[]")
-    return count
+    return get_store().clear_history()
 
 
 # Workspace functions
 
 def load_workspaces() -> List[Workspace]:
-    """Load all workspaces from the JSON file."""
-    ensure_storage_exists()
-    
-    try:
-        data = json.loads(DEFAULT_WORKSPACES_FILE.read_text())
-        return [Workspace.from_dict(item) for item in data]
-    except (json.JSONDecodeError, KeyError):
-        return []
+    """Load all workspaces."""
+    return get_store().workspaces()
 
 
 def save_workspaces(workspaces: List[Workspace]) -> None:
-    """Save all workspaces to the JSON file."""
-    ensure_storage_exists()
-    
-    data = [ws.to_dict() for ws in workspaces]
-    DEFAULT_WORKSPACES_FILE.write_text(json.dumps(data, indent=2))
+    """Replace all workspaces."""
+    get_store().replace_workspaces(workspaces)
 
 
 def get_next_workspace_id(workspaces: List[Workspace]) -> int:
@@ -217,45 +1154,36 @@ def get_next_workspace_id(workspaces: List[Workspace]) -> int:
     return max(ws.id for ws in workspaces) + 1
 
 
+def get_workspace(workspace_id: int) -> Optional[Workspace]:
+    """Get a workspace by ID."""
+    return get_store().get_workspace(workspace_id)
+
+
 def add_workspace(name: str) -> Workspace:
     """Create and save a new workspace."""
-    workspaces = load_workspaces()
-    new_workspace = Workspace(id=get_next_workspace_id(workspaces), name=name)
-    workspaces.append(new_workspace)
-    save_workspaces(workspaces)
-    return new_workspace
+    return get_store().add_workspace(name)
 
 
 def delete_workspace(workspace_id: int) -> bool:
     """Delete a workspace and all its tasks. Returns True if found and deleted."""
-    workspaces = load_workspaces()
-    original_count = len(workspaces)
-    workspaces = [ws for ws in workspaces if ws.id != workspace_id]
-    
-    if len(workspaces) < original_count:
-        save_workspaces(workspaces)
-        # Also delete all tasks in this workspace
-        tasks = load_tasks()
-        tasks = [t for t in tasks if t.workspace_id != workspace_id]
-        save_tasks(tasks)
-        return True
-    return False
+    return get_store().delete_workspace(workspace_id)
 
 
 def update_workspace_name(workspace_id: int, new_name: str) -> bool:
     """Update a workspace's name. Returns True if found."""
-    workspaces = load_workspaces()
-    
-    for ws in workspaces:
-        if ws.id == workspace_id:
-            ws.name = new_name
-            save_workspaces(workspaces)
-            return True
-    return False
+    return get_store().update_workspace_name(workspace_id, new_name)
 
 
 def get_workspace_task_count(workspace_id: int) -> int:
     """Get the number of tasks in a workspace."""
-    tasks = load_tasks()
-    return len([t for t in tasks if t.workspace_id == workspace_id])
+    return get_store().workspace_task_count(workspace_id)
+
+
+def get_workspace_stats() -> Dict[Optional[int], WorkspaceStats]:
+    """Get total, pending, completed and per-priority counts for every workspace."""
+    return get_store().workspace_stats()
+
 
+# Under SILO_PROFILE=1, time every function above. Those returning a context
+# manager or a lazy iterator do their work after they return, so aren't timed.
+perf.instrument(globals(), "storage", exclude=("get_store", "batch", "iter_tasks", "iter_history", "search_history"))
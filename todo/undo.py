@@ -0,0 +1,255 @@
+"""Undo and redo of store mutations.
+
+Before a mutation changes a task or workspace, the store keeps a copy of
+that record as it was, or notes that it didn't exist yet, in a ``Change``.
+A change is the inverse delta of the mutation: applying it puts the copies
+back and deletes the records that were new. Applying a change also yields
+the inverse of what it did, which becomes the redo entry. A store batch
+collects a single change however many records it touches, so undoing a
+bulk delete of 1,000 tasks is one batched write.
+
+``UndoLog`` holds the undo and redo stacks. Each keeps at most UNDO_LIMIT
+changes and about UNDO_MAX_RECORDS records, dropping the oldest first. The
+stacks are persisted, when the store flushes, as an append-only log of
+record, push and pop operations, one JSON line each, so ``silo undo`` can
+undo what the TUI did and the other way round. The log is rewritten from
+the stacks once it is several times longer than they are.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from . import perf
+from .fileio import FSYNC_ALWAYS, FSYNC_BATCHED, FileLock, after_write, atomic_write_text, file_signature
+from .models import Task, Workspace
+
+
+# Changes kept on each stack
+UNDO_LIMIT = 100
+# Records (tasks plus workspaces) kept on each stack; the newest change is always kept
+UNDO_MAX_RECORDS = 100_000
+# Rewrite the log once it has this many times more lines than the stacks hold changes
+COMPACT_FACTOR = 4
+
+UNDO = "undo"
+REDO = "redo"
+
+
+class Change:
+    """Prior state of the records a mutation touched, keyed by ID.
+
+    A task or workspace maps to a copy of it as it was, or to None if the
+    mutation created it.
+    """
+
+    __slots__ = ("label", "tasks", "workspaces")
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self.tasks: Dict[int, Optional[Task]] = {}
+        self.workspaces: Dict[int, Optional[Workspace]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tasks) + len(self.workspaces)
+
+    def describe(self) -> str:
+        """Short description for messages, like ``delete (3 tasks)``."""
+        parts = []
+        if self.tasks:
+            parts.append(f"{len(self.tasks)} task{'s' if len(self.tasks) != 1 else ''}")
+        if self.workspaces:
+            parts.append(f"{len(self.workspaces)} workspace{'s' if len(self.workspaces) != 1 else ''}")
+        return f"{self.label} ({', '.join(parts)})"
+
+    def to_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "tasks": [t.to_dict() for t in self.tasks.values() if t is not None],
+            "new_tasks": [i for i, t in self.tasks.items() if t is None],
+            "workspaces": [ws.to_dict() for ws in self.workspaces.values() if ws is not None],
+            "new_workspaces": [i for i, ws in self.workspaces.items() if ws is None],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Change":
+        change = cls(data.get("label", ""))
+        for item in data.get("tasks", []):
+            change.tasks[item["id"]] = Task.from_dict(item)
+        change.tasks.update(dict.fromkeys(data.get("new_tasks", [])))
+        for item in data.get("workspaces", []):
+            change.workspaces[item["id"]] = Workspace.from_dict(item)
+        change.workspaces.update(dict.fromkeys(data.get("new_workspaces", [])))
+        return change
+
+
+class UndoLog:
+    """Bounded undo and redo stacks persisted in an append-only file.
+
+    The file is read on first use and re-read whenever another process has
+    written to it since. Changes to the stacks are kept in memory until
+    ``flush()``, which may run in another thread, appends them under
+    ``lock``; if another process wrote first, they are replayed on top of
+    what it wrote.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        lock: Optional[FileLock] = None,
+        fsync_policy: str = FSYNC_BATCHED,
+        limit: int = UNDO_LIMIT,
+        max_records: int = UNDO_MAX_RECORDS,
+    ) -> None:
+        self.path = path
+        self.lock = lock or FileLock(path.with_name(path.name + ".lock"))
+        self.fsync_policy = fsync_policy
+        self.max_records = max_records
+        self._stacks: Dict[str, Deque[Change]] = {UNDO: deque(maxlen=limit), REDO: deque(maxlen=limit)}
+        self._records = {UNDO: 0, REDO: 0}  # Records held on each stack
+        self._unwritten: List[Tuple[str, str, Optional[Change]]] = []  # (op, stack, change) not yet in the file
+        self._mutex = threading.RLock()  # Guards the stacks against a flush in another thread
+        self._lines = 0  # Lines in the file
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+
+    def __len__(self) -> int:
+        """Number of changes that can be undone."""
+        with self._mutex:
+            self._sync()
+            return len(self._stacks[UNDO])
+
+    def can_redo(self) -> bool:
+        with self._mutex:
+            self._sync()
+            return bool(self._stacks[REDO])
+
+    # ─── Stacks ────────────────────────────────────────────────────────────────
+
+    def _push(self, stack: str, change: Change) -> None:
+        changes = self._stacks[stack]
+        if len(changes) == changes.maxlen:
+            self._records[stack] -= len(changes[0])
+        changes.append(change)
+        self._records[stack] += len(change)
+        while self._records[stack] > self.max_records and len(changes) > 1:
+            self._records[stack] -= len(changes.popleft())
+
+    def _pop(self, stack: str) -> Optional[Change]:
+        changes = self._stacks[stack]
+        if not changes:
+            return None
+        change = changes.pop()
+        self._records[stack] -= len(change)
+        return change
+
+    def _apply(self, op: str, stack: str, change: Optional[Change]) -> None:
+        """Apply one operation to the stacks.
+
+        ``record`` pushes a new mutation's change and drops everything that
+        could be redone; ``push`` and ``pop`` move changes during undo and redo.
+        """
+        if op == "record":
+            self._push(UNDO, change)
+            self._stacks[REDO].clear()
+            self._records[REDO] = 0
+        elif op == "push":
+            self._push(stack, change)
+        elif op == "pop":
+            self._pop(stack)
+
+    def _do(self, op: str, stack: str, change: Optional[Change] = None) -> None:
+        self._apply(op, stack, change)
+        self._unwritten.append((op, stack, change))
+
+    # ─── File ──────────────────────────────────────────────────────────────────
+
+    def _sync(self) -> None:
+        """Read the log if it is new to us or another process wrote to it, then replay our unwritten operations."""
+        if self._loaded and file_signature(self.path) == self._signature:
+            return
+        for stack, changes in self._stacks.items():
+            changes.clear()
+            self._records[stack] = 0
+        self._lines = 0
+        self._signature = file_signature(self.path)
+        self._loaded = True
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                perf.count_read(self._signature[1])
+                for line in f:
+                    self._lines += 1
+                    try:
+                        record = json.loads(line)
+                        change = Change.from_dict(record["change"]) if "change" in record else None
+                        self._apply(record["op"], record["stack"], change)
+                    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                        continue  # A torn last line from an interrupted write
+        for op, stack, change in self._unwritten:
+            self._apply(op, stack, change)
+
+    def flush(self) -> None:
+        """Write the operations made since the last flush."""
+        if not self._unwritten:
+            return
+        with self.lock, self._mutex:
+            self._sync()
+            operations, self._unwritten = self._unwritten, []
+            held = len(self._stacks[UNDO]) + len(self._stacks[REDO])
+            if self._lines + len(operations) > COMPACT_FACTOR * max(held, 1) + self._stacks[UNDO].maxlen:
+                self._compact()
+                return
+            data = "".join(self._encode(op, stack, change) for op, stack, change in operations)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(data)
+                if self.fsync_policy == FSYNC_ALWAYS:
+                    f.flush()
+                    os.fsync(f.fileno())
+            after_write(self.path, self.fsync_policy)
+            perf.count_written(data)
+            self._lines += len(operations)
+            self._signature = file_signature(self.path)
+
+    @staticmethod
+    def _encode(op: str, stack: str, change: Optional[Change]) -> str:
+        record = {"op": op, "stack": stack}
+        if change is not None:
+            record["change"] = change.to_dict()
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def _compact(self) -> None:
+        """Rewrite the log as one push per change held."""
+        lines = [self._encode("push", stack, change) for stack, changes in self._stacks.items() for change in changes]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, "".join(lines), self.fsync_policy, backup=False)
+        self._lines = len(lines)
+        self._signature = file_signature(self.path)
+
+    # ─── Operations ────────────────────────────────────────────────────────────
+
+    def record(self, change: Change) -> None:
+        """Add the inverse of a new mutation. Anything that could be redone is dropped."""
+        with self._mutex:
+            self._do("record", UNDO, change)
+
+    def pop(self, stack: str) -> Optional[Change]:
+        """Take the newest change off the undo or redo stack. Hold ``lock`` until its inverse is pushed."""
+        with self._mutex:
+            self._sync()
+            change = self._stacks[stack][-1] if self._stacks[stack] else None
+            if change is not None:
+                self._do("pop", stack)
+            return change
+
+    def push(self, stack: str, change: Change) -> None:
+        """Put a change on the undo or redo stack."""
+        with self._mutex:
+            self._do("push", stack, change)
@@ -0,0 +1,147 @@
+"""Sorted and filtered task views kept up to date as tasks change.
+
+A SortIndex holds one view: the tasks of a workspace (or of all
+workspaces) in a sort order, optionally without completed tasks. It keeps
+each task's sort key in a sorted list, so when a task changes only that
+task is moved, found with a binary search, instead of sorting the whole
+view again. ViewIndexes builds indexes on first use, keeps the most
+recent few and updates every one a changed task belongs to.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import COMPLETED, Task
+
+SORT_MANUAL = "manual"
+SORT_PRIORITY = "priority"
+SORT_NEWEST = "newest"
+SORT_STATUS = "status"
+SORTS = (SORT_MANUAL, SORT_PRIORITY, SORT_NEWEST, SORT_STATUS)  # Also the cycle order
+
+# Sort key of each order, before the task ID that makes every key unique.
+# Ties keep the manual order.
+SORT_KEYS: Dict[str, Callable[[Task], tuple]] = {
+    SORT_MANUAL: lambda task: (task.rank,),
+    SORT_PRIORITY: lambda task: (-task.priority_code, task.rank),
+    SORT_NEWEST: lambda task: (-task.created_ts, task.rank),
+    SORT_STATUS: lambda task: (task.status_code, task.rank),
+}
+
+# Indexes kept by ViewIndexes; each holds a key per task in its view
+MAX_INDEXES = 8
+
+# (old row, new row) of a task placed in an index; None where it isn't shown
+Move = Tuple[Optional[int], Optional[int]]
+
+
+class SortIndex:
+    """The task IDs of one view in sort order, with the sort key of each."""
+
+    def __init__(
+        self,
+        workspace_id: Optional[int],
+        sort: str,
+        hide_completed: bool,
+        tasks: Iterable[Task] = (),
+    ) -> None:
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort: {sort!r} (expected one of {', '.join(SORTS)})")
+        self.workspace_id = workspace_id
+        self.sort = sort
+        self.hide_completed = hide_completed
+        self._sort_key = SORT_KEYS[sort]
+        # Keys in order, each ending with its task id, and the ids alone in the same order
+        self._sorted: List[tuple] = sorted(self._key(task) for task in tasks if self.covers(task))
+        self._ids: List[int] = [key[-1] for key in self._sorted]
+        self._keys: Dict[int, tuple] = {key[-1]: key for key in self._sorted}  # task id -> key
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._keys
+
+    def _key(self, task: Task) -> tuple:
+        return (*self._sort_key(task), task.id)
+
+    def covers(self, task: Task) -> bool:
+        """Whether the task belongs in this view."""
+        if self.workspace_id is not None and task.workspace_id != self.workspace_id:
+            return False
+        return not (self.hide_completed and task.status_code == COMPLETED)
+
+    def ids(self) -> List[int]:
+        """The task IDs in view order, as a new list."""
+        return self._ids[:]
+
+    def place(self, task: Task) -> Move:
+        """Insert, move or drop a task after it was added or changed. Returns its old and new row."""
+        old = self.remove(task.id)
+        if not self.covers(task):
+            return old, None
+        key = self._key(task)
+        new = bisect_left(self._sorted, key)
+        self._sorted.insert(new, key)
+        self._ids.insert(new, task.id)
+        self._keys[task.id] = key
+        return old, new
+
+    def remove(self, task_id: int) -> Optional[int]:
+        """Drop a task. Returns the row it was in, or None if it wasn't in the view."""
+        key = self._keys.pop(task_id, None)
+        if key is None:
+            return None
+        row = bisect_left(self._sorted, key)
+        del self._sorted[row]
+        del self._ids[row]
+        return row
+
+
+class ViewIndexes:
+    """SortIndexes by view, built on first use from ``load_tasks(workspace_id)``.
+
+    Every change made through the viewer is passed to ``place`` or
+    ``remove``, which update all the indexes. Changes that can touch many
+    tasks at once, like undo or another process writing, ``clear`` them
+    instead, to be rebuilt when next needed.
+    """
+
+    def __init__(self, load_tasks: Callable[[Optional[int]], Iterable[Task]]) -> None:
+        self.load_tasks = load_tasks
+        self._indexes: Dict[Tuple[Optional[int], str, bool], SortIndex] = {}
+
+    def kept(self, workspace_id: Optional[int], sort: str, hide_completed: bool) -> Optional[SortIndex]:
+        """The index of a view if it is kept, without building it."""
+        return self._indexes.get((workspace_id, sort, hide_completed))
+
+    def get(self, workspace_id: Optional[int], sort: str, hide_completed: bool) -> SortIndex:
+        """The index of a view, building it if it isn't kept."""
+        key = (workspace_id, sort, hide_completed)
+        index = self._indexes.pop(key, None)
+        if index is None:
+            index = SortIndex(workspace_id, sort, hide_completed, self.load_tasks(workspace_id))
+        self._indexes[key] = index  # Most recently used last
+        if len(self._indexes) > MAX_INDEXES:
+            del self._indexes[next(iter(self._indexes))]
+        return index
+
+    def place(self, tasks: Iterable[Task], view: Optional[SortIndex] = None) -> List[Move]:
+        """Update every index for changed or added tasks. Returns the moves made in ``view``, in order."""
+        moves = []
+        for task in tasks:
+            for index in self._indexes.values():
+                move = index.place(task)
+                if index is view:
+                    moves.append(move)
+        return moves
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        """Drop deleted tasks from every index."""
+        for task_id in task_ids:
+            for index in self._indexes.values():
+                index.remove(task_id)
+
+    def clear(self) -> None:
+        """Drop every index."""
+        self._indexes.clear()
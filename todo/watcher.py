@@ -0,0 +1,155 @@
+"""Watch storage files for changes made by other processes.
+
+Uses inotify on Linux, through ctypes so there is no extra dependency, and
+falls back to polling file signatures (mtime, size and inode) elsewhere.
+Bursts of writes are debounced into a single notification.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from .fileio import file_signature
+
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: wd, mask, cookie, len, then a name of len bytes
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Seconds of quiet after a write before changes are reported
+DEFAULT_DEBOUNCE = 0.2
+# Report anyway after this many seconds, even if writes keep coming
+MAX_DEBOUNCE = 1.0
+# Seconds between checks when polling
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def _open_inotify(directory: Path) -> Optional[int]:
+    """Return an inotify descriptor watching ``directory``, or None if unavailable."""
+    library = ctypes.util.find_library("c")
+    if library is None:
+        return None
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = init(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+    if add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class StorageWatcher:
+    """Report which of a set of files in one directory changed.
+
+    ``wait()`` blocks until a watched file changes and returns the names of
+    every file that changed during the debounce window.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ) -> None:
+        self.paths = {path.name: path for path in paths}
+        self.directory = next(iter(self.paths.values())).parent
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._fd = _open_inotify(self.directory) if use_inotify else None
+        self._signatures = self._current_signatures()
+
+    @property
+    def mode(self) -> str:
+        """``inotify`` or ``poll``."""
+        return "poll" if self._fd is None else "inotify"
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait up to ``timeout`` seconds for changes. Returns the changed file names."""
+        changed = self._next_changes(timeout)
+        if not changed:
+            return changed
+
+        # Keep collecting until writes have been quiet for the debounce period
+        deadline = time.monotonic() + MAX_DEBOUNCE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self._next_changes(min(self.debounce, remaining))
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def _next_changes(self, timeout: Optional[float]) -> Set[str]:
+        if self._fd is not None:
+            return self._read_events(timeout)
+        return self._poll(timeout)
+
+    def _read_events(self, timeout: Optional[float]) -> Set[str]:
+        """Wait for inotify events and return the watched names they refer to."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name in self.paths:
+                    changed.add(name)
+        return changed
+
+    def _current_signatures(self) -> Dict[str, Optional[tuple]]:
+        return {name: file_signature(path) for name, path in self.paths.items()}
+
+    def _poll(self, timeout: Optional[float]) -> Set[str]:
+        """Compare file signatures until something changes or ``timeout`` passes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.poll_interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+            if delay > 0:
+                time.sleep(delay)
+
+            current = self._current_signatures()
+            changed = {name for name, sig in current.items() if sig != self._signatures[name]}
+            self._signatures = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
@@ -1,98 +1,334 @@
 """Custom Textual widgets for the Todo app."""
 
+from typing import Callable, Iterable
+
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Region, Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.widgets import Static, DataTable
 from rich.text import Text
 
-from .models import Task, Workspace
+from . import perf
+from .models import Task, Workspace, WorkspaceStats
+from .render import fit_cells, row_cache
 
 
-class TaskTable(DataTable):
-    """Custom DataTable for displaying tasks with styling."""
+class TaskTable(ScrollView, can_focus=True):
+    """Virtualized table for displaying tasks with styling.
+    
+    The table only holds the ordered task IDs. Rows are fetched through
+    fetch_tasks and formatted when they scroll into view, together with a
+    small overscan buffer, so memory and mount time don't grow with the
+    number of tasks. Cells come from the shared row cache, so only tasks
+    that changed since they were last shown are formatted again.
+    """
     
     DEFAULT_CSS = """
     TaskTable {
         height: 1fr;
         margin: 1 2;
+        background: #1a1b26;
     }
     
-    TaskTable > .datatable--cursor {
+    TaskTable > .tasktable--cursor {
         background: #3b4261;
     }
     
-    TaskTable > .datatable--header {
+    TaskTable > .tasktable--header {
         background: #1a1b26;
         color: #a9b1d6;
         text-style: bold;
     }
-    """
     
-    def __init__(self, classes: str = "") -> None:
-        super().__init__(cursor_type="row", classes=classes)
-        self.show_header = True
-        self.zebra_stripes = True
+    TaskTable > .tasktable--odd-row {
+        background: #1f2335;
+    }
     
-    def on_mount(self) -> None:
-        """Set up columns when widget is mounted."""
-        self.add_column("✓", width=5, key="check")
-        self.add_column("Title", width=50, key="title")
-        self.add_column("Priority", width=10, key="priority")
-        self.add_column("Status", width=12, key="status")
-        self.add_column("Created", width=10, key="created")
+    TaskTable > .tasktable--selected {
+        background: #283457;
+    }
+    """
     
+    COMPONENT_CLASSES = {
+        "tasktable--cursor",
+        "tasktable--header",
+        "tasktable--odd-row",
+        "tasktable--selected",
+    }
+    
+    BINDINGS = [
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+    ]
+    
+    # (key, label, width) for each column, in render.COLUMNS order
+    COLUMNS = (
+        ("check", "✓", 5),
+        ("title", "Title", 50),
+        ("priority", "Priority", 10),
+        ("status", "Status", 12),
+        ("created", "Created", 10),
+    )
+    CELL_PADDING = 1
+    
+    # Rows formatted beyond each edge of the visible window
+    OVERSCAN = 20
+    
+    def __init__(self, fetch_tasks: Callable[[list[int]], dict[int, Task]] | None = None, classes: str = "") -> None:
+        super().__init__(classes=classes)
+        self.fetch_tasks = fetch_tasks
+        self.cursor_row = 0
+        self.visual_anchor: int | None = None  # Row where visual selection started, None outside visual mode
+        self._ids: list[int] = []  # task ids in row order
+        self._tasks: dict[int, Task] = {}  # tasks in or near the visible window
+        self._cells: dict[int, tuple[Text, ...]] = {}  # task id -> cells cut to their column widths
+        self._widths = tuple(width for _, _, width in self.COLUMNS)
+        self._header = fit_cells(tuple(Text(label) for _, label, _ in self.COLUMNS), self._widths)
+        self._row_width = sum(width + 2 * self.CELL_PADDING for _, _, width in self.COLUMNS)
+    
+    @property
+    def row_count(self) -> int:
+        """Number of task rows."""
+        return len(self._ids)
+    
+    # ─── Data ──────────────────────────────────────────────────────────────────
+    
+    @perf.timed("TaskTable.set_task_ids")
+    def set_task_ids(self, task_ids: list[int]) -> None:
+        """Show the given tasks, in order. Rows are fetched as they come into view."""
+        self._ids = list(task_ids)
+        self._tasks.clear()
+        self._cells.clear()
+        self._rows_changed()
+    
+    @perf.timed("TaskTable.populate")
     def populate(self, tasks: list[Task]) -> None:
-        """Fill the table with tasks."""
-        self.clear()
+        """Show the given tasks, in order."""
+        self._ids = [task.id for task in tasks]
+        self._tasks = {task.id: task for task in tasks}
+        self._cells.clear()
+        self._rows_changed()
+    
+    def sync_task_ids(self, task_ids: list[int]) -> None:
+        """Re-sync with storage after another process changed it.
+        
+        Unlike set_task_ids, rows already fetched are only re-formatted if
+        their task changed, and the cursor stays on the same task if it
+        still exists.
+        """
+        selected = self.get_selected_task_id()
+        if task_ids != self._ids:
+            self._ids = list(task_ids)
+            kept = set(self._ids)
+            self._tasks = {i: t for i, t in self._tasks.items() if i in kept}
+            self._cells = {i: c for i, c in self._cells.items() if i in kept}
+            self._rows_changed()
+            if selected in kept:
+                self.move_cursor(self._ids.index(selected))
         
+        if self._tasks and self.fetch_tasks is not None:
+            fresh = self.fetch_tasks(list(self._tasks))
+            for task_id, task in fresh.items():
+                if task != self._tasks[task_id]:
+                    self.update_task(task)
+    
+    def update_task(self, task: Task) -> None:
+        """Re-render a single task's row."""
+        self.update_tasks([task])
+    
+    def update_tasks(self, tasks: Iterable[Task]) -> None:
+        """Re-render the rows of several tasks. Rows that aren't fetched yet are left to be fetched."""
         for task in tasks:
-            checkbox = self._format_checkbox(task)
-            title = self._format_title(task)
-            priority = self._format_priority(task)
-            status = self._format_status(task)
-            created = self._format_created(task)
-            
-            self.add_row(checkbox, title, priority, status, created, key=str(task.id))
-    
-    def _format_checkbox(self, task: Task) -> Text:
-        """Format the checkbox column."""
-        if task.is_completed():
-            return Text("[x]", style="bold green")
-        return Text("[ ]", style="dim")
-    
-    def _format_title(self, task: Task) -> Text:
-        """Format the title column."""
-        if task.is_completed():
-            return Text(task.title, style="dim strike")
-        return Text(task.title)
-    
-    def _format_priority(self, task: Task) -> Text:
-        """Format the priority column with colors."""
-        if task.priority == "high":
-            return Text("High", style="bold red")
-        elif task.priority == "medium":
-            return Text("Medium", style="bold yellow")
-        elif task.priority == "low":
-            return Text("Low", style="dim")
-        return Text("-", style="dim")
-    
-    def _format_status(self, task: Task) -> Text:
-        """Format the status column with colors."""
-        if task.is_completed():
-            return Text("Completed", style="bold green")
-        return Text("Pending", style="bold yellow")
-    
-    def _format_created(self, task: Task) -> Text:
-        """Format the created timestamp as date."""
-        return Text(task.formatted_date(), style="dim")
+            if task.id in self._tasks:
+                self._tasks[task.id] = task
+                self._cells.pop(task.id, None)
+        self.refresh()
+    
+    def move_task_row(self, task: Task, old: int | None, new: int | None) -> None:
+        """Move a task's row from ``old`` to ``new``, as a sort index placed it; None where it isn't shown.
+        
+        The cursor stays on the same row, so toggling a task that moves
+        away leaves the cursor on the task that took its place.
+        """
+        if old is not None:
+            del self._ids[old]
+        self._cells.pop(task.id, None)
+        if new is None:
+            self._tasks.pop(task.id, None)
+        else:
+            self._ids.insert(new, task.id)
+            self._tasks[task.id] = task
+        self._rows_changed()
+    
+    def remove_task(self, task_id: int) -> None:
+        """Remove a single task's row."""
+        if task_id in self._ids:
+            self._ids.remove(task_id)
+            self._tasks.pop(task_id, None)
+            self._cells.pop(task_id, None)
+            self._rows_changed()
+    
+    def remove_tasks(self, task_ids: Iterable[int]) -> None:
+        """Remove several rows in one pass over the table."""
+        removed = set(task_ids)
+        self._ids = [task_id for task_id in self._ids if task_id not in removed]
+        for task_id in removed:
+            self._tasks.pop(task_id, None)
+            self._cells.pop(task_id, None)
+        self._rows_changed()
+    
+    def move_rows(self, first: int, last: int, row: int) -> None:
+        """Move rows first..last so they start at ``row``, keeping the cursor and selection on them."""
+        block = self._ids[first:last + 1]
+        del self._ids[first:last + 1]
+        self._ids[row:row] = block
+        shift = row - first
+        if self.visual_anchor is not None:
+            self.visual_anchor += shift
+        self.move_cursor(self.cursor_row + shift)
+    
+    def _rows_changed(self) -> None:
+        """Update the scrollable size and cursor after rows were added or removed."""
+        self.virtual_size = Size(self._row_width, len(self._ids) + 1)  # +1 for the header
+        self.cursor_row = max(0, min(self.cursor_row, len(self._ids) - 1))
+        if self.visual_anchor is not None:
+            self.visual_anchor = max(0, min(self.visual_anchor, len(self._ids) - 1))
+        self.refresh()
+    
+    def _ensure_rows(self, start: int, end: int) -> None:
+        """Fetch and format rows start..end plus overscan, dropping rows far outside."""
+        start = max(0, start - self.OVERSCAN)
+        end = min(len(self._ids), end + self.OVERSCAN)
+        window = self._ids[start:end]
+        
+        missing = [task_id for task_id in window if task_id not in self._tasks]
+        if missing and self.fetch_tasks is not None:
+            self._tasks.update(self.fetch_tasks(missing))
+        
+        for task_id in window:
+            if task_id not in self._cells and task_id in self._tasks:
+                self._cells[task_id] = row_cache.fitted(self._tasks[task_id], self._widths)
+        
+        # Keep memory bounded to a few windows when backed by a fetcher
+        if self.fetch_tasks is not None and len(self._tasks) > 4 * len(window) + 1:
+            keep = set(window)
+            self._tasks = {i: t for i, t in self._tasks.items() if i in keep}
+            self._cells = {i: c for i, c in self._cells.items() if i in keep}
+    
+    # ─── Cursor ────────────────────────────────────────────────────────────────
+    
+    def move_cursor(self, row: int) -> None:
+        """Move the cursor to a row and scroll it into view."""
+        if not self._ids:
+            self.cursor_row = 0
+            return
+        self.cursor_row = max(0, min(row, len(self._ids) - 1))
+        self._scroll_cursor_into_view()
+        self.refresh()
+    
+    def _scroll_cursor_into_view(self) -> None:
+        """Scroll so the cursor row is visible below the header."""
+        visible = max(1, self.scrollable_content_region.height - 1)
+        top = round(self.scroll_y)
+        if self.cursor_row < top:
+            self.scroll_to(y=self.cursor_row, animate=False)
+        elif self.cursor_row >= top + visible:
+            self.scroll_to(y=self.cursor_row - visible + 1, animate=False)
+    
+    def action_cursor_down(self) -> None:
+        """Move the cursor down one row."""
+        self.move_cursor(self.cursor_row + 1)
+    
+    def action_cursor_up(self) -> None:
+        """Move the cursor up one row."""
+        self.move_cursor(self.cursor_row - 1)
+    
+    def action_page_down(self) -> None:
+        """Move the cursor down one page."""
+        self.move_cursor(self.cursor_row + max(1, self.scrollable_content_region.height - 1))
+    
+    def action_page_up(self) -> None:
+        """Move the cursor up one page."""
+        self.move_cursor(self.cursor_row - max(1, self.scrollable_content_region.height - 1))
+    
+    def on_click(self, event: events.Click) -> None:
+        """Move the cursor to the clicked row."""
+        if event.y > 0:
+            self.move_cursor(round(self.scroll_y) + event.y - 1)
     
     def get_selected_task_id(self) -> int | None:
         """Get the ID of the currently selected task."""
-        if self.row_count == 0:
+        if not self._ids:
             return None
+        return self._ids[self.cursor_row]
+    
+    # ─── Visual Selection ──────────────────────────────────────────────────────
+    
+    def set_visual_anchor(self, row: int | None) -> None:
+        """Start visual selection at a row, or end it with None."""
+        self.visual_anchor = row
+        self.refresh()
+    
+    def selected_rows(self, count: int = 1) -> tuple[int, int]:
+        """First and last row an action applies to.
         
-        row_key = self.coordinate_to_cell_key(self.cursor_coordinate).row_key
-        if row_key:
-            return int(row_key.value)
-        return None
+        In visual mode that is the selection; otherwise count rows from the cursor.
+        """
+        if self.visual_anchor is not None:
+            return min(self.visual_anchor, self.cursor_row), max(self.visual_anchor, self.cursor_row)
+        return self.cursor_row, min(self.cursor_row + count, len(self._ids)) - 1
+    
+    def get_task_ids(self, first: int, last: int) -> list[int]:
+        """IDs of the tasks in rows first..last, inclusive."""
+        return self._ids[first:last + 1]
+    
+    # ─── Rendering ─────────────────────────────────────────────────────────────
+    
+    @perf.timed("TaskTable.render_lines")
+    def render_lines(self, crop: Region) -> list[Strip]:
+        """Fetch and format the rows in view before rendering them."""
+        top = round(self.scroll_y) + crop.y - 1
+        self._ensure_rows(max(0, top), top + crop.height)
+        return super().render_lines(crop)
+    
+    def render_line(self, y: int) -> Strip:
+        """Render the header (line 0) or a task row."""
+        scroll_x = round(self.scroll_x)
+        width = self.scrollable_content_region.width
+        
+        if y == 0:
+            cells = self._header
+            style = self.get_component_rich_style("tasktable--header")
+        else:
+            row = round(self.scroll_y) + y - 1
+            if row >= len(self._ids):
+                return Strip.blank(width, self.rich_style)
+            cells = self._cells.get(self._ids[row])
+            if cells is None:
+                return Strip.blank(width, self.rich_style)
+            anchor = self.visual_anchor
+            if row == self.cursor_row:
+                style = self.get_component_rich_style("tasktable--cursor")
+            elif anchor is not None and min(anchor, self.cursor_row) <= row <= max(anchor, self.cursor_row):
+                style = self.get_component_rich_style("tasktable--selected")
+            elif row % 2:
+                style = self.get_component_rich_style("tasktable--odd-row")
+            else:
+                style = self.rich_style
+        
+        line = Text(style=style, end="")
+        padding = " " * self.CELL_PADDING
+        for cell in cells:
+            line.append(padding)
+            line.append_text(cell)
+            line.append(padding)
+        
+        strip = Strip(line.render(self.app.console), self._row_width)
+        return strip.crop(scroll_x, scroll_x + width).extend_cell_length(width, style).simplify()
 
 
 class WorkspaceTable(DataTable):
@@ -118,38 +354,114 @@ class WorkspaceTable(DataTable):
     # Special ID for "All Tasks" option
     ALL_TASKS_ID = -1
     
+    COUNT_COLUMNS = ("tasks", "pending", "done", "priority")
+    
     def __init__(self) -> None:
         super().__init__(cursor_type="row")
         self.show_header = True
         self.zebra_stripes = True
+        self._row_state: dict[int, tuple] = {}  # row id -> (name, stats) it was rendered from
+        self._count_keys: dict[int, tuple] = {}  # row id -> render keys of the count cells
+        self._name_cells: dict[int, Text] = {}  # row id -> name cell, used to reorder rows
+        self._order: list[int] = []  # row ids in row order
     
     def on_mount(self) -> None:
         """Set up columns when widget is mounted."""
         self.add_column("", width=4, key="icon")
-        self.add_column("Workspace", width=40, key="name")
-        self.add_column("Tasks", width=10, key="tasks")
-    
-    def populate(self, workspaces: list[Workspace], task_counts: dict[int, int], total_tasks: int) -> None:
-        """Fill the table with workspaces."""
-        self.clear()
+        self.add_column("Workspace", width=30, key="name")
+        self.add_column("Tasks", width=6, key="tasks")
+        self.add_column("Pending", width=8, key="pending")
+        self.add_column("Done", width=6, key="done")
+        self.add_column("Priority", width=14, key="priority")
+    
+    @perf.timed("WorkspaceTable.populate")
+    def populate(self, workspaces: list[Workspace], stats: dict[int | None, WorkspaceStats], total: WorkspaceStats) -> None:
+        """Sync the table with workspaces and their precomputed task counts.
         
-        # Add "All Tasks" option first
-        self.add_row(
-            Text("📋", style="bold"),
-            Text("All Tasks", style="bold #7aa2f7"),
-            Text(str(total_tasks), style="dim"),
-            key=str(self.ALL_TASKS_ID)
-        )
+        Only rows whose name or counts changed are re-rendered.
+        """
+        # "All Tasks" option comes first
+        rows = [(self.ALL_TASKS_ID, "All Tasks", total)]
+        rows.extend((ws.id, ws.name, stats.get(ws.id) or WorkspaceStats()) for ws in workspaces)
+        new_order = [row_id for row_id, _, _ in rows]
+        
+        wanted = set(new_order)
+        for row_id in [i for i in self._order if i not in wanted]:
+            del self._row_state[row_id]
+            del self._count_keys[row_id]
+            del self._name_cells[row_id]
+            self._order.remove(row_id)
+            self.remove_row(str(row_id))
         
-        # Add each workspace
-        for ws in workspaces:
-            count = task_counts.get(ws.id, 0)
-            self.add_row(
-                Text("📁", style="bold #f7768e"),
-                Text(ws.name),
-                Text(str(count), style="dim"),
-                key=str(ws.id)
-            )
+        for row_id, name, ws_stats in rows:
+            state = (name, ws_stats)
+            if row_id not in self._row_state:
+                self._add_workspace_row(row_id, name, ws_stats)
+            elif self._row_state[row_id] != state:
+                self._update_workspace_row(row_id, name, ws_stats)
+        
+        if self._order != new_order:
+            positions = {id(self._name_cells[row_id]): i for i, row_id in enumerate(new_order)}
+            self.sort("name", key=lambda cell: positions[id(cell)])
+            self._order = new_order
+    
+    def _add_workspace_row(self, row_id: int, name: str, stats: WorkspaceStats) -> None:
+        """Append a row for a workspace (or the "All Tasks" entry)."""
+        if row_id == self.ALL_TASKS_ID:
+            icon = Text("📋", style="bold")
+            name_cell = Text(name, style="bold #7aa2f7")
+        else:
+            icon = Text("📁", style="bold #f7768e")
+            name_cell = Text(name)
+        
+        self.add_row(icon, name_cell, *self._format_counts(stats), key=str(row_id))
+        self._row_state[row_id] = (name, stats)
+        self._count_keys[row_id] = self._count_render_keys(stats)
+        self._name_cells[row_id] = name_cell
+        self._order.append(row_id)
+    
+    def _update_workspace_row(self, row_id: int, name: str, stats: WorkspaceStats) -> None:
+        """Re-render the changed cells of an existing row."""
+        old_name, _ = self._row_state[row_id]
+        if name != old_name:
+            name_cell = Text(name, style=self._name_cells[row_id].style)
+            self.update_cell(str(row_id), "name", name_cell)
+            self._name_cells[row_id] = name_cell
+        
+        new_keys = self._count_render_keys(stats)
+        old_keys = self._count_keys[row_id]
+        if new_keys != old_keys:
+            cells = self._format_counts(stats)
+            for column, cell, old, new in zip(self.COUNT_COLUMNS, cells, old_keys, new_keys):
+                if old != new:
+                    self.update_cell(str(row_id), column, cell)
+        
+        self._row_state[row_id] = (name, stats)
+        self._count_keys[row_id] = new_keys
+    
+    def _count_render_keys(self, stats: WorkspaceStats) -> tuple:
+        """Values each count cell is rendered from, in column order."""
+        return (stats.total, stats.pending, stats.completed, (stats.high, stats.medium, stats.low))
+    
+    def _format_counts(self, stats: WorkspaceStats) -> tuple[Text, Text, Text, Text]:
+        """Format the total, pending, done and priority columns."""
+        priority = Text()
+        for count, label, style in (
+            (stats.high, "H", "bold red"),
+            (stats.medium, "M", "bold yellow"),
+            (stats.low, "L", "dim"),
+        ):
+            if count:
+                priority.append(f"{count}{label} ", style=style)
+        if not priority:
+            priority = Text("-", style="dim")
+        
+        return (
+            Text(str(stats.total), style="dim"),
+            Text(str(stats.pending), style="yellow" if stats.pending else "dim"),
+            Text(str(stats.completed), style="green" if stats.completed else "dim"),
+            priority,
+        )
     
     def get_selected_workspace_id(self) -> int | None:
         """Get the ID of the currently selected workspace. Returns ALL_TASKS_ID for global view."""
@@ -163,7 +475,15 @@ class WorkspaceTable(DataTable):
 
 
 class HelpBar(Static):
-    """Bottom help bar showing available commands."""
+    """Bottom help bar showing available commands and whether changes are saved."""
+    
+    # Save status -> (label, color)
+    STATUSES = {
+        "unsaved": ("unsaved", "#e0af68"),
+        "saving": ("saving", "#e0af68"),
+        "saved": ("saved", "#9ece6a"),
+        "failed": ("save failed", "#f7768e"),
+    }
     
     DEFAULT_CSS = """
     HelpBar {
@@ -177,13 +497,20 @@ class HelpBar(Static):
     
     def __init__(self, mode: str = "workspaces") -> None:
         super().__init__()
-        self.mode = mode  # "workspaces" or "tasks"
+        self.mode = mode  # "workspaces", "tasks" or "visual"
+        self.status = ""  # A key of STATUSES, or "" before anything was changed
     
     def set_mode(self, mode: str) -> None:
         """Set the current mode and refresh."""
         self.mode = mode
         self.refresh()
     
+    def set_status(self, status: str) -> None:
+        """Show the save status."""
+        if status != self.status:
+            self.status = status
+            self.refresh()
+    
     def render(self) -> Text:
         """Render the help bar based on current mode."""
         help_text = Text()
@@ -195,17 +522,33 @@ class HelpBar(Static):
                 ("a", "add"),
                 ("e", "edit"),
                 ("dd", "delete"),
+                ("u", "undo"),
                 ("q", "quit"),
             ]
+        elif self.mode == "visual":
+            commands = [
+                ("j/k", "extend"),
+                ("J/K", "move"),
+                ("T/B", "top/bottom"),
+                ("x", "toggle"),
+                ("p", "priority"),
+                ("d", "delete"),
+                ("Esc", "cancel"),
+            ]
         else:  # tasks mode
             commands = [
                 ("j/k", "navigate"),
                 ("J/K", "move"),
+                ("V", "select"),
                 ("x", "toggle"),
                 ("p", "priority"),
+                ("s", "sort"),
+                ("h", "hide done"),
+                ("/", "search"),
                 ("a", "add"),
                 ("e", "edit"),
                 ("dd", "delete"),
+                ("u", "undo"),
                 ("Bksp", "back"),
                 ("q", "quit"),
             ]
@@ -214,6 +557,10 @@ class HelpBar(Static):
             help_text.append(f" {key}", style="bold #7aa2f7")
             help_text.append(f":{action} ", style="#565f89")
         
+        if self.status:
+            label, color = self.STATUSES[self.status]
+            help_text.append(f"  ● {label}", style=color)
+        
         return help_text
 
 